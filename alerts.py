@@ -0,0 +1,251 @@
+import os, time, heapq, queue, smtplib, threading
+from email.message import EmailMessage
+from http_pool import TokenBucket, get_session
+
+DIGEST_WINDOW = float(os.getenv("ALERT_DIGEST_SECONDS", "30") or 30)
+DEDUPE_TTL = float(os.getenv("ALERT_DEDUPE_SECONDS", "3600") or 3600)
+# deliveries per minute allowed for each (channel, recipient); alerts over the limit wait for the next digest
+RATE_LIMITS = {"email": 6, "webhook": 60, "sms": 2}
+SMS_MAX_CHARS = 1600
+
+class DeliveryError(Exception):
+    pass
+
+class NotConfigured(DeliveryError):
+    """The channel has no credentials; retrying cannot succeed."""
+
+class SMTPConnection:
+    """One SMTP session kept open across messages; reconnects (STARTTLS + login) when the server drops it."""
+    def __init__(self, host=None, port=None, user=None, password=None, starttls=None, sender=None, timeout=10):
+        self.host = host if host is not None else os.getenv("SMTP_HOST", "")
+        self.port = int(port if port is not None else (os.getenv("SMTP_PORT", "587") or 587))
+        self.user = user if user is not None else os.getenv("SMTP_USER", "")
+        self.password = password if password is not None else os.getenv("SMTP_PASS", "")
+        self.starttls = starttls if starttls is not None else os.getenv("SMTP_STARTTLS", "1") not in ("0", "false", "")
+        self.sender = sender or os.getenv("SMTP_FROM", "") or self.user
+        self.timeout = timeout
+        self._smtp = None
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self):
+        return bool(self.host and self.sender)
+
+    def _connect(self):
+        s = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            s.starttls()
+        if self.user and self.password:
+            s.login(self.user, self.password)
+        return s
+
+    def send(self, to, subject, body):
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = self.sender
+        msg["To"] = to
+        msg.set_content(body)
+        with self._lock:
+            for attempt in (0, 1):
+                try:
+                    if self._smtp is None:
+                        self._smtp = self._connect()
+                    self._smtp.send_message(msg)
+                    return
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused, OSError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+class AlertDispatcher:
+    """Queues alerts and delivers them from background threads.
+
+    ``submit`` never blocks on delivery. Alerts for the same (channel, recipient) that
+    arrive within ``digest_window`` seconds are sent as one digest; an alert whose ``key``
+    was already submitted within ``dedupe_ttl`` seconds is dropped. Each (channel,
+    recipient) has its own token bucket, and failed deliveries are retried with
+    exponential backoff; a channel that is not configured fails at once. Channels: "email" (recipient = address), "webhook" (recipient =
+    URL, JSON body) and "sms" (recipient = phone number, via Twilio).
+    """
+    def __init__(self, workers=2, digest_window=DIGEST_WINDOW, dedupe_ttl=DEDUPE_TTL, rates=None, retries=3, backoff=1.0,
+                 smtp=None, twilio_base_url=None, max_pending=10000):
+        self.digest_window = digest_window
+        self.dedupe_ttl = dedupe_ttl
+        self.rates = {**RATE_LIMITS, **(rates or {})}
+        self.retries = retries
+        self.backoff = backoff
+        self.max_pending = max_pending
+        self.smtp = smtp or SMTPConnection()
+        self.twilio_base_url = (twilio_base_url or os.getenv("TWILIO_BASE_URL", "https://api.twilio.com")).rstrip("/")
+        self.stats = {"submitted": 0, "deduped": 0, "dropped": 0, "sent": 0, "messages": 0, "retried": 0, "failed": 0}
+        self.errors = []
+        self._pending = {}   # (channel, recipient) -> [first_submit_time, [alert, ...]]
+        self._seen = {}      # dedupe key -> submit time
+        self._buckets = {}
+        self._delayed = []   # heap of (due, seq, channel, recipient, alerts, attempt)
+        self._seq = 0
+        self._work = queue.Queue()
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._schedule, name="alert-scheduler", daemon=True)]
+        self._threads += [threading.Thread(target=self._deliver_loop, name=f"alert-worker-{i}", daemon=True) for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, channel, recipient, subject, body="", key=None, payload=None):
+        """Queue one alert; returns False if it was a duplicate or the queue is full."""
+        if channel not in self.rates:
+            raise ValueError(f"unknown alert channel: {channel}")
+        now = time.time()
+        alert = {"subject": subject, "body": body, "payload": payload, "ts": now}
+        with self._cond:
+            if key is not None:
+                seen = self._seen.get((channel, recipient, key))
+                if seen is not None and now - seen < self.dedupe_ttl:
+                    self.stats["deduped"] += 1
+                    return False
+            if sum(len(p[1]) for p in self._pending.values()) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+            self._pending.setdefault((channel, recipient), [now, []])[1].append(alert)
+            # only a queued alert suppresses its repeats; a dropped one can be submitted again
+            if key is not None:
+                self._seen[(channel, recipient, key)] = now
+            self.stats["submitted"] += 1
+            self._cond.notify_all()
+        return True
+
+    def _bucket(self, channel, recipient):
+        b = self._buckets.get((channel, recipient))
+        if b is None:
+            per_minute = self.rates[channel]
+            b = self._buckets[(channel, recipient)] = TokenBucket(per_minute / 60.0, max(1.0, per_minute / 12.0))
+        return b
+
+    def _schedule(self):
+        # moves due digests and retries onto the work queue; throttled digests stay pending and keep coalescing
+        while not self._stop.is_set():
+            with self._cond:
+                now = time.time()
+                for k, (first, alerts) in list(self._pending.items()):
+                    if now - first >= self.digest_window and self._bucket(*k).try_acquire():
+                        del self._pending[k]
+                        self._inflight += 1
+                        self._work.put((k[0], k[1], alerts, 0))
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, channel, recipient, alerts, attempt = heapq.heappop(self._delayed)
+                    self._work.put((channel, recipient, alerts, attempt))
+                for k, seen in list(self._seen.items()):
+                    if now - seen >= self.dedupe_ttl:
+                        del self._seen[k]
+                waits = [first + self.digest_window - now for first, _ in self._pending.values()]
+                waits += [self._delayed[0][0] - now] if self._delayed else []
+                self._cond.wait(min([0.5] + [max(w, 0.05) for w in waits]))
+
+    def _deliver_loop(self):
+        while True:
+            item = self._work.get()
+            if item is None:
+                return
+            channel, recipient, alerts, attempt = item
+            done = True
+            try:
+                self._deliver(channel, recipient, alerts)
+                with self._cond:
+                    self.stats["sent"] += len(alerts)
+                    self.stats["messages"] += 1
+            except Exception as e:
+                # whatever a sender raises is a failed attempt; it must not take the worker down
+                with self._cond:
+                    if attempt < self.retries and not isinstance(e, NotConfigured):
+                        self.stats["retried"] += 1
+                        self._seq += 1
+                        heapq.heappush(self._delayed, (time.time() + self.backoff * 2 ** attempt, self._seq, channel, recipient, alerts, attempt + 1))
+                        done = False
+                    else:
+                        self.stats["failed"] += len(alerts)
+                        self.errors.append({"channel": channel, "recipient": recipient, "error": str(e), "n": len(alerts)})
+                        del self.errors[:-100]
+            finally:
+                with self._cond:
+                    if done:
+                        self._inflight -= 1
+                    self._cond.notify_all()
+
+    @staticmethod
+    def digest(alerts):
+        """(subject, body) for one alert or a batch of them."""
+        if len(alerts) == 1:
+            return alerts[0]["subject"], alerts[0]["body"]
+        subject = f"{len(alerts)} alerts: " + ", ".join(a["subject"] for a in alerts[:3]) + (" ..." if len(alerts) > 3 else "")
+        body = "\n\n".join(f"- {a['subject']}" + (f"\n  {a['body']}" if a["body"] else "") for a in alerts)
+        return subject, body
+
+    def _deliver(self, channel, recipient, alerts):
+        subject, body = self.digest(alerts)
+        if channel == "email":
+            if not self.smtp.configured:
+                raise NotConfigured("SMTP not configured")
+            self.smtp.send(recipient, subject, body)
+        elif channel == "webhook":
+            payload = {"alerts": [a["payload"] if a["payload"] is not None else {"subject": a["subject"], "body": a["body"]} for a in alerts]}
+            r = get_session().post(recipient, json=payload, timeout=10)
+            if r.status_code >= 400:
+                raise DeliveryError(f"webhook returned {r.status_code}")
+        else:
+            sid, token, from_num = os.getenv("TWILIO_SID", ""), os.getenv("TWILIO_TOKEN", ""), os.getenv("TWILIO_FROM", "")
+            if not sid or not token or not from_num:
+                raise NotConfigured("Twilio not configured")
+            text = subject if len(alerts) > 1 else f"{subject}: {body}" if body else subject
+            r = get_session().post(f"{self.twilio_base_url}/2010-04-01/Accounts/{sid}/Messages.json",
+                                   data={"From": from_num, "To": recipient, "Body": text[:SMS_MAX_CHARS]}, auth=(sid, token), timeout=10)
+            if r.status_code >= 400:
+                raise DeliveryError(f"Twilio returned {r.status_code}")
+
+    def flush(self, timeout=30.0):
+        """Send everything pending now (ignoring the digest window) and wait until delivered or failed."""
+        deadline = time.time() + timeout
+        with self._cond:
+            for entry in self._pending.values():
+                entry[0] = -self.digest_window
+            self._cond.notify_all()
+            while self._pending or self._inflight:
+                left = deadline - time.time()
+                if left <= 0:
+                    return False
+                self._cond.wait(min(left, 0.1))
+        return True
+
+    def close(self, timeout=30.0):
+        self.flush(timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for _ in self._threads[1:]:
+            self._work.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self.smtp.close()
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def default_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher()
+        return _dispatcher
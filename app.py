@@ -1,8 +1,10 @@
 import streamlit as st
-from data_feed import DataFeed
-from models.random_forest_model import RFModel
-from backtest.simulator import Backtester
-from portfolio.portfolio_manager import PortfolioManager
+from backtest import Backtester, strategy_simple_moving_average, grid_sweep, walk_forward
+from scoring import score_universe
+from model_compare import compare_models, best_per_horizon, HORIZONS
+from universe import universe_tickers
+from instrumentation import snapshot, counters
+from scan import get_services, StartEarlyScan
 import pandas as pd
 import numpy as np
 import os
@@ -16,9 +18,20 @@ API_KEYS = {
 
 st.title("Market Monitor — Phase 2 (Live Data • Backtest • Models • Portfolio)")
 
-# Initialize services
-df = DataFeed(api_keys=API_KEYS)
-pm = PortfolioManager(db_path="portfolio.db")
+@st.cache_resource
+def get_stream(token):
+    from streaming import QuoteStream
+    return QuoteStream.finnhub(token).start()
+
+@st.cache_data(ttl=900, show_spinner="Comparing model families across horizons...")
+def run_comparison(hist, ret_thresh=0.01):
+    # every horizon is trained in one pass, so switching horizon or rerunning reads this cached board
+    return compare_models(hist, ret_thresh=ret_thresh)
+
+# Initialize services (process-wide: reruns and sessions share the same clients and stage caches)
+services = get_services(API_KEYS)
+df = services.feed
+pm = services.portfolio
 
 tabs = st.tabs(["Live Data", "New to Investment (Live Signals)", "Backtest", "Models Comparison", "Portfolio & Paper trading"])
 
@@ -29,33 +42,46 @@ with tabs[0]:
     if st.button("Fetch Quote"):
         quote = df.get_quote(ticker, provider=provider)
         st.json(quote)
-    st.markdown("Realtime WebSocket streaming requires background workers — here we provide polling endpoints and example code in `data_feed.py`.")
+    if st.checkbox("Stream trades over WebSocket (Finnhub)") and API_KEYS["FINNHUB"]:
+        # one background connection per server process; quotes and paper orders read its latest trade
+        df.start_stream([ticker], stream=get_stream(API_KEYS["FINNHUB"]))
+        bars = df.stream.bars(ticker, "1m", n=120)
+        if bars.empty:
+            st.info("Waiting for trades (the stream only carries prints during market hours).")
+        else:
+            st.line_chart(bars.set_index("start")["close"])
 
 with tabs[1]:
     st.header("New to Investment — Live ML Signals")
     ticker2 = st.text_input("Ticker for signal:", value="AAPL", key="t2").upper()
     horizon = st.selectbox("Prediction horizon (days)", [1,2,3,5,7], index=1)
     lookback = st.slider("Lookback days for training", 60, 720, 180, step=30)
-    buy_thresh = st.number_input("Buy threshold (%)", value=2.0, step=0.5)
-    sell_thresh = st.number_input("Sell threshold (%)", value=-2.0, step=0.5)
+    buy_thresh = st.number_input("Buy above probability", value=0.6, min_value=0.0, max_value=1.0, step=0.05)
+    sell_thresh = st.number_input("Sell below probability", value=0.4, min_value=0.0, max_value=1.0, step=0.05)
     if st.button("Compute Signal"):
-        hist = df.get_historical(ticker2, provider="Finnhub", days=lookback+horizon)
+        hist = df.get_historical(ticker2, provider="Finnhub", days=lookback+max(HORIZONS))
         if hist is None or hist.empty:
             st.error("Historical data unavailable. Check API key & ticker.")
         else:
-            # baseline RF model
-            model = RFModel()
-            signal_res = model.run_full_pipeline(hist, horizon=horizon)
-            st.subheader("Prediction summary (baseline RF)")
-            st.write(signal_res["metrics"])
-            st.metric("Predicted % change", f'{signal_res["pred_pct"]:.2f}%')
-            recommendation = "HOLD"
-            if signal_res["pred_pct"] >= buy_thresh:
-                recommendation = "BUY"
-            elif signal_res["pred_pct"] <= sell_thresh:
-                recommendation = "SELL"
-            st.markdown(f"## Recommendation: **{recommendation}**")
-            st.line_chart(signal_res["recent_series"].set_index("date")["close"])
+            try:
+                best = best_per_horizon(run_comparison(hist)).loc[horizon]
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                prob_up = float(best["prob_last"])
+                st.subheader(f"Prediction summary (best model: {best['family']})")
+                st.write({"roc_auc": best["roc_auc"], "accuracy": best["accuracy"], "prob_up": prob_up})
+                # prob_last is NaN when the labels never had both classes, so there is nothing to act on
+                st.metric(f"Probability of a >1% rise in {horizon}d", "n/a" if np.isnan(prob_up) else f"{prob_up:.2f}")
+                recommendation = "HOLD"
+                if np.isnan(prob_up):
+                    st.warning("No usable prediction for this horizon.")
+                elif prob_up >= buy_thresh:
+                    recommendation = "BUY"
+                elif prob_up <= sell_thresh:
+                    recommendation = "SELL"
+                st.markdown(f"## Recommendation: **{recommendation}**")
+                st.line_chart(hist.tail(200).set_index("date")["close"])
 
 with tabs[2]:
     st.header("Backtest")
@@ -63,15 +89,32 @@ with tabs[2]:
     start = st.date_input("Start date", value=pd.to_datetime("2021-01-01"))
     end = st.date_input("End date", value=pd.to_datetime("2024-12-31"))
     initial_capital = st.number_input("Initial capital ($)", value=100000.0, step=1000.0)
+    c1, c2, c3 = st.columns(3)
+    sma_short = c1.number_input("Short SMA", value=10, min_value=2, step=1)
+    sma_long = c2.number_input("Long SMA", value=50, min_value=3, step=1)
+    fee_bps = c3.number_input("Fee per trade (bps)", value=1.0, step=0.5)
+    sweep = st.checkbox("Also sweep SMA parameters (grid + walk-forward)")
     if st.button("Run Backtest"):
         hist = df.get_historical(bt_ticker, provider="AlphaVantage", days=2000)  # fallback to AV for history
+        if hist is not None and not hist.empty:
+            hist = hist[(hist["date"] >= pd.Timestamp(start)) & (hist["date"] <= pd.Timestamp(end))]
         if hist is None or hist.empty:
             st.error("Historical data unavailable. Check API key & limits.")
         else:
-            backtester = Backtester(initial_capital=initial_capital)
-            res = backtester.run_signals(hist, strategy_simple_moving_average)
+            backtester = Backtester(initial_capital=initial_capital, fee_bps=fee_bps)
+            res = backtester.run_signals(hist, strategy_simple_moving_average, short=int(sma_short), long=int(sma_long))
             st.write(res["summary"])
-            st.line_chart(pd.DataFrame({"equity": res["equity_curve"]}))
+            st.line_chart(pd.DataFrame({"equity": res["equity_curve"]}, index=res["dates"]))
+            if sweep:
+                close = hist.sort_values("date")["close"].to_numpy(dtype=float)
+                grid = grid_sweep(close, range(2, 61), range(10, 251, 5), fee_bps=fee_bps)
+                st.subheader(f"Top SMA pairs ({len(grid)} evaluated)")
+                st.dataframe(grid.head(20))
+                folds, oos = walk_forward(close, range(2, 61, 2), range(10, 251, 10), fee_bps=fee_bps)
+                st.subheader("Walk-forward (out-of-sample)")
+                st.dataframe(folds)
+                if len(oos):
+                    st.line_chart(pd.DataFrame({"oos_equity": oos * initial_capital}))
 
 with tabs[3]:
     st.header("Models Comparison (Baseline + Advanced)")
@@ -82,12 +125,16 @@ with tabs[3]:
         if hist is None or hist.empty:
             st.error("Historical data unavailable.")
         else:
-            st.info("Training RandomForest (baseline). Advanced models will be attempted if libraries are installed.")
-            rf = RFModel()
-            rf_res = rf.run_full_pipeline(hist)
-            st.write("RandomForest metrics:", rf_res["metrics"])
-            # placeholders for advanced models
-            st.write("LSTM and other advanced models will run if TensorFlow/Darts/NeuralProphet are installed. Check README for install instructions.")
+            st.info("Random forest, histogram gradient boosting and logistic regression are trained for every horizon in parallel, scored with time-series cross-validation.")
+            try:
+                board = run_comparison(hist)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.dataframe(board.round(4))
+                st.subheader("Best model per horizon")
+                st.dataframe(best_per_horizon(board)[["family", "roc_auc", "accuracy", "brier", "prob_last"]].round(4))
+                st.caption(f"Total fit time across models: {board['fit_s'].sum():.1f}s (run concurrently)")
 
 with tabs[4]:
     st.header("Portfolio & Paper Trading")
@@ -104,8 +151,11 @@ with tabs[4]:
             if price is None:
                 st.error("Price unavailable. Try again.")
             else:
-                pm.place_order(symbol=sym, side="BUY", qty=qty, price=price)
-                st.success(f"Bought {qty} {sym} @ {price}")
+                try:
+                    pm.place_order(symbol=sym, side="BUY", qty=qty, price=price)
+                    st.success(f"Bought {qty} {sym} @ {price}")
+                except ValueError as e:
+                    st.error(str(e))
     with col2:
         sym2 = st.text_input("Sell ticker", value="AAPL", key="sell_sym")
         qty2 = st.number_input("Quantity to sell", value=1, step=1)
@@ -115,10 +165,19 @@ with tabs[4]:
             if price is None:
                 st.error("Price unavailable. Try again.")
             else:
-                pm.place_order(symbol=sym2, side="SELL", qty=qty2, price=price)
-                st.success(f"Sold {qty2} {sym2} @ {price}")
+                try:
+                    pm.place_order(symbol=sym2, side="SELL", qty=qty2, price=price)
+                    st.success(f"Sold {qty2} {sym2} @ {price}")
+                except ValueError as e:
+                    st.error(str(e))
     st.subheader("Open Positions")
-    st.dataframe(pm.list_positions())
+    positions = pm.list_positions()
+    if st.checkbox("Mark to market (live quotes)") and not positions.empty:
+        quotes = df.get_quotes_many(positions["symbol"].tolist())
+        prices = {s: q.get("c") for s, q in quotes.items() if isinstance(q, dict) and q.get("c")}
+        positions = pm.mark_to_market(prices)
+        st.metric("Account equity", f"${pm.get_balance() + positions['market_value'].sum():,.2f}")
+    st.dataframe(positions)
     st.subheader("Trade History")
     st.dataframe(pm.list_trades())
 
@@ -131,100 +190,57 @@ st.markdown("""**Important legal note:** This section only surfaces **publicly d
 
 se_ticker = st.text_input("Ticker to scan for early signals (public data):", value="AAPL", key="start_early_ticker").upper()
 if st.button("Scan Start-Early Signals"):
-    # 1) Insider trades (public filings) via Finnhub (if available)
-    insiders = df.get_insider_trades(se_ticker)
-    if isinstance(insiders, dict) and insiders.get("error"):
-        st.warning(f"Insider data unavailable: {insiders.get('error')}")
-        insiders_df = None
+    # insider filings, news buzz and history -> model prediction run concurrently; each stage is cached for a few minutes
+    res = StartEarlyScan(services).run(se_ticker, provider="Finnhub", days=180, horizon=3)
+    for stage, err in res["errors"].items():
+        st.warning(f"{stage} unavailable: {err}")
+
+    insiders_df = res["transactions"]
+    if insiders_df is None or insiders_df.empty:
+        st.info("No recent insider transactions found (public).")
     else:
-        try:
-            import pandas as _pd
-            insiders_df = _pd.DataFrame(insiders)
-            if insiders_df.empty:
-                st.info("No recent insider transactions found (public).")
-            else:
-                st.subheader("Recent Public Insider Transactions (Form 4 / Filings)")
-                st.dataframe(insiders_df.head(50))
-        except Exception as e:
-            st.error(f"Error parsing insider data: {e}")
-            insiders_df = None
-
-    # 2) News buzz (reuse simple RSS fetcher if available)
-    news_df = None
-    try:
-        news_df = df.fetch_news()
-    except Exception:
-        pass
-
-    # compute simple signals
-    insider_buy_score = 0
-    insider_sell_score = 0
-    if insiders_df is not None and not insiders_df.empty:
-        # heuristic: count 'Buy' vs 'Sell' transactions (different providers use different fields)
-        for col in insiders_df.columns:
-            pass
-        # try common keys
-        if "transactionType" in insiders_df.columns:
-            insider_buy_score = int((insiders_df["transactionType"].str.lower() == "buy").sum())
-            insider_sell_score = int((insiders_df["transactionType"].str.lower() == "sell").sum())
-        elif "transaction" in insiders_df.columns:
-            insider_buy_score = int((insiders_df["transaction"].str.lower().str.contains("buy")).sum())
-            insider_sell_score = int((insiders_df["transaction"].str.lower().str.contains("sell")).sum())
-        else:
-            # fallback: try 'change' or 'shares' direction if available
-            if "change" in insiders_df.columns:
-                insider_buy_score = int((insiders_df["change"].astype(float) > 0).sum())
-                insider_sell_score = int((insiders_df["change"].astype(float) < 0).sum())
-
-    news_buzz = 0
-    if news_df is not None and not news_df.empty:
-        # count keywords in recent headlines (72h)
-        import pandas as _pd, numpy as _np, re as _re, datetime as _dt
-        now = _pd.Timestamp.utcnow()
-        if "published" in news_df.columns:
-            try:
-                news_df["published_dt"] = _pd.to_datetime(news_df["published"], errors="coerce")
-                recent = news_df[news_df["published_dt"] >= now - _pd.Timedelta(hours=72)]
-            except Exception:
-                recent = news_df
-        else:
-            recent = news_df
-        keywords = ["acquir","merger","buyback","insider","partnership","contract","earnings","surge","growth","breakthrough","approval","patent","launch","hiring","expansion","ai","chip","semiconductor"]
-        cnt = 0
-        for k in keywords:
-            cnt += recent["title"].str.lower().str.count(k).fillna(0).sum() if "title" in recent.columns else 0
-        news_buzz = int(cnt)
-
-    # 3) Simple ML signal from RF baseline (quick predictive view)
-    pred_pct = None
-    try:
-        from models.random_forest_model import RFModel
-        hist = df.get_historical(se_ticker, provider="Finnhub", days=180)
-        if hist is not None and not hist.empty:
-            model = RFModel()
-            res = model.run_full_pipeline(hist, horizon=3)
-            pred_pct = res.get("pred_pct", None)
-            st.metric("Model predicted % change (3d horizon)", f"{pred_pct:.2f}%" if pred_pct is not None else "N/A")
-    except Exception as e:
-        st.info("Prediction unavailable: " + str(e))
-
-    # Combine heuristic score (weights adjustable)
-    score = 0.0
-    score += 2.0 * insider_buy_score
-    score -= 1.0 * insider_sell_score
-    score += 0.2 * news_buzz
-    if pred_pct is not None:
-        # scale predicted pct to score
-        score += 0.5 * max(min(pred_pct, 20), -20)
+        st.subheader("Recent Public Insider Transactions (Form 4 / Filings)")
+        st.dataframe(insiders_df.head(50))
 
-    st.subheader("Start-Early Composite Score")
-    st.write(f"Insider buy count: {insider_buy_score}, sell count: {insider_sell_score}, news buzz: {news_buzz}, model pred %: {pred_pct}")
-    st.metric("Composite early-opportunity score", round(score,2))
+    prob = res["prob_pos"]
+    if res["prediction"] is not None:
+        status = res["prediction"].get("metrics", {}).get("status")
+        st.metric("Model probability of a >1% rise (3d horizon)", f"{prob:.2f}" if prob is not None else f"N/A (model {status})")
 
-    if score >= 10:
+    st.subheader("Start-Early Composite Score")
+    # pred_pct is the probability rescaled to the score's +/-20 model term, not a forecast return
+    model_term = f"{res['pred_pct']:+.1f}" if res["pred_pct"] is not None else "n/a"
+    st.write(f"Insider buy count: {res['insider_buy']}, sell count: {res['insider_sell']}, news buzz: {res['news_buzz']}, model component: {model_term} (of ±20)")
+    st.metric("Composite early-opportunity score", round(res["score"],2))
+    st.caption("Stage seconds: " + ", ".join(f"{k} {v:.2f}" + (" (cached)" if res["cached"].get(k) else "") for k, v in res["timings"].items()))
+
+    level = res["signal"]
+    if level == "High":
         st.success("Signal: **High** — public filings + buzz + model suggest early opportunity. (Public data only)")
-    elif score >= 2:
+    elif level == "Moderate":
         st.info("Signal: **Moderate** — watch closely; consider further due diligence.")
     else:
         st.warning("Signal: **Low** — no strong public early indicators found.")
 
+st.subheader("Early-Opportunity Board (universe)")
+board_n = st.slider("Names to show", 5, 50, 20, key="board_n")
+if st.button("Rank Universe"):
+    tickers = universe_tickers()
+    # screened from the memory-mapped panel rather than one DataFrame per ticker
+    panel = df.build_panel(tickers, provider="Finnhub", days=180)
+    StartEarlyScan(services).news()
+    # insider counts come straight from the local EDGAR index (filled by Start-Early scans)
+    insiders = services.edgar.insider_scores(tickers, days=90, refresh=False)
+    board = score_universe(panel, services.classifier, insiders=insiders, buzz=services.buzz.buzz_many(tickers, "72h"), horizon=3, top_n=board_n)
+    if board.empty:
+        st.warning("No scorable tickers (check API keys, or run tasks.retrain_universe to train models).")
+    else:
+        st.dataframe(board)
+
+with st.expander("Diagnostics (timings and counters for this server process)"):
+    timings = snapshot()
+    if timings.empty:
+        st.caption("No instrumented calls yet.")
+    else:
+        st.dataframe(timings.round(2))
+    st.json(counters())
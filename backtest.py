@@ -0,0 +1,166 @@
+import os, tempfile, itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np, pandas as pd
+
+TRADING_DAYS = 252
+CHUNK = 256  # parameter sets evaluated together as one (k, n_bars) array
+
+def _sma(close, window):
+    """Trailing mean with NaN for the first window-1 bars (same as pandas rolling().mean())."""
+    out = np.full(len(close), np.nan)
+    if window <= len(close):
+        c = np.cumsum(np.insert(close, 0, 0.0))
+        out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+def strategy_simple_moving_average(df, short=10, long=50):
+    """signal = 1 while the short SMA is above the long one, -1 while below, 0 otherwise."""
+    df = df.copy()
+    close = df["close"].to_numpy(dtype=float)
+    df["s_short"] = _sma(close, short)
+    df["s_long"] = _sma(close, long)
+    df["signal"] = np.sign(np.nan_to_num(df["s_short"] - df["s_long"])).astype(int)
+    return df
+
+def signals_to_positions(signal):
+    """Long (1) after a buy signal, flat (0) after a sell; 0 holds the previous position. Works row-wise on 2-D input."""
+    sig = np.atleast_2d(np.asarray(signal, dtype=float))
+    idx = np.where(sig != 0, np.arange(sig.shape[1]), -1)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    last = np.take_along_axis(sig, np.maximum(idx, 0), axis=1)
+    pos = np.where((idx >= 0) & (last > 0), 1.0, 0.0)
+    return pos if np.ndim(signal) > 1 else pos[0]
+
+def simulate(close, positions, fee_bps=1.0, slippage_bps=0.0, initial_capital=1.0):
+    """Equity curves for one or many position rows.
+
+    Positions decided on bar t are filled at bar t+1's close, so they first earn the
+    t+1 -> t+2 return; every unit of turnover pays fee + slippage (in basis points) on
+    the fill bar. Returns (equity, strategy_returns, held), each shaped like
+    ``positions``; ``held`` is the position carried into each bar.
+    """
+    close = np.asarray(close, dtype=float)
+    pos = np.atleast_2d(np.asarray(positions, dtype=float))
+    ret = np.zeros_like(close)
+    ret[1:] = close[1:] / close[:-1] - 1.0
+    filled = np.zeros_like(pos)
+    filled[:, 1:] = pos[:, :-1]
+    held = np.zeros_like(pos)
+    held[:, 1:] = filled[:, :-1]
+    turnover = np.abs(np.diff(filled, axis=1, prepend=0.0))
+    strat = held * ret - turnover * (fee_bps + slippage_bps) / 1e4
+    equity = initial_capital * np.cumprod(1.0 + strat, axis=1)
+    if np.ndim(positions) == 1:
+        return equity[0], strat[0], held[0]
+    return equity, strat, held
+
+def summarize(equity, strat, held, initial_capital=1.0):
+    """Metrics per row: final capital, total return, max drawdown, annualised Sharpe, trades, exposure."""
+    equity, strat, held = (np.atleast_2d(a) for a in (equity, strat, held))
+    turnover = np.abs(np.diff(held, axis=1, prepend=0.0))
+    peak = np.maximum.accumulate(equity, axis=1)
+    std = strat.std(axis=1)
+    sharpe = np.divide(strat.mean(axis=1), std, out=np.zeros_like(std), where=std > 0) * np.sqrt(TRADING_DAYS)
+    return {
+        "final_capital": equity[:, -1],
+        "cum_return_pct": (equity[:, -1] / initial_capital - 1.0) * 100.0,
+        "max_drawdown_pct": ((equity - peak) / peak).min(axis=1) * 100.0,
+        "sharpe": sharpe,
+        "n_trades": (turnover > 0).sum(axis=1),
+        "exposure_pct": held.mean(axis=1) * 100.0,
+    }
+
+class Backtester:
+    def __init__(self, initial_capital=100000.0, fee_bps=1.0, slippage_bps=0.0):
+        self.initial_capital = initial_capital
+        self.fee_bps = fee_bps
+        self.slippage_bps = slippage_bps
+
+    def run_signals(self, df, strategy_func, **params):
+        """
+        df: DataFrame with date, close, volume
+        strategy_func: function(df, **params) -> df with 'signal' column (1 buy, -1 sell, 0 hold)
+        Returns equity curve and summary statistics.
+        """
+        df = df[['date','close','volume']].dropna().sort_values("date").reset_index(drop=True)
+        if df.empty:
+            return {"equity_curve": [], "summary": {"final_capital": self.initial_capital, "cum_return_pct": 0.0, "max_drawdown_pct": 0.0}}
+        df = strategy_func(df, **params)
+        pos = signals_to_positions(df["signal"].to_numpy())
+        equity, strat, held = simulate(df["close"].to_numpy(dtype=float), pos, self.fee_bps, self.slippage_bps, self.initial_capital)
+        summary = {k: float(v[0]) for k, v in summarize(equity, strat, held, self.initial_capital).items()}
+        summary["n_trades"] = int(summary["n_trades"])
+        return {"equity_curve": equity.tolist(), "positions": pos, "dates": df["date"], "summary": summary}
+
+    def max_drawdown(self, returns):
+        cum = (1 + pd.Series(returns)).cumprod()
+        peak = cum.cummax()
+        return float(((cum - peak) / peak).min() * 100.0)
+
+def sma_positions(close, params):
+    """Position matrix (len(params), n_bars) for [(short, long), ...] SMA crossovers."""
+    smas = {w: _sma(close, w) for w in {w for p in params for w in p}}
+    diff = np.vstack([smas[s] - smas[l] for s, l in params])
+    return signals_to_positions(np.sign(np.nan_to_num(diff)))
+
+def _evaluate(close, params, fee_bps, slippage_bps):
+    return summarize(*simulate(close, sma_positions(close, params), fee_bps, slippage_bps))
+
+def _sweep_chunk(path, n, params, fee_bps, slippage_bps):
+    # workers map the same read-only price file instead of receiving a pickled copy
+    close = np.memmap(path, dtype=np.float64, mode="r", shape=(n,))
+    return params, _evaluate(np.asarray(close), params, fee_bps, slippage_bps)
+
+def grid_sweep(close, shorts, longs, fee_bps=1.0, slippage_bps=0.0, max_workers=None):
+    """Evaluate every (short, long) SMA pair with short < long; returns a frame sorted by Sharpe.
+
+    Parameter sets are evaluated CHUNK at a time as array operations. With more than one
+    chunk they are spread over a process pool that shares the price series through a
+    read-only memory-mapped file.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    params = [(int(s), int(l)) for s, l in itertools.product(shorts, longs) if s < l]
+    chunks = [params[i:i + CHUNK] for i in range(0, len(params), CHUNK)]
+    results = []
+    if len(chunks) <= 1 or max_workers == 1:
+        results = [(c, _evaluate(close, c, fee_bps, slippage_bps)) for c in chunks]
+    else:
+        fd, path = tempfile.mkstemp(suffix=".f64")
+        os.close(fd)
+        try:
+            close.tofile(path)
+            with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(chunks))) as ex:
+                futs = [ex.submit(_sweep_chunk, path, len(close), c, fee_bps, slippage_bps) for c in chunks]
+                results = [f.result() for f in futs]
+        finally:
+            os.remove(path)
+    frames = [pd.DataFrame({"short": [p[0] for p in c], "long": [p[1] for p in c], **m}) for c, m in results]
+    if not frames:
+        return pd.DataFrame(columns=["short", "long", "final_capital", "cum_return_pct", "max_drawdown_pct", "sharpe", "n_trades", "exposure_pct"])
+    return pd.concat(frames, ignore_index=True).sort_values("sharpe", ascending=False).reset_index(drop=True)
+
+def walk_forward(close, shorts, longs, train=504, test=126, fee_bps=1.0, slippage_bps=0.0, max_workers=None):
+    """Rolling walk-forward: pick the best Sharpe (short, long) on each train window and trade it on the next test window.
+
+    Returns (folds frame, out-of-sample equity curve starting at 1.0).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    folds, oos = [], []
+    for start in range(0, len(close) - train - 1, test):
+        end = min(start + train + test, len(close))
+        best = grid_sweep(close[start:start + train], shorts, longs, fee_bps, slippage_bps, max_workers)
+        if best.empty:
+            break
+        s, l = int(best.loc[0, "short"]), int(best.loc[0, "long"])
+        # indicators warm up on the train window; its last bar's decision fills at the first test bar's close
+        seg = close[start:end]
+        equity, strat, held = simulate(seg[train - 1:], sma_positions(seg, [(s, l)])[:, train - 1:], fee_bps, slippage_bps)
+        m = summarize(equity, strat, held)
+        oos.append(strat[0, 1:])
+        folds.append({"train_start": start, "test_start": start + train, "test_end": end, "short": s, "long": l,
+                      "train_sharpe": float(best.loc[0, "sharpe"]), "test_sharpe": float(m["sharpe"][0]),
+                      "test_return_pct": float(m["cum_return_pct"][0])})
+        if end == len(close):
+            break
+    equity = np.cumprod(1.0 + np.concatenate(oos)) if oos else np.ones(0)
+    return pd.DataFrame(folds), equity
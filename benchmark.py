@@ -0,0 +1,315 @@
+"""Offline benchmark for the data, EDGAR, NLP and model hot paths.
+
+Synthetic OHLCV bars, headlines and Form 4 filings are served by a local HTTP stand-in
+that answers like Finnhub, AlphaVantage, RSS feeds and EDGAR, so every stage runs
+end to end without network access or API keys. For each universe size it reports
+calls, wall time, throughput and p50/p95/p99 latency per stage (from the
+instrumentation timers).
+
+    python benchmark.py --sizes 10 50 200 --out bench.csv
+    python benchmark.py --sizes 10 50 200 --baseline bench.csv   # exit 1 on p95 regressions
+"""
+import argparse, json, os, sys, shutil, tempfile, threading, time, zlib
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+import numpy as np, pandas as pd
+import data_feed, edgar
+from data_feed import DataFeed, parse_alphavantage, parse_finnhub
+from edgar import EdgarClient
+from ohlcv_cache import OHLCVCache
+from headline_store import HeadlineStore
+from model_registry import ModelRegistry
+from feature_engine import FeatureEngine
+from classifier_model import ClassifierModel
+from entity_index import TickerIndex, BuzzCounter
+from scoring import score_universe, composite_score, prob_to_pct
+from universe import UNIVERSE
+from instrumentation import METRICS, timer
+
+RESULT_COLUMNS = ["stage", "universe", "calls", "wall_s", "per_s", "p50_ms", "p95_ms", "p99_ms"]
+HEADLINES_PER_TICKER = 5
+FILINGS_PER_TICKER = 3
+N_FEEDS = 4
+
+# ---- synthetic data -------------------------------------------------------------------
+
+def synthetic_universe(n):
+    """``n`` ticker -> company name pairs: the real universe first, then SYNnnnn placeholders."""
+    names = dict(list(UNIVERSE.items())[:n])
+    for i in range(len(names), n):
+        names[f"SYN{i:04d}"] = f"Synthetic Holdings {i}"
+    return names
+
+def synthetic_ohlcv(ticker, days=750, seed=None):
+    """Business-day bars ending today from a geometric random walk (seeded by ticker)."""
+    rng = np.random.default_rng(seed if seed is not None else zlib.crc32(ticker.encode()))
+    dates = pd.bdate_range(end=pd.Timestamp.utcnow().tz_localize(None).normalize(), periods=days)
+    close = 50.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, days)))
+    spread = np.abs(rng.normal(0, 0.01, days)) * close
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    return pd.DataFrame({"date": dates, "open": open_, "high": np.maximum(open_, close) + spread,
+                         "low": np.minimum(open_, close) - spread, "close": close,
+                         "volume": rng.integers(100_000, 5_000_000, days)})
+
+def finnhub_candles(df):
+    return {"s": "ok", "t": (df["date"].astype("int64") // 10**9).tolist(), "o": df["open"].round(4).tolist(),
+            "h": df["high"].round(4).tolist(), "l": df["low"].round(4).tolist(), "c": df["close"].round(4).tolist(),
+            "v": df["volume"].tolist()}
+
+def alphavantage_daily(df):
+    series = {d.strftime("%Y-%m-%d"): {"1. open": f"{o:.4f}", "2. high": f"{h:.4f}", "3. low": f"{l:.4f}", "4. close": f"{c:.4f}",
+                                       "5. adjusted close": f"{c:.4f}", "6. volume": str(v)}
+              for d, o, h, l, c, v in zip(df["date"], df["open"], df["high"], df["low"], df["close"], df["volume"])}
+    return {"Meta Data": {}, "Time Series (Daily)": series}
+
+def synthetic_headlines(names, per_ticker=HEADLINES_PER_TICKER, seed=0):
+    """Headline dicts mentioning each company, spread over the last 72 hours."""
+    rng = np.random.default_rng(seed)
+    verbs = ["announces buyback", "beats earnings", "wins contract", "faces probe", "launches chip", "plans expansion"]
+    now = pd.Timestamp.utcnow()
+    rows = []
+    for ticker, name in names.items():
+        for j in range(per_ticker):
+            rows.append({"guid": f"bench-{ticker}-{j}", "title": f"{name} {verbs[rng.integers(len(verbs))]}",
+                         "link": f"https://example.com/{ticker}/{j}", "published": now - pd.Timedelta(minutes=int(rng.integers(1, 4320)))})
+    return rows
+
+def rss_xml(items):
+    body = "".join(f"<item><title>{escape(i['title'])}</title><link>{i['link']}</link><guid>{i['guid']}</guid>"
+                   f"<pubDate>{format_datetime(i['published'].to_pydatetime())}</pubDate></item>" for i in items)
+    return f"<?xml version='1.0'?><rss version='2.0'><channel><title>bench</title>{body}</channel></rss>"
+
+def synthetic_form4(ticker, cik, name, seq, n_tx=2, seed=0):
+    rng = np.random.default_rng(seed)
+    date = (pd.Timestamp.utcnow() - pd.Timedelta(days=int(rng.integers(0, 60)))).strftime("%Y-%m-%d")
+    txs = ""
+    for _ in range(n_tx):
+        code = "P" if rng.random() < 0.4 else "S"
+        txs += (f"<nonDerivativeTransaction><transactionDate><value>{date}</value></transactionDate>"
+                f"<transactionCoding><transactionCode>{code}</transactionCode></transactionCoding><transactionAmounts>"
+                f"<transactionShares><value>{int(rng.integers(100, 10000))}</value></transactionShares>"
+                f"<transactionPricePerShare><value>{rng.uniform(10, 500):.2f}</value></transactionPricePerShare>"
+                f"<transactionAcquiredDisposedCode><value>{'A' if code == 'P' else 'D'}</value></transactionAcquiredDisposedCode>"
+                f"</transactionAmounts><postTransactionAmounts><sharesOwnedFollowingTransaction><value>{int(rng.integers(1e4, 1e6))}</value>"
+                f"</sharesOwnedFollowingTransaction></postTransactionAmounts></nonDerivativeTransaction>")
+    return (f"<?xml version='1.0'?><ownershipDocument><issuer><issuerCik>{cik:010d}</issuerCik><issuerName>{escape(name)}</issuerName>"
+            f"<issuerTradingSymbol>{ticker}</issuerTradingSymbol></issuer><reportingOwner><reportingOwnerId>"
+            f"<rptOwnerCik>{9000000 + seq:010d}</rptOwnerCik><rptOwnerName>Insider {seq}</rptOwnerName></reportingOwnerId></reportingOwner>"
+            f"<nonDerivativeTable>{txs}</nonDerivativeTable></ownershipDocument>").encode()
+
+# ---- provider stand-in ----------------------------------------------------------------
+
+class StandIn:
+    """Threaded local HTTP server answering like Finnhub (/finnhub), AlphaVantage (/alphav),
+    RSS feeds (/rss/<i>.xml) and EDGAR (/sec) for a synthetic universe.
+
+    Feeds carry an ``ETag`` and answer a matching ``If-None-Match`` with 304, like real
+    publishers, so conditional polling is exercised; ``not_modified`` counts those replies."""
+    def __init__(self, names, days=750, n_feeds=N_FEEDS, host="127.0.0.1", port=0):
+        self.names = names
+        self.days = days
+        self.ciks = {t: 1000000 + i for i, t in enumerate(names)}
+        self.by_cik = {c: t for t, c in self.ciks.items()}
+        self._bars = {}
+        self._lock = threading.Lock()
+        self.not_modified = 0
+        headlines = synthetic_headlines(names)
+        self.feeds = [rss_xml(headlines[i::n_feeds]).encode() for i in range(n_feeds)]
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.base = f"http://{host}:{self.server.server_port}"
+        self._thread = None
+
+    def bars(self, ticker):
+        with self._lock:
+            if ticker not in self._bars:
+                self._bars[ticker] = synthetic_ohlcv(ticker, self.days)
+            return self._bars[ticker]
+
+    def accessions(self, cik):
+        return [f"{cik:010d}-24-{j:06d}" for j in range(FILINGS_PER_TICKER)]
+
+    def route(self, path, q):
+        arg = lambda k: (q.get(k) or [""])[0]
+        if path == "/finnhub/stock/candle":
+            df = self.bars(arg("symbol").upper())
+            ts = df["date"].astype("int64") // 10**9
+            df = df[(ts >= int(arg("from") or 0)) & (ts <= int(arg("to") or 2**40))]
+            return 200, json.dumps(finnhub_candles(df) if len(df) else {"s": "no_data"})
+        if path == "/finnhub/quote":
+            last = self.bars(arg("symbol").upper()).iloc[-1]
+            return 200, json.dumps({"c": last["close"], "o": last["open"], "h": last["high"], "l": last["low"], "pc": last["close"]})
+        if path == "/alphav/query":
+            df = self.bars(arg("symbol").upper())
+            return 200, json.dumps(alphavantage_daily(df.tail(100) if arg("outputsize") == "compact" else df))
+        if path.startswith("/rss/"):
+            return 200, self.feeds[int(path[5:].split(".")[0]) % len(self.feeds)]
+        if path == "/sec/files/company_tickers.json":
+            return 200, json.dumps({str(i): {"cik_str": c, "ticker": t, "title": self.names[t]} for i, (t, c) in enumerate(self.ciks.items())})
+        if path == "/sec/cgi-bin/browse-edgar":
+            cik = int(arg("CIK"))
+            entries = "".join(f"<entry><title>4 - {escape(self.names.get(self.by_cik.get(cik), ''))}</title>"
+                              f"<link href='{self.base}/sec/Archives/edgar/data/{cik}/{a.replace('-', '')}/{a}-index.htm'/>"
+                              f"<id>urn:tag:sec.gov,2008:accession-number={a}</id><updated>2024-01-02T00:00:00-05:00</updated></entry>"
+                              for a in self.accessions(cik))
+            return 200, f"<?xml version='1.0'?><feed xmlns='http://www.w3.org/2005/Atom'><title>bench</title>{entries}</feed>"
+        if path.startswith("/sec/Archives/edgar/data/"):
+            parts = path.split("/")
+            cik, folder = int(parts[5]), parts[6]
+            if parts[-1] == "index.json":
+                return 200, json.dumps({"directory": {"item": [{"name": "FilingSummary.xml"}, {"name": "form4.xml"}]}})
+            if parts[-1] == "form4.xml":
+                ticker = self.by_cik.get(cik, "")
+                return 200, synthetic_form4(ticker, cik, self.names.get(ticker, ""), int(folder[-6:]), seed=int(folder[-6:]) + cik)
+        return 404, ""
+
+    def _handler(self):
+        standin = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so the pooled session reuses connections
+            def log_message(self, *args):
+                pass
+            def do_GET(self):
+                u = urlparse(self.path)
+                status, body = standin.route(u.path, parse_qs(u.query))
+                body = body.encode() if isinstance(body, str) else body
+                etag = f'"{zlib.crc32(body):08x}"' if status == 200 and u.path.startswith("/rss/") else None
+                if etag is not None and self.headers.get("If-None-Match") == etag:
+                    with standin._lock:
+                        standin.not_modified += 1
+                    status, body = 304, b""
+                self.send_response(status)
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="bench-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ---- stages ---------------------------------------------------------------------------
+
+def _stage(rows, stage, size, metric, n_items, fn):
+    """Run ``fn`` with fresh timers and record throughput plus the latency of ``metric`` calls."""
+    METRICS.reset()
+    start = time.perf_counter()
+    out = fn()
+    wall = time.perf_counter() - start
+    snap = METRICS.snapshot().set_index("name")
+    m = snap.loc[metric] if metric in snap.index else None
+    rows.append({"stage": stage, "universe": size, "calls": int(m["calls"]) if m is not None else n_items, "wall_s": wall,
+                 "per_s": n_items / wall if wall > 0 else np.nan, "p50_ms": m["p50_ms"] if m is not None else np.nan,
+                 "p95_ms": m["p95_ms"] if m is not None else np.nan, "p99_ms": m["p99_ms"] if m is not None else np.nan})
+    return out
+
+def run(sizes=(10, 50), days=750, train_tickers=2, scan_tickers=10, workdir=None):
+    """Benchmark every stage for each universe size; returns a results frame (RESULT_COLUMNS)."""
+    # the stand-in is local, so provider quotas do not apply while it runs
+    limits, sec_rate = dict(data_feed.RATE_LIMITS), edgar.SEC_RATE_PER_MIN
+    data_feed.RATE_LIMITS.update(finnhub=1e9, alphavantage=1e9)
+    edgar.SEC_RATE_PER_MIN = 1e9
+    try:
+        return _run(sizes, days, train_tickers, scan_tickers, workdir)
+    finally:
+        data_feed.RATE_LIMITS.clear()
+        data_feed.RATE_LIMITS.update(limits)
+        edgar.SEC_RATE_PER_MIN = sec_rate
+
+def _run(sizes, days, train_tickers, scan_tickers, workdir):
+    rows = []
+    for size in sizes:
+        names = synthetic_universe(size)
+        tickers = list(names)
+        tmp = tempfile.mkdtemp(prefix="mm-bench-", dir=workdir)
+        standin = StandIn(names, days=days).start()
+        try:
+            token = f"bench-{os.getpid()}-{size}-{time.time()}"
+            feed = DataFeed(api_keys={"FINNHUB": token, "ALPHAV": token}, cache=OHLCVCache(os.path.join(tmp, "ohlcv.db")),
+                            headlines=HeadlineStore(os.path.join(tmp, "headlines.db")),
+                            base_urls={"finnhub": f"{standin.base}/finnhub", "alphavantage": f"{standin.base}/alphav"})
+            fin = {t: finnhub_candles(standin.bars(t)) for t in tickers}
+            av = {t: alphavantage_daily(standin.bars(t)) for t in tickers}
+            _stage(rows, "parse_finnhub", size, "data_feed.parse_finnhub", size, lambda: [parse_finnhub(p) for p in fin.values()])
+            _stage(rows, "parse_alphavantage", size, "data_feed.parse_alphavantage", size, lambda: [parse_alphavantage(p) for p in av.values()])
+            _stage(rows, "get_historical (cold)", size, "data_feed.get_historical", size,
+                   lambda: feed.get_historical_many(tickers, provider="Finnhub", days=days))
+            hists = _stage(rows, "get_historical (cached)", size, "data_feed.get_historical", size,
+                           lambda: feed.get_historical_many(tickers, provider="Finnhub", days=days))
+            feeds = {f"bench{i}": f"{standin.base}/rss/{i}.xml" for i in range(N_FEEDS)}
+            headlines = _stage(rows, "fetch_rss_feeds", size, "data_feed.rss_feed", size * HEADLINES_PER_TICKER,
+                               lambda: feed.fetch_rss_feeds(feeds=feeds, new_only=True))
+            # the feeds are unchanged, so every poll is answered 304 from the saved ETags
+            _stage(rows, "fetch_rss_feeds (304)", size, "data_feed.rss_feed", N_FEEDS, lambda: feed.fetch_rss_feeds(feeds=feeds, new_only=True))
+            client = EdgarClient(db_path=os.path.join(tmp, "edgar.db"), base_url=f"{standin.base}/sec")
+            insiders = _stage(rows, "edgar crawl + parse", size, "edgar.crawl_form4", size * FILINGS_PER_TICKER,
+                              lambda: client.insider_scores(tickers))
+            _stage(rows, "edgar insider query", size, "edgar.insider_query", size, lambda: client.insider_scores(tickers, refresh=False))
+            clf = ClassifierModel(features=FeatureEngine(), registry=ModelRegistry(root=os.path.join(tmp, "registry")))
+            _stage(rows, "featurize", size, "classifier.featurize", size, lambda: [clf.featurize(hists[t]) for t in tickers])
+            train_on = tickers[:train_tickers]
+            _stage(rows, "train", size, "classifier.train", len(train_on), lambda: [clf.train(hists[t], n_jobs=-1) for t in train_on])
+            _stage(rows, "predict_from_signals", size, "classifier.predict_from_signals", size,
+                   lambda: [clf.predict_from_signals(hists[t], ticker=t) for t in tickers])
+            index, counter = TickerIndex(names), BuzzCounter()
+            counter.ingest(headlines, index)
+            _stage(rows, "score_universe", size, "scoring.score_universe", size,
+                   lambda: score_universe(hists, clf, insiders=insiders, buzz=counter.buzz_many(tickers), horizon=3, top_n=size))
+            panel = _stage(rows, "build_panel", size, "data_feed.build_panel", size,
+                           lambda: feed.build_panel(tickers, provider="Finnhub", days=days, path=os.path.join(tmp, "panel")))
+            _stage(rows, "score_universe (panel)", size, "scoring.score_universe", size,
+                   lambda: score_universe(panel, clf, insiders=insiders, buzz=counter.buzz_many(tickers), horizon=3, top_n=size))
+            def scan(t):
+                # the app's single-ticker Start-Early flow without the UI
+                with timer("bench.start_early_scan"):
+                    counts = client.insider_scores(t)
+                    counter.ingest(feed.fetch_rss_feeds(feeds=feeds, new_only=True), index)
+                    res = clf.predict_from_signals(feed.get_historical(t, provider="Finnhub", days=180), ticker=t)
+                    return composite_score(counts.loc[t, "buy"], counts.loc[t, "sell"], counter.buzz(t), prob_to_pct(res["prob_pos"]))
+            scanned = tickers[:scan_tickers]
+            _stage(rows, "start_early_scan", size, "bench.start_early_scan", len(scanned), lambda: [scan(t) for t in scanned])
+        finally:
+            standin.stop()
+            shutil.rmtree(tmp, ignore_errors=True)
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+def regressions(results, baseline, tolerance=0.25):
+    """Rows whose p95 latency grew by more than ``tolerance`` against a baseline results frame."""
+    merged = results.merge(baseline, on=["stage", "universe"], suffixes=("", "_base"))
+    merged["p95_change"] = merged["p95_ms"] / merged["p95_ms_base"] - 1.0
+    return merged[merged["p95_change"] > tolerance][["stage", "universe", "p95_ms_base", "p95_ms", "p95_change"]]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline benchmark of Market Monitor hot paths.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 50])
+    ap.add_argument("--days", type=int, default=750, help="bars per synthetic ticker")
+    ap.add_argument("--train-tickers", type=int, default=2)
+    ap.add_argument("--scan-tickers", type=int, default=10)
+    ap.add_argument("--out", help="write results to this CSV")
+    ap.add_argument("--baseline", help="compare p95 latencies with an earlier results CSV")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args(argv)
+    results = run(args.sizes, days=args.days, train_tickers=args.train_tickers, scan_tickers=args.scan_tickers)
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(results.round(3).to_string(index=False))
+    if args.out:
+        results.to_csv(args.out, index=False)
+    if args.baseline:
+        worse = regressions(results, pd.read_csv(args.baseline), args.tolerance)
+        if not worse.empty:
+            print("\nRegressions (p95):")
+            print(worse.round(3).to_string(index=False))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,26 @@
-import pandas as pd, numpy as np
+import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, roc_auc_score
-import joblib, os
+import os, threading
+from concurrent.futures import ThreadPoolExecutor
+from feature_engine import FEATURES, default_engine, latest_features
+from model_registry import default_registry, data_fingerprint
+from instrumentation import timed
+
+_training = ThreadPoolExecutor(max_workers=1)
+_pending = set()
+_pending_lock = threading.Lock()
 
 class ClassifierModel:
-    def __init__(self, model_path="classifier_model.pkl"):
+    def __init__(self, model_path=None, features=None, registry=None, scope="universe"):
+        # model_path: optional legacy single pickle, used only when the registry has no model
         self.model_path = model_path
+        self.features = features if features is not None else default_engine()
+        self.registry = registry if registry is not None else default_registry()
+        self.scope = scope
         self.model = None
-        if os.path.exists(self.model_path):
-            try:
-                self.model = joblib.load(self.model_path)
-            except Exception:
-                self.model = None
+        self.meta = None
 
     def create_labels(self, df, horizon=3, ret_thresh=0.01):
         df = df.copy().sort_values("date").reset_index(drop=True)
@@ -22,6 +30,7 @@ class ClassifierModel:
         df = df.dropna().reset_index(drop=True)
         return df
 
+    @timed("classifier.featurize")
     def featurize(self, df):
         df = df.copy().sort_values("date").reset_index(drop=True)
         df["ret1"] = df["close"].pct_change().fillna(0)
@@ -29,39 +38,82 @@ class ClassifierModel:
             df[f"lag{lag}"] = df["close"].shift(lag).fillna(method="bfill")
         df["ma10"] = df["close"].rolling(10).mean().fillna(method="bfill")
         df["vol_ma10"] = df["volume"].rolling(10).mean().fillna(0)
-        features = ["ret1","lag1","lag2","lag3","lag4","lag5","ma10","vol_ma10"]
-        return df, df[features]
+        return df, df[FEATURES]
 
-    def train(self, df, horizon=3, ret_thresh=0.01):
+    @timed("classifier.train")
+    def train(self, df, horizon=3, ret_thresh=0.01, scope=None, n_jobs=-1):
+        """Fit, evaluate and publish a forest for one key; returns its hold-out metrics.
+
+        ``n_jobs`` defaults to every core for interactive and background training; callers
+        running inside a process pool (``tasks.retrain_universe``) pass their per-worker share.
+        """
         df_l = self.create_labels(df, horizon=horizon, ret_thresh=ret_thresh)
         df_feats, X = self.featurize(df_l)
         y = df_l["label"]
         if len(X) < 50:
             raise ValueError("Not enough data to train classifier (need ~50 rows).")
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-        clf = RandomForestClassifier(n_estimators=200, random_state=42)
+        clf = RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=n_jobs)
         clf.fit(X_train, y_train)
         preds = clf.predict(X_test)
         proba = clf.predict_proba(X_test)[:,1]
         metrics = {"accuracy": float(accuracy_score(y_test, preds)), "roc_auc": float(roc_auc_score(y_test, proba))}
         self.model = clf
-        try:
-            joblib.dump(clf, self.model_path)
-        except Exception:
-            pass
+        self.meta = self.registry.publish(scope or self.scope, horizon, ret_thresh, clf, data_fingerprint(df), metrics)
         return metrics
 
-    def predict_from_signals(self, hist, forms_df=None, headlines_df=None, horizon=3):
-        if hist is None or hist.empty:
-            return {"prob_pos":0.0, "metrics":{}, "features":{}}
-        df, X = self.featurize(hist)
-        lastX = X.iloc[[-1]]
-        if self.model is None:
+    def resolve(self, horizon=3, ret_thresh=0.01, ticker=None):
+        """(estimator, meta) for the ticker, else for this instance's scope, else the legacy pickle.
+
+        Registry models are never loaded on the caller's thread (see ``ModelRegistry.current``):
+        ``(None, meta)`` means a published model is still loading, ``(None, None)`` that none exists.
+        Nothing is stored on the instance, so one ClassifierModel can serve concurrent callers.
+        """
+        loading = None
+        for scope in ([ticker] if ticker else []) + [self.scope]:
+            model, meta = self.registry.current(scope, horizon, ret_thresh)
+            if model is not None:
+                return model, meta
+            loading = loading or meta
+        if loading is not None:
+            return None, loading
+        if self.model_path and os.path.exists(self.model_path):
+            return self.registry.load(os.path.abspath(self.model_path)), None
+        return None, None
+
+    def train_async(self, hist, horizon=3, ret_thresh=0.01, scope=None):
+        """Queue a background train for a key; repeated requests while it is pending are dropped."""
+        key = self.registry.key(scope or self.scope, horizon, ret_thresh)
+        with _pending_lock:
+            if key in _pending:
+                return False
+            _pending.add(key)
+        def job():
             try:
-                self.train(hist, horizon=horizon)
+                ClassifierModel(features=self.features, registry=self.registry, scope=scope or self.scope).train(hist, horizon=horizon, ret_thresh=ret_thresh)
             except Exception:
                 pass
-        if self.model is None:
+            finally:
+                with _pending_lock:
+                    _pending.discard(key)
+        _training.submit(job)
+        return True
+
+    @timed("classifier.predict_from_signals")
+    def predict_from_signals(self, hist, forms_df=None, headlines_df=None, horizon=3, ticker=None, ret_thresh=0.01):
+        if hist is None or hist.empty:
             return {"prob_pos":0.0, "metrics":{}, "features":{}}
-        proba = float(self.model.predict_proba(lastX)[0][1])
-        return {"prob_pos": proba, "metrics":{}, "features":{}}
\ No newline at end of file
+        # only the latest row is scored, so keep rolling state per ticker instead of featurizing the whole history
+        row = self.features.sync(ticker, hist) if ticker else latest_features(hist)
+        lastX = pd.DataFrame([row], columns=FEATURES)
+        model, meta = self.resolve(horizon, ret_thresh, ticker=ticker)
+        if model is None:
+            if meta is not None:
+                # published but not in memory yet; the background load serves the next call
+                return {"prob_pos":0.0, "metrics":{"status":"loading"}, "features":row}
+            # never train inside the request: queue one and report that no model is ready yet
+            self.train_async(hist, horizon=horizon, ret_thresh=ret_thresh, scope=ticker or self.scope)
+            return {"prob_pos":0.0, "metrics":{"status":"training"}, "features":row}
+        proba = float(model.predict_proba(lastX)[0][1])
+        metrics = meta.get("metrics", {}) if meta else {}
+        return {"prob_pos": proba, "metrics":metrics, "features":row}
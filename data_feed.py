@@ -1,60 +1,241 @@
-import os, requests, pandas as pd, time
-from datetime import datetime, timedelta
+import os, pandas as pd, numpy as np, time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import feedparser
+from ohlcv_cache import OHLCVCache, EARLIEST
+from http_pool import get_bucket, get_json, request, RateLimited, POOL_SIZE
+from headline_store import HeadlineStore
+from price_panel import PricePanel, DEFAULT_PATH as PANEL_PATH
+from instrumentation import timed, incr
+
+# requests per minute allowed by each provider plan (free tiers by default)
+RATE_LIMITS = {
+    "finnhub": float(os.getenv("FINNHUB_RATE_PER_MIN", "60") or 60),
+    "alphavantage": float(os.getenv("ALPHAV_RATE_PER_MIN", "5") or 5),
+}
+RSS_FEEDS = {
+    "Reuters Business":"http://feeds.reuters.com/reuters/businessNews",
+    "CNBC Tech":"https://www.cnbc.com/id/19854910/device/rss/rss.html",
+    "The Verge":"https://www.theverge.com/rss/index.xml",
+    "CoinDesk":"https://www.coindesk.com/arc/outboundfeeds/rss/"
+}
+# overridable so the feed can run against mirrors or local stand-ins (see benchmark.py)
+BASE_URLS = {
+    "finnhub": os.getenv("FINNHUB_BASE_URL", "https://finnhub.io/api/v1"),
+    "alphavantage": os.getenv("ALPHAV_BASE_URL", "https://www.alphavantage.co"),
+}
+STREAM_MAX_AGE = 60.0  # seconds a streamed trade is trusted before falling back to REST
+MAX_WORKERS = int(os.getenv("DATAFEED_MAX_WORKERS", "8") or 8)
+
+AV_FIELDS = {"1. open": "open", "2. high": "high", "3. low": "low", "4. close": "close", "6. volume": "volume"}
+HIST_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+@timed("data_feed.parse_alphavantage")
+def parse_alphavantage(payload):
+    """Daily-adjusted payload -> history frame, converting whole columns at once."""
+    series = payload.get("Time Series (Daily)") or {}
+    if not series:
+        return pd.DataFrame(columns=HIST_COLUMNS)
+    raw = pd.DataFrame.from_dict(series, orient="index", columns=list(AV_FIELDS))
+    df = pd.DataFrame({"date": pd.to_datetime(raw.index, format="%Y-%m-%d")})
+    for src_col, col in AV_FIELDS.items():
+        df[col] = raw[src_col].to_numpy(dtype=float)
+    df["volume"] = df["volume"].astype("int64")
+    return df.sort_values("date").reset_index(drop=True)
+
+@timed("data_feed.parse_finnhub")
+def parse_finnhub(payload):
+    """Candle payload (parallel t/o/h/l/c/v arrays) -> history frame."""
+    t = np.asarray(payload["t"], dtype=np.int64)
+    return pd.DataFrame({"date": pd.to_datetime(t, unit="s").normalize(),
+                         "open": np.asarray(payload["o"], dtype=float), "high": np.asarray(payload["h"], dtype=float),
+                         "low": np.asarray(payload["l"], dtype=float), "close": np.asarray(payload["c"], dtype=float),
+                         "volume": np.asarray(payload["v"], dtype=float).astype(np.int64)})
+
+def _check_alphavantage(r):
+    # AlphaVantage answers 200 with a "Note"/"Information" body when the quota is hit
+    try:
+        body = r.json()
+    except ValueError:
+        return
+    if isinstance(body, dict) and ("Note" in body or "Information" in body) and len(body) == 1:
+        raise RateLimited(body.get("Note") or body.get("Information"))
 
 class DataFeed:
-    def __init__(self, api_keys=None):
+    def __init__(self, api_keys=None, cache=None, use_cache=True, headlines=None, base_urls=None):
         if api_keys is None:
             api_keys = {}
         self.finnhub = api_keys.get("FINNHUB", os.getenv("FINNHUB_API_KEY",""))
         self.alphav = api_keys.get("ALPHAV", os.getenv("ALPHAV_API_KEY",""))
+        # daily bars are kept on disk and only the missing tail is re-downloaded
+        self.cache = cache if cache is not None else (OHLCVCache() if use_cache else None)
+        self.headlines = headlines if headlines is not None else HeadlineStore()
+        self.stream = None
+        self.base_urls = {k: v.rstrip("/") for k, v in {**BASE_URLS, **(base_urls or {})}.items()}
 
-    def fetch_rss_feeds(self):
-        feeds = {
-            "Reuters Business":"http://feeds.reuters.com/reuters/businessNews",
-            "CNBC Tech":"https://www.cnbc.com/id/19854910/device/rss/rss.html",
-            "The Verge":"https://www.theverge.com/rss/index.xml",
-            "CoinDesk":"https://www.coindesk.com/arc/outboundfeeds/rss/"
-        }
-        rows = []
-        for name,url in feeds.items():
-            try:
-                d = feedparser.parse(url)
-                for e in d.entries[:200]:
-                    rows.append({"source":name,"title":e.get("title"),"link":e.get("link"),"published":e.get("published")})
-            except Exception:
-                continue
-        df = pd.DataFrame(rows)
-        if not df.empty:
+    def _get_json(self, key, url):
+        token = self.alphav if key == "alphavantage" else self.finnhub
+        bucket = get_bucket(f"{key}:{token}", RATE_LIMITS[key])
+        check = _check_alphavantage if key == "alphavantage" else None
+        return get_json(url, bucket=bucket, check=check)
+
+    def start_stream(self, symbols, stream=None):
+        """Stream trades for ``symbols`` over one Finnhub websocket; get_quote then reads from memory."""
+        from streaming import QuoteStream
+        if self.stream is None:
+            self.stream = (stream or QuoteStream.finnhub(self.finnhub)).start()
+        self.stream.subscribe(symbols)
+        return self.stream
+
+    def get_quote(self, ticker, provider="Finnhub", max_age=STREAM_MAX_AGE):
+        ticker = ticker.strip().upper() if ticker else ""
+        if not ticker:
+            return {"error": "empty ticker"}
+        if self.stream is not None:
+            q = self.stream.latest(ticker, max_age=max_age)
+            if q is not None:
+                return q
+        key = self._provider_key(provider) or self._provider_key("Finnhub") or self._provider_key("AlphaVantage")
+        if key is None:
+            return {"error": "no API key configured for quotes"}
+        try:
+            if key == "finnhub":
+                q = self._get_json(key, f"{self.base_urls['finnhub']}/quote?symbol={ticker}&token={self.finnhub}")
+                if not q or not q.get("c"):
+                    return {"error": f"no quote for {ticker}"}
+                return dict(q, symbol=ticker)
+            q = self._get_json(key, f"{self.base_urls['alphavantage']}/query?function=GLOBAL_QUOTE&symbol={ticker}&apikey={self.alphav}").get("Global Quote", {})
+            if not q.get("05. price"):
+                return {"error": f"no quote for {ticker}"}
+            return {"symbol": ticker, "c": float(q["05. price"]), "o": float(q["02. open"]), "h": float(q["03. high"]),
+                    "l": float(q["04. low"]), "pc": float(q["08. previous close"]), "v": int(q["06. volume"])}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _map(self, fn, tickers, max_workers):
+        tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        if not tickers:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers or MAX_WORKERS, len(tickers))) as ex:
+            return dict(zip(tickers, ex.map(fn, tickers)))
+
+    def get_quotes_many(self, tickers, provider="Finnhub", max_workers=None):
+        """Quotes for many tickers, fetched concurrently within the provider rate limit."""
+        return self._map(lambda t: self.get_quote(t, provider=provider), tickers, max_workers)
+
+    def get_historical_many(self, tickers, provider="AlphaVantage", days=365, max_workers=None):
+        """Dict of ticker -> history. A ticker that fails yields an empty frame."""
+        def fetch(t):
             try:
-                df['published'] = pd.to_datetime(df['published'], errors='coerce')
+                return self.get_historical(t, provider=provider, days=days)
             except Exception:
-                pass
-        return df
+                return pd.DataFrame()
+        return self._map(fetch, tickers, max_workers)
+
+    @timed("data_feed.fetch_rss_feeds")
+    def fetch_rss_feeds(self, feeds=None, new_only=False, max_workers=None):
+        """Poll all feeds concurrently and append unseen entries to the headline store.
+
+        Returns only the newly stored headlines when ``new_only`` is set, otherwise everything
+        in the store (newest first).
+        """
+        feeds = feeds or RSS_FEEDS
+        # feeds are I/O bound, so allow one worker per feed up to the pool size
+        with ThreadPoolExecutor(max_workers=min(max_workers or POOL_SIZE, len(feeds))) as ex:
+            batches = list(ex.map(lambda item: self._fetch_feed(*item), feeds.items()))
+        new = self.headlines.add([row for rows, _ in batches for row in rows])
+        # validators advance only once their entries are stored, so a failed add is refetched next poll
+        for _, validators in batches:
+            if validators is not None:
+                self.headlines.save_feed_state(*validators)
+        return new if new_only else self.headlines.load()
+
+    @timed("data_feed.rss_feed")
+    def _fetch_feed(self, name, url):
+        """(rows, validators) for one feed; validators is (url, etag, modified) to save after the rows are stored."""
+        state = self.headlines.feed_state(url)
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
+        try:
+            r = request("GET", url, retries=1, timeout=15, headers=headers)
+            if r.status_code == 304 or r.status_code >= 400:
+                return [], None
+            d = feedparser.parse(r.content)
+        except Exception:
+            return [], None
+        rows = []
+        for e in d.entries[:200]:
+            published = e.get("published_parsed") or e.get("updated_parsed")
+            rows.append({"guid": e.get("id") or e.get("link"), "source": name, "title": e.get("title"), "link": e.get("link"),
+                         "published": time.strftime("%Y-%m-%d %H:%M:%S", published) if published else None})
+        return rows, (url, r.headers.get("ETag"), r.headers.get("Last-Modified"))
 
+    @timed("data_feed.get_historical")
     def get_historical(self, ticker, provider="AlphaVantage", days=365):
         ticker = ticker.strip().upper() if ticker else ""
         if not ticker:
             return pd.DataFrame()
-        if provider.lower().startswith("alpha") and self.alphav:
-            url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={ticker}&outputsize=full&apikey={self.alphav}"
-            r = requests.get(url, timeout=20)
-            data = r.json().get("Time Series (Daily)",{})
-            rows = []
-            for dt,vals in data.items():
-                rows.append({"date":pd.to_datetime(dt),"open":float(vals["1. open"]),"high":float(vals["2. high"]),"low":float(vals["3. low"]),"close":float(vals["4. close"]),"volume":int(vals["6. volume"])})
-            df = pd.DataFrame(rows).sort_values("date")
-            cutoff = pd.Timestamp.utcnow() - pd.Timedelta(days=days)
-            return df[df.date>=cutoff]
-        # fallback: try Finnhub API
-        if provider.lower().startswith("finn") and self.finnhub:
-            to_ts = int(datetime.utcnow().timestamp())
-            frm_ts = int((datetime.utcnow() - timedelta(days=days)).timestamp())
-            url = f"https://finnhub.io/api/v1/stock/candle?symbol={ticker}&resolution=D&from={frm_ts}&to={to_ts}&token={self.finnhub}"
-            r = requests.get(url, timeout=20)
-            data = r.json()
-            if data.get("s") != "ok":
+        key = self._provider_key(provider)
+        if key is None:
+            return pd.DataFrame()
+        start = (pd.Timestamp.utcnow().tz_localize(None) - pd.Timedelta(days=days)).normalize()
+        if self.cache is None:
+            df, _ = self._fetch_history(key, ticker, start)
+            return df[df.date >= start].reset_index(drop=True) if not df.empty else df
+        info = self.cache.info(key, ticker)
+        covered = info is not None and pd.Timestamp(info["covered_from"]) <= start
+        if not (covered and self.cache.is_fresh(info)):
+            incr("ohlcv_cache.miss")
+            # only ask the provider for bars after the last stored one when the window is already covered
+            since = pd.Timestamp(info["last_date"]) if covered and info["last_date"] else None
+            df, covered_from = self._fetch_history(key, ticker, start, since=since)
+            if covered_from is not None:
+                self.cache.store(key, ticker, df, covered_from)
+            elif info is None:
                 return pd.DataFrame()
-            df = pd.DataFrame({"date":pd.to_datetime(data["t"],unit='s'),"open":data["o"],"high":data["h"],"low":data["l"],"close":data["c"],"volume":data["v"]})
-            return df
-        return pd.DataFrame()
\ No newline at end of file
+        else:
+            incr("ohlcv_cache.hit")
+        return self.cache.load(key, ticker, start)
+
+    def _provider_key(self, provider):
+        p = (provider or "").lower()
+        if p.startswith("alpha") and self.alphav:
+            return "alphavantage"
+        if p.startswith("finn") and self.finnhub:
+            return "finnhub"
+        return None
+
+    @timed("data_feed.fetch_history")
+    def _fetch_history(self, key, ticker, start, since=None):
+        """Download bars from ``since`` (or ``start`` when None).
+
+        Returns (df, covered_from); covered_from is None when the provider returned nothing usable.
+        """
+        if key == "alphavantage":
+            # compact output holds the latest 100 bars, enough to top up a recent series
+            compact = since is not None and (pd.Timestamp.utcnow().tz_localize(None) - since).days < 140
+            outputsize = "compact" if compact else "full"
+            url = f"{self.base_urls['alphavantage']}/query?function=TIME_SERIES_DAILY_ADJUSTED&symbol={ticker}&outputsize={outputsize}&apikey={self.alphav}"
+            df = parse_alphavantage(self._get_json(key, url))
+            if df.empty:
+                return df, None
+            return df, (since if compact else EARLIEST)
+        frm = since if since is not None else start
+        to_ts = int(datetime.utcnow().timestamp())
+        frm_ts = int(frm.timestamp())
+        url = f"{self.base_urls['finnhub']}/stock/candle?symbol={ticker}&resolution=D&from={frm_ts}&to={to_ts}&token={self.finnhub}"
+        data = self._get_json(key, url)
+        if data.get("s") == "no_data":
+            return pd.DataFrame(), frm
+        if data.get("s") != "ok":
+            return pd.DataFrame(), None
+        return parse_finnhub(data), frm
+
+    @timed("data_feed.build_panel")
+    def build_panel(self, tickers, provider="AlphaVantage", days=365, path=None):
+        """Fetch the universe and merge it into the memory-mapped price panel."""
+        frames = self.get_historical_many(tickers, provider=provider, days=days)
+        return PricePanel.update(frames, path or PANEL_PATH)
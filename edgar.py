@@ -1,14 +1,292 @@
+import os, io, re, sqlite3, threading, time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 import feedparser, requests, pandas as pd
+from http_pool import request, get_bucket
+from instrumentation import timed
+
+SEC_BASE = os.getenv("SEC_BASE_URL", "https://www.sec.gov")
+# SEC asks automated clients to identify themselves and stay under 10 requests/second
+SEC_USER_AGENT = os.getenv("SEC_USER_AGENT", "MarketMonitor research admin@example.com")
+SEC_RATE_PER_MIN = float(os.getenv("SEC_RATE_PER_MIN", "480") or 480)
+EDGAR_DB = os.getenv("EDGAR_DB_PATH", "edgar.db")
+CRAWL_MAX_AGE = 3600  # seconds before an issuer's Form 4 feed is polled again
+TICKERS_MAX_AGE = 86400
+BUY_CODES = ("P",)   # open-market purchase
+SELL_CODES = ("S",)  # open-market sale
+TX_COLUMNS = ["accession", "seq", "issuer_cik", "ticker", "insider", "insider_cik", "date", "code", "acq_disp",
+              "shares", "price", "owned_after", "derivative"]
+_ACCESSION = re.compile(r"(\d{10}-\d{2}-\d{6})")
+
+def _text(elem, path):
+    node = elem.find(path)
+    return node.text.strip() if node is not None and node.text else None
+
+def _num(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+@timed("edgar.parse_form4")
+def parse_form4(data):
+    """Stream-parse a Form 4 ownership document into (issuer dict, [transaction dict, ...])."""
+    issuer, owner, rows = {}, {}, []
+    for _, elem in ET.iterparse(io.BytesIO(data), events=("end",)):
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag == "issuer":
+            issuer = {"cik": int(_text(elem, "issuerCik") or 0), "name": _text(elem, "issuerName"),
+                      "ticker": (_text(elem, "issuerTradingSymbol") or "").upper() or None}
+            elem.clear()
+        elif tag == "reportingOwnerId" and not owner:
+            owner = {"insider": _text(elem, "rptOwnerName"), "insider_cik": int(_text(elem, "rptOwnerCik") or 0)}
+        elif tag in ("nonDerivativeTransaction", "derivativeTransaction"):
+            rows.append({
+                "date": _text(elem, "transactionDate/value"),
+                "code": _text(elem, "transactionCoding/transactionCode"),
+                "acq_disp": _text(elem, "transactionAmounts/transactionAcquiredDisposedCode/value"),
+                "shares": _num(_text(elem, "transactionAmounts/transactionShares/value")),
+                "price": _num(_text(elem, "transactionAmounts/transactionPricePerShare/value")),
+                "owned_after": _num(_text(elem, "postTransactionAmounts/sharesOwnedFollowingTransaction/value")),
+                "derivative": int(tag == "derivativeTransaction"),
+            })
+            elem.clear()
+    for r in rows:
+        r.update(owner)
+    return issuer, rows
+
+class EdgarIndex:
+    """Local SQLite index of companies, Form 4 filings and their parsed transactions."""
+    def __init__(self, path=EDGAR_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS companies (cik INTEGER, ticker TEXT, name TEXT, name_key TEXT, PRIMARY KEY (cik, ticker))")
+        conn.execute("CREATE INDEX IF NOT EXISTS companies_ticker ON companies (ticker)")
+        conn.execute("CREATE INDEX IF NOT EXISTS companies_name ON companies (name_key)")
+        conn.execute("CREATE TABLE IF NOT EXISTS filings (accession TEXT PRIMARY KEY, issuer_cik INTEGER, filed TEXT, link TEXT, parsed INTEGER)")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS transactions ({', '.join(TX_COLUMNS)}, PRIMARY KEY (accession, seq))")
+        conn.execute("CREATE INDEX IF NOT EXISTS tx_ticker_date ON transactions (ticker, date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS tx_issuer_date ON transactions (issuer_cik, date)")
+        conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, updated_at REAL)")
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _write(self, fn):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return fn(conn)
+            finally:
+                conn.close()
+
+    def _query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def touched(self, key):
+        row = self._query("SELECT updated_at FROM state WHERE key=?", (key,))
+        return row[0][0] if row else None
+
+    def touch(self, key):
+        self._write(lambda c: c.execute("INSERT OR REPLACE INTO state VALUES (?,?)", (key, time.time())))
+
+    def upsert_companies(self, rows):
+        """rows: iterable of (cik, ticker, name)."""
+        data = [(int(cik), (t or "").upper(), name, (name or "").lower()) for cik, t, name in rows]
+        self._write(lambda c: c.executemany("INSERT OR REPLACE INTO companies VALUES (?,?,?,?)", data))
+
+    def lookup(self, text, limit=10):
+        """Companies whose ticker equals ``text`` or whose name starts with it (indexed prefix range scan).
+
+        Exact ticker matches come first, then names where ``text`` is the whole name or a whole
+        first word, shortest first, so "apple" finds Apple Inc. before Apple Hospitality REIT
+        and Applied Materials.
+        """
+        text = (text or "").strip()
+        if not text:
+            return []
+        key = text.lower()
+        rows = self._query("SELECT cik, ticker, name FROM companies WHERE ticker=?", (text.upper(),))
+        rows += self._query("""SELECT cik, ticker, name FROM companies WHERE name_key >= ? AND name_key < ?
+                               ORDER BY substr(name_key, ?, 1) GLOB '[a-z0-9]', length(name_key), name_key LIMIT ?""",
+                            (key, key + "￿", len(key) + 1, limit))
+        out = []
+        for r in rows:
+            if r not in out:
+                out.append(r)
+        return [{"cik": c, "ticker": t, "name": n} for c, t, n in out[:limit]]
+
+    def known_accessions(self, accessions):
+        if not accessions:
+            return set()
+        q = f"SELECT accession FROM filings WHERE parsed=1 AND accession IN ({','.join('?' * len(accessions))})"
+        return {r[0] for r in self._query(q, list(accessions))}
+
+    def add_filing(self, accession, issuer_cik, filed, link, issuer, rows):
+        ticker = issuer.get("ticker")
+        data = [(accession, i, issuer.get("cik") or issuer_cik, ticker, r.get("insider"), r.get("insider_cik"), r["date"], r["code"],
+                 r["acq_disp"], r["shares"], r["price"], r["owned_after"], r["derivative"]) for i, r in enumerate(rows)]
+        def write(c):
+            c.execute("INSERT OR REPLACE INTO filings VALUES (?,?,?,?,1)", (accession, issuer_cik, filed, link))
+            c.execute("DELETE FROM transactions WHERE accession=?", (accession,))
+            c.executemany(f"INSERT INTO transactions VALUES ({','.join('?' * len(TX_COLUMNS))})", data)
+            if ticker and issuer.get("cik"):
+                c.execute("INSERT OR IGNORE INTO companies VALUES (?,?,?,?)", (issuer["cik"], ticker, issuer.get("name"), (issuer.get("name") or "").lower()))
+        self._write(write)
+
+    def _where(self, ticker=None, cik=None, days=None):
+        clauses, params = [], []
+        if ticker:
+            clauses.append("ticker=?")
+            params.append(ticker.upper())
+        if cik:
+            clauses.append("issuer_cik=?")
+            params.append(int(cik))
+        if days:
+            clauses.append("date >= ?")
+            params.append((pd.Timestamp.utcnow() - pd.Timedelta(days=days)).strftime("%Y-%m-%d"))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def transactions(self, ticker=None, cik=None, days=None, limit=500):
+        where, params = self._where(ticker, cik, days)
+        conn = self._connect()
+        df = pd.read_sql_query(f"SELECT * FROM transactions{where} ORDER BY date DESC, accession, seq LIMIT {int(limit)}", conn, params=params)
+        conn.close()
+        return df
+
+    @timed("edgar.insider_query")
+    def insider_counts(self, tickers, days=90):
+        """Frame indexed by ticker with open-market ``buy``/``sell`` transaction counts and net shares."""
+        tickers = [t.upper() for t in tickers]
+        cols = ["buy", "sell", "net_shares"]
+        if not tickers:
+            return pd.DataFrame(columns=cols)
+        since = (pd.Timestamp.utcnow() - pd.Timedelta(days=days)).strftime("%Y-%m-%d")
+        buys, sells = ",".join("?" * len(BUY_CODES)), ",".join("?" * len(SELL_CODES))
+        rows = self._query(f"""SELECT ticker, SUM(code IN ({buys})), SUM(code IN ({sells})),
+                                      SUM(CASE WHEN acq_disp='A' THEN shares WHEN acq_disp='D' THEN -shares ELSE 0 END)
+                               FROM transactions WHERE derivative=0 AND date >= ? AND ticker IN ({','.join('?' * len(tickers))})
+                               GROUP BY ticker""", (*BUY_CODES, *SELL_CODES, since, *tickers))
+        df = pd.DataFrame(rows, columns=["ticker"] + cols).set_index("ticker")
+        df = df.reindex(tickers).fillna(0)
+        return df.astype({"buy": int, "sell": int})
+
 class EdgarClient:
-    def __init__(self):
-        pass
+    def __init__(self, db_path=EDGAR_DB, base_url=SEC_BASE, user_agent=SEC_USER_AGENT, max_workers=4):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"}
+        self.index = EdgarIndex(db_path)
+        self.max_workers = max_workers
+        self._bucket = get_bucket(f"sec:{self.base_url}", SEC_RATE_PER_MIN)
+
+    def _get(self, url):
+        r = request("GET", url, bucket=self._bucket, headers=self.headers, timeout=20)
+        r.raise_for_status()
+        return r
+
+    def load_company_tickers(self, force=False):
+        """Refresh the ticker/name -> CIK table from company_tickers.json (at most daily)."""
+        updated = self.index.touched("company_tickers")
+        if not force and updated and time.time() - updated < TICKERS_MAX_AGE:
+            return 0
+        data = self._get(f"{self.base_url}/files/company_tickers.json").json()
+        rows = [(v["cik_str"], v.get("ticker"), v.get("title")) for v in data.values()]
+        self.index.upsert_companies(rows)
+        self.index.touch("company_tickers")
+        return len(rows)
+
+    def resolve_cik(self, text):
+        text = (text or "").strip()
+        if not text:
+            return None
+        if text.isdigit():
+            return int(text)
+        matches = self.index.lookup(text, limit=1)
+        if not matches:
+            try:
+                self.load_company_tickers()
+            except (requests.RequestException, ValueError):
+                return None
+            matches = self.index.lookup(text, limit=1)
+        return matches[0]["cik"] if matches else None
+
     def get_form4_by_cik(self, cik, count=80):
-        url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK={cik}&type=4&owner=only&count={count}&output=atom"
-        d = feedparser.parse(url)
+        url = f"{self.base_url}/cgi-bin/browse-edgar?action=getcompany&CIK={cik}&type=4&owner=only&count={count}&output=atom"
+        try:
+            d = feedparser.parse(self._get(url).content)
+        except requests.RequestException:
+            return pd.DataFrame(columns=["title", "link", "published", "accession"])
         rows = []
         for e in d.entries:
-            rows.append({"title": e.get("title"), "link": e.get("link"), "published": e.get("published")})
-        return pd.DataFrame(rows)
+            m = _ACCESSION.search(e.get("id", "") + " " + e.get("link", ""))
+            rows.append({"title": e.get("title"), "link": e.get("link"), "published": e.get("published"), "accession": m.group(1) if m else None})
+        return pd.DataFrame(rows, columns=["title", "link", "published", "accession"])
+
+    def _fetch_filing(self, cik, row):
+        # the filing index link sits in the filing folder; index.json lists the ownership XML
+        folder = row["link"].rsplit("/", 1)[0]
+        items = self._get(f"{folder}/index.json").json().get("directory", {}).get("item", [])
+        xml = [i["name"] for i in items if i.get("name", "").lower().endswith(".xml") and "summary" not in i["name"].lower()]
+        if not xml:
+            return row, {}, []
+        issuer, rows = parse_form4(self._get(f"{folder}/{xml[0]}").content)
+        return row, issuer, rows
+
+    @timed("edgar.crawl_form4")
+    def crawl_form4(self, cik, count=80, max_age=CRAWL_MAX_AGE):
+        """Fetch and parse Form 4 filings for an issuer that are not yet in the local index. Returns how many were added."""
+        cik = int(cik)
+        key = f"form4:{cik}"
+        updated = self.index.touched(key)
+        if updated and time.time() - updated < max_age:
+            return 0
+        feed = self.get_form4_by_cik(cik, count=count)
+        feed = feed[feed["accession"].notna()]
+        known = self.index.known_accessions(feed["accession"].tolist())
+        todo = [r for r in feed.to_dict("records") if r["accession"] not in known]
+        added = 0
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(todo))) as ex:
+                for fut in [ex.submit(self._fetch_filing, cik, r) for r in todo]:
+                    try:
+                        row, issuer, txs = fut.result()
+                    except (requests.RequestException, ET.ParseError, ValueError):
+                        continue
+                    self.index.add_filing(row["accession"], cik, row["published"], row["link"], issuer, txs)
+                    added += 1
+        self.index.touch(key)
+        return added
+
     def search_company_forms(self, text, count=80):
-        # lightweight fallback (returns empty df if not implemented)
-        return pd.DataFrame()
\ No newline at end of file
+        """Parsed Form 4 transactions for a ticker, company-name prefix or CIK (crawled incrementally, served locally)."""
+        cik = self.resolve_cik(text)
+        if cik is None:
+            return pd.DataFrame(columns=TX_COLUMNS)
+        try:
+            self.crawl_form4(cik, count=count)
+        except requests.RequestException:
+            pass
+        return self.index.transactions(cik=cik)
+
+    def insider_scores(self, tickers, days=90, refresh=True):
+        """Open-market buy/sell counts per ticker from the local index, crawling stale issuers first."""
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        if refresh:
+            for t in tickers:
+                cik = self.resolve_cik(t)
+                if cik is None:
+                    continue
+                try:
+                    self.crawl_form4(cik)
+                except requests.RequestException:
+                    continue
+        return self.index.insider_counts(tickers, days=days)
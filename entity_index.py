@@ -0,0 +1,144 @@
+import re, time, heapq, threading
+import pandas as pd
+from universe import universe_names
+
+# substrings counted as "news buzz" (same list and substring semantics the Start-Early scan used)
+BUZZ_KEYWORDS = ["acquir","merger","buyback","insider","partnership","contract","earnings","surge","growth","breakthrough",
+                 "approval","patent","launch","hiring","expansion","ai","chip","semiconductor"]
+WINDOWS = {"1h": 3600, "24h": 86400, "72h": 259200}
+BUCKET_SECONDS = 300
+ALL = "*"  # counter key for keyword hits across every headline
+
+def _alternation(words):
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+class TickerIndex:
+    """One compiled regex mapping headline text to tickers and buzz-keyword hits in a single pass.
+
+    Company names/aliases match case-insensitively on word boundaries; ticker symbols match
+    case-sensitively as whole words (single-letter symbols only with a ``$`` prefix);
+    keywords match case-insensitively anywhere, like ``str.count`` did.
+    """
+    def __init__(self, names, keywords=BUZZ_KEYWORDS):
+        self.alias_to_ticker = {}
+        for ticker, aliases in names.items():
+            aliases = [aliases] if isinstance(aliases, str) else list(aliases or [])
+            for a in aliases:
+                if a:
+                    self.alias_to_ticker.setdefault(a.lower(), ticker.upper())
+        self.tickers = {t.upper() for t in names}
+        bare = [t for t in self.tickers if len(t) > 1]
+        parts = []
+        if self.alias_to_ticker:
+            parts.append(rf"(?P<name>\b(?i:{_alternation(self.alias_to_ticker)})\b)")
+        if self.tickers:
+            sym = [rf"\$(?:{_alternation(self.tickers)})\b"] + ([rf"(?<![\w$])(?:{_alternation(bare)})\b"] if bare else [])
+            parts.append(f"(?P<sym>{'|'.join(sym)})")
+        if keywords:
+            parts.append(rf"(?P<kw>(?i:{_alternation(keywords)}))")
+        self.pattern = re.compile("|".join(parts)) if parts else None
+
+    @classmethod
+    def from_universe(cls, universe=None):
+        return cls(universe_names(universe))
+
+    def scan(self, text):
+        """(list of (matched text, ticker), keyword hit count) for one headline."""
+        if not text or self.pattern is None:
+            return [], 0
+        matches, hits = [], 0
+        for m in self.pattern.finditer(text):
+            kind = m.lastgroup
+            if kind == "kw":
+                hits += 1
+            elif kind == "name":
+                matches.append((m.group(), self.alias_to_ticker[m.group().lower()]))
+            else:
+                matches.append((m.group(), m.group().lstrip("$")))
+        return matches, hits
+
+class BuzzCounter:
+    """Per-key sliding-window counters over fixed time buckets.
+
+    Each (key, window) keeps a running sum and a heap of live buckets, so adding an
+    event (even out of time order) and reading a window are amortised O(1).
+    Headlines are de-duplicated by GUID for as long as the largest window.
+    """
+    def __init__(self, windows=WINDOWS, bucket=BUCKET_SECONDS, clock=time.time):
+        self.windows = dict(windows)
+        self.bucket = bucket
+        self.clock = clock
+        self._state = {}   # (key, window) -> [sum, heap, {bucket: count}]
+        self._seen = {}    # guid -> event time
+        self._lock = threading.Lock()
+
+    def _evict(self, key, window, now):
+        st = self._state.get((key, window))
+        if st is None:
+            return None
+        horizon = now - self.windows[window]
+        heap, counts = st[1], st[2]
+        while heap and heap[0] + self.bucket <= horizon:
+            st[0] -= counts.pop(heapq.heappop(heap))
+        return st
+
+    def add(self, key, ts, n=1):
+        now = self.clock()
+        b = int(ts // self.bucket * self.bucket)
+        with self._lock:
+            for w, span in self.windows.items():
+                if b + self.bucket <= now - span:
+                    continue
+                st = self._state.setdefault((key, w), [0, [], {}])
+                if b not in st[2]:
+                    heapq.heappush(st[1], b)
+                    st[2][b] = 0
+                st[2][b] += n
+                st[0] += n
+
+    def buzz(self, key, window="72h"):
+        with self._lock:
+            st = self._evict(key, window, self.clock())
+            return st[0] if st is not None else 0
+
+    def buzz_many(self, keys, window="72h"):
+        return {k: self.buzz(k, window) for k in keys}
+
+    def ingest(self, headlines_df, index, text_col="title"):
+        """Count unseen headlines: each mention of a ticker plus keyword hits go to that ticker, all hits to ALL."""
+        if headlines_df is None or headlines_df.empty or text_col not in headlines_df.columns:
+            return 0
+        now = self.clock()
+        horizon = now - max(self.windows.values())
+        guids = headlines_df["guid"] if "guid" in headlines_df.columns else headlines_df.get("link", headlines_df[text_col])
+        published = pd.to_datetime(headlines_df["published"], errors="coerce", utc=True) if "published" in headlines_df.columns else None
+        fresh = []
+        # prune, check and claim GUIDs in one critical section so concurrent ingests never double count
+        with self._lock:
+            for g, t in list(self._seen.items()):
+                if t < horizon:
+                    del self._seen[g]
+            for i, (guid, text) in enumerate(zip(guids, headlines_df[text_col])):
+                ts = now
+                if published is not None and not pd.isna(published.iloc[i]):
+                    ts = published.iloc[i].timestamp()
+                if ts < horizon or (guid is not None and guid in self._seen):
+                    continue
+                if guid is not None:
+                    self._seen[guid] = ts
+                fresh.append((ts, text))
+        for ts, text in fresh:
+            matches, hits = index.scan(text)
+            if hits:
+                self.add(ALL, ts, hits)
+            for ticker in {tk for _, tk in matches}:
+                self.add(ticker, ts, 1 + hits)
+        return len(fresh)
+
+_default_index = None
+
+def default_index():
+    global _default_index
+    if _default_index is None:
+        _default_index = TickerIndex.from_universe()
+    return _default_index
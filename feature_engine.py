@@ -0,0 +1,168 @@
+import math, threading
+import pandas as pd
+
+FEATURES = ["ret1","lag1","lag2","lag3","lag4","lag5","ma10","vol_ma10"]
+SCHEMA_VERSION = 1  # bump whenever FEATURES or their definition change; keys saved models
+WINDOW = 10
+N_LAGS = 5
+RESYNC_EVERY = 1000  # recompute running sums from the buffer to stop float drift
+
+class _TickerState:
+    """Ring buffers and running sums for one ticker; ``lock`` serializes its writers."""
+    __slots__ = ("n", "last_date", "dates", "closes", "volumes", "close_sum", "vol_sum", "row", "lock")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.n = 0
+        self.last_date = None
+        self.dates = [None] * WINDOW
+        self.closes = [0.0] * WINDOW
+        self.volumes = [0.0] * WINDOW
+        self.close_sum = 0.0
+        self.vol_sum = 0.0
+        self.row = None
+
+    def push(self, date, close, volume):
+        close, volume = float(close), float(volume)
+        i = self.n
+        slot = i % WINDOW
+        if i >= WINDOW:
+            self.close_sum -= self.closes[slot]
+            self.vol_sum -= self.volumes[slot]
+        self.dates[slot] = date
+        self.closes[slot] = close
+        self.volumes[slot] = volume
+        self.close_sum += close
+        self.vol_sum += volume
+        self.n = i + 1
+        self.last_date = date
+        if self.n % RESYNC_EVERY == 0:
+            self.close_sum = math.fsum(self.closes)
+            self.vol_sum = math.fsum(self.volumes)
+        return self._score()
+
+    def revise(self, close, volume):
+        """Replace the last bar (same date, revised values) and re-score it."""
+        close, volume = float(close), float(volume)
+        slot = (self.n - 1) % WINDOW
+        self.close_sum += close - self.closes[slot]
+        self.vol_sum += volume - self.volumes[slot]
+        self.closes[slot] = close
+        self.volumes[slot] = volume
+        return self._score()
+
+    def matches(self, hist):
+        """Whether ``hist`` (sorted by date) agrees with the stored bars over the dates both cover.
+
+        The last stored bar may be revised, so only its date has to agree; an older bar with a
+        different date or close means the history came from elsewhere (another provider, or a
+        restated series) and the running state no longer describes it.
+        """
+        stored = [i % WINDOW for i in range(max(0, self.n - WINDOW), self.n)]
+        seen = hist[(hist["date"] >= self.dates[stored[0]]) & (hist["date"] <= self.last_date)]
+        if seen.empty:
+            return True
+        dates = [pd.Timestamp(d) for d in seen["date"]]
+        stored = [j for j in stored if dates[0] <= self.dates[j] <= dates[-1]]
+        if dates != [self.dates[j] for j in stored]:
+            return False
+        return all(math.isclose(c, self.closes[j], rel_tol=1e-9) for c, j in zip(seen["close"].to_numpy(dtype=float), stored)
+                   if self.dates[j] != self.last_date)
+
+    def _score(self):
+        i = self.n - 1
+        close = self.closes[i % WINDOW]
+        prev = self.closes[(i - 1) % WINDOW] if i else None
+        full = self.n >= WINDOW
+        row = {"ret1": close / prev - 1.0 if prev is not None else 0.0}
+        for lag in range(1, N_LAGS + 1):
+            row[f"lag{lag}"] = self.closes[(i - lag) % WINDOW] if i >= lag else float("nan")
+        row["ma10"] = self.close_sum / WINDOW if full else float("nan")
+        row["vol_ma10"] = self.vol_sum / WINDOW if full else 0.0
+        self.row = row
+        return row
+
+class FeatureEngine:
+    """Per-ticker incremental version of ``ClassifierModel.featurize``.
+
+    Each new bar is O(1). The row returned after a bar equals the last row of
+    ``featurize`` over the same history (lags and ``ma10`` are NaN until enough
+    bars exist, exactly as the back-filled batch columns are on their last row).
+    Each ticker's state has its own lock, so concurrent callers only wait on each
+    other for the same ticker.
+    """
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, ticker):
+        with self._lock:
+            st = self._states.get(ticker)
+            if st is None:
+                st = self._states[ticker] = _TickerState()
+            return st
+
+    def update(self, ticker, date, close, volume):
+        """Push one bar. A bar on the last seen date replaces it; earlier bars are ignored."""
+        st = self._state(ticker)
+        date = pd.Timestamp(date)
+        with st.lock:
+            if st.last_date is not None and date <= st.last_date:
+                return st.revise(close, volume) if date == st.last_date else st.row
+            return st.push(date, close, volume)
+
+    def sync(self, ticker, hist):
+        """Feed the bars of ``hist`` from the last date the engine has seen on (re-scoring a revised
+        last bar) and return the latest row. If ``hist`` disagrees with the stored bars the
+        ticker's state is rebuilt from ``hist``."""
+        if hist is None or hist.empty:
+            return self.latest(ticker)
+        st = self._state(ticker)
+        hist = hist.sort_values("date")
+        with st.lock:
+            if st.last_date is not None and not st.matches(hist):
+                st.clear()
+            if st.last_date is None:
+                # older bars cannot influence the latest row once the window is full
+                hist = hist.tail(WINDOW)
+            else:
+                hist = hist[hist["date"] >= st.last_date]
+            for d, c, v in zip(hist["date"], hist["close"], hist["volume"]):
+                d = pd.Timestamp(d)
+                if d == st.last_date:
+                    st.revise(c, v)
+                else:
+                    st.push(d, c, v)
+            return st.row
+
+    def latest(self, ticker):
+        st = self._states.get(ticker)
+        return st.row if st is not None else None
+
+    def latest_frame(self, tickers=None):
+        """Latest feature rows indexed by ticker, in ``FEATURES`` column order."""
+        tickers = list(self._states) if tickers is None else tickers
+        rows = {t: self._states[t].row for t in tickers if t in self._states and self._states[t].row is not None}
+        return pd.DataFrame.from_dict(rows, orient="index", columns=FEATURES)
+
+    def reset(self, ticker=None):
+        with self._lock:
+            if ticker is None:
+                self._states.clear()
+            else:
+                self._states.pop(ticker, None)
+
+def latest_features(hist):
+    """Last featurize() row for ``hist`` computed from its final bars only."""
+    st = _TickerState()
+    for d, c, v in zip(*(hist.sort_values("date").tail(WINDOW)[col] for col in ("date", "close", "volume"))):
+        st.push(d, c, v)
+    return st.row
+
+_default = FeatureEngine()
+
+def default_engine():
+    return _default
@@ -0,0 +1,88 @@
+import os, sqlite3, threading, time
+import pandas as pd
+
+DEFAULT_DB = os.getenv("HEADLINE_STORE_PATH", "headlines.db")
+RETENTION_DAYS = float(os.getenv("HEADLINE_RETENTION_DAYS", "7") or 7)
+COLUMNS = ["guid", "source", "title", "link", "published", "fetched_at"]
+
+class HeadlineStore:
+    """Persistent headline log deduplicated by GUID and link, plus per-feed ETag/Last-Modified state.
+
+    Retention is by publication time (fetch time for undated entries), and entries published
+    before the retention window are never inserted, so an old item still listed by a feed
+    does not come back as new once pruned.
+    """
+    def __init__(self, path=DEFAULT_DB, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._ensure_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _ensure_db(self):
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS headlines (guid TEXT PRIMARY KEY, source TEXT, title TEXT, link TEXT UNIQUE, published TEXT, fetched_at REAL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS headlines_fetched ON headlines (fetched_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS headlines_published ON headlines (published)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS feeds (url TEXT PRIMARY KEY, etag TEXT, modified TEXT, checked_at REAL)""")
+        conn.commit()
+        conn.close()
+
+    def feed_state(self, url):
+        conn = self._connect()
+        row = conn.execute("SELECT etag, modified FROM feeds WHERE url=?", (url,)).fetchone()
+        conn.close()
+        return {"etag": row[0], "modified": row[1]} if row else {}
+
+    def save_feed_state(self, url, etag=None, modified=None):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO feeds VALUES (?,?,?,?)", (url, etag, modified, time.time()))
+            conn.close()
+
+    def add(self, rows):
+        """Insert headline dicts, skipping known GUIDs/links. Returns a frame of the rows that were new."""
+        now = time.time()
+        cutoff = now - self.retention_days * 86400
+        cutoff_str = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(cutoff))
+        new = []
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for r in rows:
+                    guid = r.get("guid") or r.get("link") or r.get("title")
+                    if not guid or (r.get("published") and r["published"] < cutoff_str):
+                        continue
+                    cur = conn.execute("INSERT OR IGNORE INTO headlines VALUES (?,?,?,?,?,?)",
+                                       (guid, r.get("source"), r.get("title"), r.get("link"), r.get("published"), now))
+                    if cur.rowcount:
+                        new.append(dict(r, guid=guid, fetched_at=now))
+                conn.execute("DELETE FROM headlines WHERE published < ? OR (published IS NULL AND fetched_at < ?)", (cutoff_str, cutoff))
+            conn.close()
+        return self._frame(pd.DataFrame(new, columns=COLUMNS))
+
+    def load(self, since=None, limit=None):
+        """Stored headlines, newest first; ``since`` filters on publication time."""
+        q = "SELECT guid, source, title, link, published, fetched_at FROM headlines"
+        params = []
+        if since is not None:
+            q += " WHERE published >= ?"
+            since = pd.Timestamp(since)
+            if since.tzinfo is not None:
+                since = since.tz_convert("UTC")
+            params.append(since.strftime("%Y-%m-%d %H:%M:%S"))
+        q += " ORDER BY published DESC"
+        if limit:
+            q += f" LIMIT {int(limit)}"
+        conn = self._connect()
+        df = pd.read_sql_query(q, conn, params=params)
+        conn.close()
+        return self._frame(df)
+
+    def _frame(self, df):
+        df["published"] = pd.to_datetime(df["published"], errors="coerce", utc=True)
+        return df
@@ -0,0 +1,97 @@
+import os, random, threading, time
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32") or 32)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+class RateLimited(Exception):
+    pass
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursting up to ``capacity``."""
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, n=1):
+        with self._lock:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return True
+            return False
+
+    def acquire(self, n=1):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+def get_session():
+    """Process-wide requests session with a connection pool shared by all threads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+def get_bucket(name, per_minute, burst=None):
+    """Shared limiter for ``name`` (e.g. provider + API key); created on first use."""
+    with _buckets_lock:
+        b = _buckets.get(name)
+        if b is None:
+            b = TokenBucket(per_minute / 60.0, burst if burst is not None else max(1.0, per_minute / 12.0))
+            _buckets[name] = b
+        return b
+
+def request(method, url, bucket=None, retries=3, backoff=1.0, timeout=20, check=None, **kwargs):
+    """Send a request through the pooled session, waiting on ``bucket`` before each attempt.
+
+    Retries connection errors and 429/5xx responses with exponential backoff (honouring
+    Retry-After). ``check(response)`` may raise RateLimited for providers that signal
+    throttling in the body. The last error is re-raised once retries are exhausted.
+    """
+    session = get_session()
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+        try:
+            r = session.request(method, url, timeout=timeout, **kwargs)
+            if r.status_code in RETRY_STATUS:
+                retry_after = r.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                raise RateLimited(f"HTTP {r.status_code} from {url.split('?')[0]}")
+            if check is not None:
+                check(r)
+            return r
+        except (requests.ConnectionError, requests.Timeout, RateLimited):
+            if attempt >= retries:
+                raise
+            time.sleep(delay)
+
+def get_json(url, bucket=None, **kwargs):
+    return request("GET", url, bucket=bucket, **kwargs).json()
@@ -0,0 +1,106 @@
+import os, time, functools, threading
+from contextlib import contextmanager
+import numpy as np, pandas as pd
+
+ENABLED = os.getenv("INSTRUMENTATION", "1") not in ("0", "false", "")
+SAMPLES = 4096  # most recent durations kept per timer for percentiles
+SNAPSHOT_COLUMNS = ["name", "calls", "errors", "total_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+class _Timer:
+    __slots__ = ("calls", "errors", "total", "samples")
+    def __init__(self, size):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.samples = np.zeros(size, dtype=np.float64)
+
+class Metrics:
+    """Process-wide timers (call count, errors, total time, a ring of recent durations) and counters."""
+    def __init__(self, samples=SAMPLES):
+        self.size = samples
+        self._timers = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, error=False):
+        with self._lock:
+            t = self._timers.get(name)
+            if t is None:
+                t = self._timers[name] = _Timer(self.size)
+            t.samples[t.calls % self.size] = seconds
+            t.calls += 1
+            t.total += seconds
+            t.errors += bool(error)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def snapshot(self):
+        """One row per timer with latency percentiles (ms) over its retained samples."""
+        rows = []
+        with self._lock:
+            for name, t in sorted(self._timers.items()):
+                s = t.samples[:min(t.calls, self.size)] * 1000.0
+                p50, p95, p99 = np.percentile(s, [50, 95, 99]) if len(s) else (np.nan,) * 3
+                rows.append((name, t.calls, t.errors, t.total, t.total * 1000.0 / t.calls if t.calls else np.nan,
+                             p50, p95, p99, s.max() if len(s) else np.nan))
+        return pd.DataFrame(rows, columns=SNAPSHOT_COLUMNS)
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+METRICS = Metrics()
+
+@contextmanager
+def timer(name, metrics=None):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        (metrics or METRICS).observe(name, time.perf_counter() - start, error)
+
+def timed(name=None):
+    """Decorator recording each call's wall time under ``name`` (default module.qualname)."""
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+        if not ENABLED:
+            return fn
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                METRICS.observe(label, time.perf_counter() - start, True)
+                raise
+            METRICS.observe(label, time.perf_counter() - start)
+            return result
+        return inner
+    return wrap
+
+def incr(name, n=1):
+    if ENABLED:
+        METRICS.incr(name, n)
+
+def snapshot():
+    return METRICS.snapshot()
+
+def counters():
+    return METRICS.counters()
+
+def reset():
+    METRICS.reset()
@@ -0,0 +1,116 @@
+import os, time, shutil, tempfile, itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np, pandas as pd
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.metrics import accuracy_score, roc_auc_score, brier_score_loss
+from threadpoolctl import threadpool_limits
+from classifier_model import ClassifierModel
+from instrumentation import timed
+
+HORIZONS = (1, 2, 3, 5, 7)
+N_SPLITS = 5
+MIN_TRAIN_ROWS = 50
+LEADERBOARD_COLUMNS = ["family", "horizon", "folds", "accuracy", "roc_auc", "brier", "fit_s", "predict_us_per_row", "prob_last", "n_rows"]
+
+def _random_forest():
+    # one core per task: the pool already runs a task per family x horizon
+    return RandomForestClassifier(n_estimators=200, min_samples_leaf=2, random_state=42, n_jobs=1)
+
+def _hist_gradient_boosting():
+    # OpenMP threads are capped per task by _evaluate's threadpool_limits
+    return HistGradientBoostingClassifier(max_iter=200, learning_rate=0.05, random_state=42)
+
+def _logistic():
+    return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+
+FAMILIES = {"random_forest": _random_forest, "hist_gradient_boosting": _hist_gradient_boosting, "logistic": _logistic}
+
+def feature_matrix(hist, horizons=HORIZONS):
+    """(X, R, dates): classifier features for every bar and forward returns per horizon (NaN where the future is unknown)."""
+    df, X = ClassifierModel().featurize(hist)
+    close = df["close"].to_numpy(dtype=float)
+    R = np.full((len(close), len(horizons)), np.nan)
+    for j, h in enumerate(horizons):
+        R[:-h, j] = close[h:] / close[:-h] - 1.0
+    return np.ascontiguousarray(X.to_numpy(dtype=np.float64)), R, df["date"]
+
+def _evaluate(x_path, r_path, family, j, horizon, ret_thresh, n_splits, threads=None):
+    # threads caps OpenMP/BLAS pools (HistGradientBoosting, numpy) so concurrent tasks do not oversubscribe the cores
+    with threadpool_limits(limits=threads):
+        return _score_family(x_path, r_path, family, j, horizon, ret_thresh, n_splits)
+
+def _score_family(x_path, r_path, family, j, horizon, ret_thresh, n_splits):
+    # workers map the shared matrices read-only instead of receiving pickled copies
+    X, R = np.load(x_path, mmap_mode="r"), np.load(r_path, mmap_mode="r")
+    valid = ~np.isnan(R[:, j])
+    Xv, y = np.asarray(X[valid]), (np.asarray(R[valid, j]) > ret_thresh).astype(int)
+    acc, auc, brier, fit_s, pred_s, n_pred = [], [], [], 0.0, 0.0, 0
+    # a row's label looks `horizon` bars ahead, so drop that many rows before each test fold
+    for train, test in TimeSeriesSplit(n_splits=n_splits, gap=horizon).split(Xv):
+        if len(np.unique(y[train])) < 2:
+            continue
+        model = FAMILIES[family]()
+        start = time.perf_counter()
+        model.fit(Xv[train], y[train])
+        fit_s += time.perf_counter() - start
+        start = time.perf_counter()
+        proba = model.predict_proba(Xv[test])[:, 1]
+        pred_s += time.perf_counter() - start
+        n_pred += len(test)
+        acc.append(accuracy_score(y[test], proba >= 0.5))
+        brier.append(brier_score_loss(y[test], proba))
+        if len(np.unique(y[test])) == 2:
+            auc.append(roc_auc_score(y[test], proba))
+    prob_last = np.nan
+    if len(np.unique(y)) == 2:
+        # refit on every labelled bar and score the latest one, whose future is still unknown
+        model = FAMILIES[family]()
+        model.fit(Xv, y)
+        prob_last = float(model.predict_proba(np.asarray(X[-1:]))[0, 1])
+    mean = lambda v: float(np.mean(v)) if v else np.nan
+    return {"family": family, "horizon": horizon, "folds": len(acc), "accuracy": mean(acc), "roc_auc": mean(auc), "brier": mean(brier),
+            "fit_s": fit_s, "predict_us_per_row": pred_s / n_pred * 1e6 if n_pred else np.nan, "prob_last": prob_last, "n_rows": int(valid.sum())}
+
+@timed("model_compare.compare_models")
+def compare_models(hist, horizons=HORIZONS, families=None, ret_thresh=0.01, n_splits=N_SPLITS, max_workers=None):
+    """Leaderboard of every model family x horizon, best cross-validated ROC AUC first.
+
+    Features are computed once, written to .npy files and memory-mapped read-only by a
+    process pool running one task per (family, horizon), so the comparison takes about
+    as long as the slowest task; each task's native thread pools get an equal share of the
+    cores (one thread when there are more tasks than cores). Each task scores expanding-window TimeSeriesSplit folds,
+    leaving a ``horizon``-bar gap so training labels never reach into the test window,
+    and then refits on all labelled bars to give ``prob_last``, the probability of a
+    move above ``ret_thresh`` for the latest bar.
+    """
+    horizons = list(horizons)
+    families = list(families or FAMILIES)
+    X, R, _ = feature_matrix(hist, horizons)
+    if len(X) - max(horizons) < max(MIN_TRAIN_ROWS, 2 * n_splits):
+        raise ValueError(f"Not enough history to compare models (need ~{MIN_TRAIN_ROWS + max(horizons)} bars, got {len(X)}).")
+    tasks = [(f, j, h) for f, (j, h) in itertools.product(families, enumerate(horizons))]
+    tmp = tempfile.mkdtemp(prefix="mm-compare-")
+    try:
+        x_path, r_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "R.npy")
+        np.save(x_path, X)
+        np.save(r_path, R)
+        if max_workers == 1:
+            rows = [_evaluate(x_path, r_path, f, j, h, ret_thresh, n_splits) for f, j, h in tasks]
+        else:
+            workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futs = [ex.submit(_evaluate, x_path, r_path, f, j, h, ret_thresh, n_splits, threads) for f, j, h in tasks]
+                rows = [f.result() for f in futs]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    board = pd.DataFrame(rows, columns=LEADERBOARD_COLUMNS)
+    return board.sort_values(["roc_auc", "accuracy"], ascending=False, na_position="last").reset_index(drop=True)
+
+def best_per_horizon(board):
+    """The top leaderboard row for each horizon, indexed by horizon."""
+    return board.sort_values(["roc_auc", "accuracy"], ascending=False, na_position="last").groupby("horizon").head(1).set_index("horizon").sort_index()
@@ -0,0 +1,210 @@
+import os, glob, json, time, hashlib, threading, tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np, pandas as pd
+import joblib
+from feature_engine import SCHEMA_VERSION
+from universe import universe_tickers
+
+DEFAULT_ROOT = os.getenv("MODEL_REGISTRY_PATH", "model_registry")
+TRAINED_HORIZONS = (1, 2, 3, 5, 7)  # horizons the nightly retrain publishes for every ticker
+CAPACITY_HEADROOM = 16  # ad-hoc scopes and thresholds on top of the retrained keys
+# loaded estimators kept in memory: every retrained (ticker or universe) x horizon key, so scans never evict their own models
+CAPACITY = (int(os.getenv("MODEL_REGISTRY_CAPACITY", "0") or 0)
+            or (len(universe_tickers()) + 1) * len(TRAINED_HORIZONS) + CAPACITY_HEADROOM)
+POLL_INTERVAL = 5.0  # seconds between checks for a newly published model
+KEEP_ARTIFACTS = 2  # per key: the current artifact plus the previous one, for readers still on the old pointer
+
+_loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load")
+
+def data_fingerprint(df):
+    """Short content hash of the bars a model was trained on."""
+    if df is None or df.empty:
+        return "empty"
+    d = df.sort_values("date")
+    h = hashlib.sha1()
+    h.update(np.asarray(pd.to_datetime(d["date"]).values.astype("datetime64[D]").astype(np.int64)).tobytes())
+    h.update(np.asarray(d["close"], dtype=np.float64).tobytes())
+    h.update(np.asarray(d["volume"], dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _write_json(path, obj):
+    with open(path, "w") as f:
+        json.dump(obj, f)
+
+class ModelRegistry:
+    """Versioned model artifacts on disk with an in-process LRU of loaded estimators.
+
+    Models are keyed by (scope, horizon, ret_thresh, feature schema version) where
+    scope is a ticker or a universe name. Each publish writes an immutable artifact
+    named after the training-data fingerprint and then atomically repoints the key's
+    ``.json`` pointer, so readers in other processes switch models without a restart
+    and never see a half-written file. Older artifacts beyond ``KEEP_ARTIFACTS`` are then
+    deleted. ``current()`` serves predictions without ever loading on the caller's thread.
+    """
+    def __init__(self, root=DEFAULT_ROOT, capacity=CAPACITY, poll_interval=POLL_INTERVAL):
+        self.root = root
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self._lru = OrderedDict()   # artifact path -> estimator
+        self._pointers = {}         # key -> (checked_at, meta)
+        self._serving = {}          # key -> artifact last returned by current()
+        self._loading = set()       # artifacts being loaded in the background
+        self._lock = threading.Lock()
+
+    def key(self, scope, horizon, ret_thresh):
+        return f"{scope}/h{int(horizon)}_t{float(ret_thresh):.4f}_v{SCHEMA_VERSION}"
+
+    def _pointer_path(self, key):
+        return os.path.join(self.root, key + ".json")
+
+    def publish(self, scope, horizon, ret_thresh, model, fingerprint, metrics=None):
+        """Store ``model`` as a new artifact and make it current for its key. Returns the pointer meta."""
+        key = self.key(scope, horizon, ret_thresh)
+        pointer = self._pointer_path(key)
+        os.makedirs(os.path.dirname(pointer), exist_ok=True)
+        artifact = f"{key}_{fingerprint}.joblib"
+        _atomic_write(os.path.join(self.root, artifact), lambda p: joblib.dump(model, p))
+        meta = {"key": key, "artifact": artifact, "fingerprint": fingerprint, "metrics": metrics or {}, "published_at": time.time()}
+        _atomic_write(pointer, lambda p: _write_json(p, meta))
+        with self._lock:
+            self._remember(artifact, model)
+            self._pointers[key] = (time.monotonic(), meta)
+        self._prune(key, artifact)
+        return meta
+
+    def _prune(self, key, current):
+        """Delete the key's artifacts older than the newest ``KEEP_ARTIFACTS`` (``current`` always stays)."""
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0.0
+        keep = os.path.join(self.root, current)
+        older = sorted((p for p in glob.glob(glob.escape(os.path.join(self.root, key + "_")) + "*.joblib") if p != keep),
+                       key=mtime, reverse=True)
+        for path in older[KEEP_ARTIFACTS - 1:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with self._lock:
+                self._lru.pop(os.path.relpath(path, self.root).replace(os.sep, "/"), None)
+
+    def meta(self, scope, horizon, ret_thresh):
+        """Current pointer for a key, re-read from disk at most every ``poll_interval`` seconds."""
+        key = self.key(scope, horizon, ret_thresh)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._pointers.get(key)
+            if cached is not None and now - cached[0] < self.poll_interval:
+                return cached[1]
+        try:
+            with open(self._pointer_path(key)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        with self._lock:
+            self._pointers[key] = (now, meta)
+        return meta
+
+    def get(self, scope, horizon, ret_thresh):
+        """(estimator, meta) for the current model of a key, or (None, None)."""
+        meta = self.meta(scope, horizon, ret_thresh)
+        if meta is None:
+            return None, None
+        model = self.load(meta["artifact"])
+        return (model, meta) if model is not None else (None, None)
+
+    def current(self, scope, horizon, ret_thresh):
+        """(estimator, meta) for a key without loading on the caller's thread.
+
+        If the current artifact is not in memory it is loaded in the background while the
+        estimator this key served before keeps being returned. ``(None, meta)`` means a model
+        is published but nothing is loaded for it yet; ``(None, None)`` that there is none.
+        """
+        meta = self.meta(scope, horizon, ret_thresh)
+        if meta is None:
+            return None, None
+        key, artifact = meta["key"], meta["artifact"]
+        with self._lock:
+            model = self._lru.get(artifact)
+            if model is not None:
+                self._lru.move_to_end(artifact)
+                self._serving[key] = (artifact, meta)
+                return model, meta
+            self._prefetch(artifact)
+            previous = self._serving.get(key)
+            model = self._lru.get(previous[0]) if previous is not None else None
+            return (model, previous[1]) if model is not None else (None, meta)
+
+    def _prefetch(self, artifact):
+        # caller holds self._lock
+        if artifact in self._loading:
+            return
+        self._loading.add(artifact)
+        def job():
+            try:
+                self.load(artifact)
+            finally:
+                with self._lock:
+                    self._loading.discard(artifact)
+        _loader.submit(job)
+
+    def load(self, artifact):
+        """Estimator for an artifact name relative to the registry root."""
+        with self._lock:
+            model = self._lru.get(artifact)
+            if model is not None:
+                self._lru.move_to_end(artifact)
+                return model
+        path = os.path.join(self.root, artifact)
+        if not os.path.exists(path):
+            return None
+        try:
+            # tree arrays stay memory-mapped instead of being copied into each process
+            model = joblib.load(path, mmap_mode="r")
+        except Exception:
+            return None
+        with self._lock:
+            self._remember(artifact, model)
+        return model
+
+    def _remember(self, artifact, model):
+        self._lru[artifact] = model
+        self._lru.move_to_end(artifact)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def warm(self, keys, wait=True):
+        """Load the current models for [(scope, horizon, ret_thresh), ...] ahead of use
+        (in the background unless ``wait``)."""
+        for scope, horizon, ret_thresh in keys:
+            if wait:
+                self.get(scope, horizon, ret_thresh)
+                continue
+            meta = self.meta(scope, horizon, ret_thresh)
+            if meta is not None:
+                with self._lock:
+                    if meta["artifact"] not in self._lru:
+                        self._prefetch(meta["artifact"])
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_registry():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = ModelRegistry()
+        return _default
@@ -1,18 +1,145 @@
+import os, json, hashlib, sqlite3, threading, time
 import pandas as pd
-def analyze_headlines(headlines_df):
+from entity_index import default_index
+from instrumentation import timed
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+except ImportError:  # optional: sentiment falls back to neutral
+    SentimentIntensityAnalyzer = None
+try:
+    import spacy
+except ImportError:  # optional: no entities without spaCy
+    spacy = None
+
+NLP_CACHE_PATH = os.getenv("NLP_CACHE_PATH", "nlp_cache.db")
+NLP_CACHE_RETENTION_DAYS = float(os.getenv("NLP_CACHE_RETENTION_DAYS", "7") or 7)
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", str(min(4, os.cpu_count() or 1))) or 1)
+BATCH_SIZE = 256
+MULTIPROCESS_MIN = 2000  # below this many new texts, worker start-up costs more than it saves
+ENTITY_LABELS = {"ORG", "PERSON", "GPE", "PRODUCT"}
+
+_models = {}
+_models_lock = threading.Lock()
+
+def _vader():
+    with _models_lock:
+        if "vader" not in _models:
+            _models["vader"] = SentimentIntensityAnalyzer() if SentimentIntensityAnalyzer is not None else None
+        return _models["vader"]
+
+def _spacy():
+    with _models_lock:
+        if "spacy" not in _models:
+            nlp = None
+            if spacy is not None:
+                try:
+                    nlp = spacy.load(SPACY_MODEL, disable=["parser", "lemmatizer", "tagger", "attribute_ruler"])
+                except OSError:
+                    nlp = None
+            _models["spacy"] = nlp
+        return _models["spacy"]
+
+def analyzer_version():
+    """Identifies which analyzers produced a result, so cached fallback results are redone once the libraries are installed."""
+    nlp = _spacy()
+    return f"v1|vader={_vader() is not None}|spacy={nlp.meta.get('name') + '-' + nlp.meta.get('version') if nlp is not None else None}"
+
+class NLPCache:
+    """SQLite map of content hash -> (sentiment, entities).
+
+    Entries older than ``retention_days`` (by when they were analyzed) are pruned on every
+    write, the same window the headline store keeps, so the file tracks recent news only.
+    """
+    def __init__(self, path=NLP_CACHE_PATH, retention_days=NLP_CACHE_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS nlp (hash TEXT PRIMARY KEY, sentiment REAL, entities TEXT, created_at REAL)")
+        if "created_at" not in [r[1] for r in conn.execute("PRAGMA table_info(nlp)")]:
+            # caches written before retention existed start their window now
+            conn.execute("ALTER TABLE nlp ADD COLUMN created_at REAL")
+            conn.execute("UPDATE nlp SET created_at=?", (time.time(),))
+        conn.execute("CREATE INDEX IF NOT EXISTS nlp_created ON nlp (created_at)")
+        conn.commit()
+        conn.close()
+
+    def get_many(self, hashes):
+        out = {}
+        conn = sqlite3.connect(self.path, timeout=30)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            q = f"SELECT hash, sentiment, entities FROM nlp WHERE hash IN ({','.join('?' * len(chunk))})"
+            for h, s, e in conn.execute(q, chunk):
+                out[h] = (s, json.loads(e))
+        conn.close()
+        return out
+
+    def put_many(self, rows):
+        now = time.time()
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO nlp (hash, sentiment, entities, created_at) VALUES (?,?,?,?)",
+                                 [(h, s, json.dumps(e), now) for h, s, e in rows])
+                conn.execute("DELETE FROM nlp WHERE created_at < ?", (now - self.retention_days * 86400,))
+            conn.close()
+
+_cache = None
+
+def default_cache():
+    global _cache
+    if _cache is None:
+        _cache = NLPCache()
+    return _cache
+
+def _analyze(texts):
+    vader = _vader()
+    sentiments = [vader.polarity_scores(t)["compound"] for t in texts] if vader is not None else [0.0] * len(texts)
+    nlp = _spacy()
+    if nlp is None:
+        return sentiments, [[] for _ in texts]
+    n_process = SPACY_N_PROCESS if len(texts) >= MULTIPROCESS_MIN else 1
+    entities = [list(dict.fromkeys(e.text for e in doc.ents if e.label_ in ENTITY_LABELS))
+                for doc in nlp.pipe(texts, batch_size=BATCH_SIZE, n_process=n_process)]
+    return sentiments, entities
+
+@timed("news_nlp.analyze_texts")
+def analyze_texts(texts, cache=None):
+    """(sentiments, entities) aligned with ``texts``; each distinct text is analyzed once and cached by content hash."""
+    cache = cache or default_cache()
+    version = analyzer_version()
+    texts = ["" if t is None or t != t else str(t) for t in texts]
+    keys = [hashlib.sha1(f"{version}\0{t}".encode("utf-8")).hexdigest() for t in texts]
+    unique = dict(zip(keys, texts))
+    known = cache.get_many(list(unique))
+    missing = [k for k in unique if k not in known]
+    if missing:
+        sentiments, entities = _analyze([unique[k] for k in missing])
+        fresh = list(zip(missing, sentiments, entities))
+        cache.put_many(fresh)
+        known.update({k: (s, e) for k, s, e in fresh})
+    return [known[k][0] for k in keys], [known[k][1] for k in keys]
+
+def analyze_headlines(headlines_df, cache=None):
     if headlines_df is None or headlines_df.empty:
         return pd.DataFrame()
     df = headlines_df.copy().rename(columns={"title":"text"})
-    # simple sentiment via naive polarity (placeholder)
-    df["sentiment"] = df["text"].str.len() % 3 * 0.1  # placeholder
-    df["entities"] = df["text"].apply(lambda t: [])
+    df["sentiment"], df["entities"] = analyze_texts(df["text"].tolist(), cache)
     return df
 
-def map_entities_to_ticker(nlp_df, api_client=None):
-    rows = []
+def map_entities_to_ticker(nlp_df, api_client=None, index=None):
+    """One row per (headline, ticker) found by the precompiled company/ticker matcher."""
     if nlp_df is None or nlp_df.empty:
         return pd.DataFrame()
-    for _, r in nlp_df.iterrows():
-        for ent in r.get("entities", []):
-            rows.append({"entity": ent, "ticker": None, "sentiment": r.get("sentiment",0), "title": r.get("text","")})
-    return pd.DataFrame(rows)
\ No newline at end of file
+    index = index or default_index()
+    texts = nlp_df["text"] if "text" in nlp_df.columns else nlp_df["title"]
+    sentiments = nlp_df["sentiment"] if "sentiment" in nlp_df.columns else [0] * len(nlp_df)
+    rows = []
+    for text, sentiment in zip(texts, sentiments):
+        matches, hits = index.scan(text)
+        for ent, ticker in dict((tk, (e, tk)) for e, tk in matches).values():
+            rows.append({"entity": ent, "ticker": ticker, "sentiment": sentiment, "keyword_hits": hits, "title": text})
+    return pd.DataFrame(rows, columns=["entity", "ticker", "sentiment", "keyword_hits", "title"])
@@ -0,0 +1,119 @@
+import os, sqlite3, threading, time
+import pandas as pd
+
+DEFAULT_DB = os.getenv("OHLCV_CACHE_PATH", "ohlcv_cache.db")
+DEFAULT_TTL = float(os.getenv("OHLCV_CACHE_TTL", "21600") or 21600)  # seconds before a series is refreshed
+DEFAULT_MAX_SERIES = int(os.getenv("OHLCV_CACHE_MAX_SERIES", "2000") or 2000)
+COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+EARLIEST = "1900-01-01"  # covered_from marker for full-history downloads
+TOUCH_INTERVAL = 60.0  # seconds between writes of buffered last-read times
+
+class OHLCVCache:
+    """On-disk store of daily bars keyed by (provider, ticker).
+
+    Each series records the earliest date it was requested from (``covered_from``),
+    the last stored bar and when it was last fetched, so callers can ask only for
+    the missing tail. Once more than ``max_series`` series are held, the least
+    recently read ones are evicted.
+
+    Each thread keeps its own open connection and reads take no lock; last-read
+    times are buffered in memory and written at most every TOUCH_INTERVAL seconds
+    (and before any eviction), so a cache hit never writes to the database.
+    """
+    def __init__(self, path=DEFAULT_DB, ttl=DEFAULT_TTL, max_series=DEFAULT_MAX_SERIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+        self._ensure_db()
+
+    def _connect(self):
+        # one connection per thread (and per process: a forked worker must not reuse its parent's)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _ensure_db(self):
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS bars (provider TEXT, ticker TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+                        PRIMARY KEY (provider, ticker, date)) WITHOUT ROWID""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS series (provider TEXT, ticker TEXT, covered_from TEXT, last_date TEXT, fetched_at REAL, accessed_at REAL,
+                        PRIMARY KEY (provider, ticker))""")
+        conn.execute("CREATE INDEX IF NOT EXISTS series_accessed ON series (accessed_at)")
+        conn.commit()
+
+    def info(self, provider, ticker):
+        conn = self._connect()
+        row = conn.execute("SELECT covered_from, last_date, fetched_at FROM series WHERE provider=? AND ticker=?", (provider, ticker)).fetchone()
+        if row is None:
+            return None
+        return {"covered_from": row[0], "last_date": row[1], "fetched_at": row[2]}
+
+    def is_fresh(self, info):
+        return info is not None and (time.time() - (info["fetched_at"] or 0)) < self.ttl
+
+    def load(self, provider, ticker, start=None):
+        start = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else EARLIEST
+        df = pd.read_sql_query("SELECT date, open, high, low, close, volume FROM bars WHERE provider=? AND ticker=? AND date>=? ORDER BY date",
+                               self._connect(), params=(provider, ticker, start))
+        self._touched[(provider, ticker)] = time.time()
+        if time.monotonic() - self._flushed_at >= TOUCH_INTERVAL:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    self._flush_touches(conn)
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def _flush_touches(self, conn):
+        touched, self._touched = self._touched, {}
+        self._flushed_at = time.monotonic()
+        conn.executemany("UPDATE series SET accessed_at=? WHERE provider=? AND ticker=?", [(ts, p, t) for (p, t), ts in touched.items()])
+
+    def store(self, provider, ticker, df, covered_from):
+        """Upsert bars and mark the series fetched now. ``df`` may be empty (nothing new)."""
+        covered_from = pd.Timestamp(covered_from).strftime("%Y-%m-%d")
+        rows = []
+        if df is not None and not df.empty:
+            d = df[COLUMNS].dropna(subset=["close"])
+            rows = list(zip([provider] * len(d), [ticker] * len(d), d["date"].dt.strftime("%Y-%m-%d"),
+                            d["open"].astype(float), d["high"].astype(float), d["low"].astype(float), d["close"].astype(float),
+                            d["volume"].fillna(0).astype("int64").tolist()))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO bars VALUES (?,?,?,?,?,?,?,?)", rows)
+                last = conn.execute("SELECT MAX(date) FROM bars WHERE provider=? AND ticker=?", (provider, ticker)).fetchone()[0]
+                prev = conn.execute("SELECT covered_from FROM series WHERE provider=? AND ticker=?", (provider, ticker)).fetchone()
+                if prev is not None and prev[0]:
+                    covered_from = min(prev[0], covered_from)
+                conn.execute("INSERT OR REPLACE INTO series VALUES (?,?,?,?,?,?)", (provider, ticker, covered_from, last, now, now))
+                self._touched.pop((provider, ticker), None)
+                self._evict(conn)
+
+    def _evict(self, conn):
+        n = conn.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+        if n <= self.max_series:
+            return
+        self._flush_touches(conn)
+        victims = conn.execute("SELECT provider, ticker FROM series ORDER BY accessed_at LIMIT ?", (n - self.max_series,)).fetchall()
+        conn.executemany("DELETE FROM bars WHERE provider=? AND ticker=?", victims)
+        conn.executemany("DELETE FROM series WHERE provider=? AND ticker=?", victims)
+
+    def clear(self, provider=None, ticker=None):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if provider is None:
+                    conn.execute("DELETE FROM bars")
+                    conn.execute("DELETE FROM series")
+                else:
+                    conn.execute("DELETE FROM bars WHERE provider=? AND ticker=?", (provider, ticker))
+                    conn.execute("DELETE FROM series WHERE provider=? AND ticker=?", (provider, ticker))
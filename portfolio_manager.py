@@ -0,0 +1,157 @@
+import os, sqlite3, threading, time
+import numpy as np, pandas as pd
+
+DB = os.getenv("PORTFOLIO_DB_PATH", "portfolio.db")
+INITIAL_CASH = 100000.0
+SIDES = ("BUY", "SELL")
+
+class PortfolioManager:
+    """Paper-trading ledger on SQLite (WAL).
+
+    Cash and positions are materialized tables updated in the same transaction as each
+    trade, and mirrored in memory so orders are validated and positions listed without
+    reading the trade history. If another process writes the database, the mirror is
+    reloaded on the next call (detected via ``PRAGMA data_version``). Orders take the
+    database write lock (``BEGIN IMMEDIATE``) before validating, so managers in several
+    processes never both spend the same cash.
+    """
+    def __init__(self, db_path=DB, initial_cash=INITIAL_CASH):
+        self.db = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_db(initial_cash)
+        self._load()
+
+    def _ensure_db(self, initial_cash):
+        with self._conn:
+            c = self._conn
+            c.execute("CREATE TABLE IF NOT EXISTS account (id INTEGER PRIMARY KEY, cash REAL)")
+            c.execute("CREATE TABLE IF NOT EXISTS trades (id INTEGER PRIMARY KEY, ts TEXT, symbol TEXT, side TEXT, qty INTEGER, price REAL)")
+            c.execute("CREATE TABLE IF NOT EXISTS positions (symbol TEXT PRIMARY KEY, qty INTEGER, avg_price REAL)")
+            c.execute("CREATE INDEX IF NOT EXISTS trades_symbol ON trades (symbol, id)")
+            if c.execute("SELECT COUNT(*) FROM account").fetchone()[0] == 0:
+                c.execute("INSERT INTO account (id, cash) VALUES (1, ?)", (initial_cash,))
+
+    def _load(self):
+        self._cash = self._conn.execute("SELECT cash FROM account ORDER BY id LIMIT 1").fetchone()[0]
+        self._positions = {s: [q, p] for s, q, p in self._conn.execute("SELECT symbol, qty, avg_price FROM positions")}
+        self._version = self._data_version()
+
+    def _data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh(self):
+        # data_version only changes when another connection commits
+        if self._data_version() != self._version:
+            self._load()
+
+    def get_balance(self):
+        with self._lock:
+            self._refresh()
+            return self._cash
+
+    @staticmethod
+    def _normalize(order):
+        if isinstance(order, dict):
+            symbol, side, qty, price = order["symbol"], order["side"], order["qty"], order["price"]
+        else:
+            symbol, side, qty, price = order
+        symbol, side = str(symbol).strip().upper(), str(side).strip().upper()
+        if side not in SIDES:
+            raise ValueError(f"side must be BUY or SELL, got {side!r}")
+        if qty is None or price is None or qty <= 0 or price <= 0:
+            raise ValueError(f"qty and price must be positive ({symbol}: qty={qty}, price={price})")
+        return symbol, side, qty, float(price)
+
+    def place_orders(self, orders):
+        """Apply a batch of (symbol, side, qty, price) orders (tuples or dicts) in one transaction.
+
+        Orders are applied in sequence; if any would overdraw cash or sell more than is held,
+        nothing is written and ValueError is raised. Returns the number of trades recorded.
+        """
+        orders = [self._normalize(o) for o in orders]
+        if not orders:
+            return 0
+        with self._lock:
+            c = self._conn
+            # take the write lock before validating, so no other process can trade in between
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                self._load()
+                cash, positions, touched = self._cash, {}, set()
+                for symbol, side, qty, price in orders:
+                    pos = positions.get(symbol)
+                    if pos is None:
+                        pos = positions[symbol] = list(self._positions.get(symbol, [0, 0.0]))
+                    if side == "BUY":
+                        cost = qty * price
+                        if cost > cash + 1e-9:
+                            raise ValueError(f"insufficient cash for {qty} {symbol} @ {price}: {cash:.2f} available")
+                        cash -= cost
+                        pos[1] = (pos[0] * pos[1] + cost) / (pos[0] + qty)
+                        pos[0] += qty
+                    else:
+                        if qty > pos[0]:
+                            raise ValueError(f"cannot sell {qty} {symbol}: {pos[0]} held")
+                        cash += qty * price
+                        pos[0] -= qty
+                    touched.add(symbol)
+                ts = time.strftime("%Y-%m-%d %H:%M:%S")
+                upserts = [(s, positions[s][0], positions[s][1]) for s in touched if positions[s][0] > 0]
+                deletes = [(s,) for s in touched if positions[s][0] <= 0]
+                spent = self._cash - cash
+                c.executemany("INSERT INTO trades (ts,symbol,side,qty,price) VALUES (?,?,?,?,?)", [(ts, *o) for o in orders])
+                c.executemany("INSERT OR REPLACE INTO positions (symbol,qty,avg_price) VALUES (?,?,?)", upserts)
+                c.executemany("DELETE FROM positions WHERE symbol=?", deletes)
+                cur = c.execute("UPDATE account SET cash = cash - ? WHERE id=(SELECT MIN(id) FROM account) AND cash >= ? - 1e-9", (spent, spent))
+                if cur.rowcount != 1:
+                    raise ValueError(f"insufficient cash: {spent:.2f} needed")
+                c.commit()
+            except BaseException:
+                c.rollback()
+                raise
+            self._cash = cash
+            for s, q, p in upserts:
+                self._positions[s] = [q, p]
+            for (s,) in deletes:
+                self._positions.pop(s, None)
+            self._version = self._data_version()
+            return len(orders)
+
+    def place_order(self, symbol, side, qty, price):
+        return self.place_orders([(symbol, side, qty, price)])
+
+    def list_positions(self):
+        with self._lock:
+            self._refresh()
+            rows = [(s, q, p) for s, (q, p) in sorted(self._positions.items())]
+        return pd.DataFrame(rows, columns=["symbol", "qty", "avg_price"])
+
+    def list_trades(self, limit=200, symbol=None):
+        with self._lock:
+            q = "SELECT * FROM trades" + (" WHERE symbol=?" if symbol else "") + f" ORDER BY id DESC LIMIT {int(limit)}"
+            return pd.read_sql_query(q, self._conn, params=[symbol.upper()] if symbol else [])
+
+    def mark_to_market(self, prices):
+        """Positions valued at ``prices`` (mapping or Series symbol -> price); symbols without a price stay at cost."""
+        pos = self.list_positions()
+        prices = pd.Series(prices, dtype=float) if not isinstance(prices, pd.Series) else prices.astype(float)
+        qty = pos["qty"].to_numpy(dtype=float)
+        cost = pos["avg_price"].to_numpy(dtype=float)
+        px = prices.reindex(pos["symbol"]).to_numpy()
+        px = np.where(np.isnan(px), cost, px)
+        pos["price"] = px
+        pos["market_value"] = qty * px
+        pos["unrealized_pnl"] = qty * (px - cost)
+        pos["unrealized_pct"] = np.divide(px - cost, cost, out=np.zeros_like(cost), where=cost > 0) * 100.0
+        return pos
+
+    def equity(self, prices):
+        """Cash plus the marked value of all positions."""
+        return self.get_balance() + float(self.mark_to_market(prices)["market_value"].sum())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
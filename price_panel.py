@@ -0,0 +1,141 @@
+import os, json, shutil, threading
+import numpy as np, pandas as pd
+
+DEFAULT_PATH = os.getenv("PRICE_PANEL_PATH", "price_panel")
+PRICE_FIELDS = ["open", "high", "low", "close"]
+FIELDS = PRICE_FIELDS + ["volume"]
+
+# build/update swap files under the panel directory; one writer per process at a time
+_write_lock = threading.Lock()
+
+def _dtype(field):
+    return np.int64 if field == "volume" else np.float32
+
+def _day_index(dates):
+    return np.asarray(pd.to_datetime(dates).values.astype("datetime64[D]").astype(np.int64))
+
+class PricePanel:
+    """Memory-mapped dates x tickers array per field, stored as one flat file per field.
+
+    Prices are float32 (NaN where a ticker has no bar), volume is int64 (0 where missing).
+    ``field()`` returns a zero-copy (n_dates, n_tickers) view, so universe-wide screens
+    never materialise per-ticker DataFrames. Rows are appended in place when new dates
+    arrive; adding tickers rewrites the panel into a fresh directory and swaps it in.
+    """
+    def __init__(self, path=DEFAULT_PATH, mode="r"):
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.tickers = meta["tickers"]
+        self._col = {t: i for i, t in enumerate(self.tickers)}
+        self.days = np.fromfile(os.path.join(path, "dates.i64"), dtype=np.int64)
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def dates(self):
+        return pd.to_datetime(self.days.astype("datetime64[D]"))
+
+    def field(self, name):
+        if name not in self._arrays:
+            shape = (len(self.days), len(self.tickers))
+            if shape[0] == 0 or shape[1] == 0:
+                self._arrays[name] = np.zeros(shape, dtype=_dtype(name))
+            else:
+                self._arrays[name] = np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=_dtype(name), mode=self.mode, shape=shape)
+        return self._arrays[name]
+
+    def column(self, ticker, name="close"):
+        return self.field(name)[:, self._col[ticker]]
+
+    def positions(self, tickers):
+        """Column indices of the ``tickers`` present in the panel."""
+        return [self._col[t] for t in tickers if t in self._col]
+
+    def frame(self, ticker):
+        """Single-ticker history in the DataFeed.get_historical layout."""
+        i = self._col[ticker]
+        df = pd.DataFrame({"date": self.dates, **{f: np.asarray(self.field(f)[:, i]) for f in FIELDS}})
+        return df[df["close"].notna()].reset_index(drop=True)
+
+    def tail(self, n, name="close"):
+        return self.field(name)[-n:]
+
+    @classmethod
+    def build(cls, frames, path=DEFAULT_PATH):
+        """Write a new panel from {ticker: history frame}, replacing any panel at ``path``."""
+        with _write_lock:
+            return cls._build(frames, path)
+
+    @classmethod
+    def _build(cls, frames, path):
+        frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+        tickers = sorted(frames)
+        days = np.unique(np.concatenate([_day_index(df["date"]) for df in frames.values()])) if frames else np.zeros(0, np.int64)
+        tmp = path.rstrip("/\\") + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        days.astype(np.int64).tofile(os.path.join(tmp, "dates.i64"))
+        for f in FIELDS:
+            arr = np.full((len(days), len(tickers)), 0 if f == "volume" else np.nan, dtype=_dtype(f))
+            for j, t in enumerate(tickers):
+                df = frames[t]
+                rows = np.searchsorted(days, _day_index(df["date"]))
+                arr[rows, j] = df[f].to_numpy(dtype=_dtype(f), na_value=0 if f == "volume" else np.nan)
+            arr.tofile(os.path.join(tmp, f"{f}.bin"))
+        with open(os.path.join(tmp, "meta.json"), "w") as fh:
+            json.dump({"tickers": tickers, "fields": FIELDS}, fh)
+        old = path.rstrip("/\\") + ".old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(path):
+            os.rename(path, old)
+        os.rename(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+        return cls(path)
+
+    @classmethod
+    def update(cls, frames, path=DEFAULT_PATH):
+        """Merge new bars into the panel at ``path``.
+
+        Bars for known tickers on or after the first stored date are written in place and
+        later dates are appended; unknown tickers or earlier dates trigger a rebuild.
+        """
+        with _write_lock:
+            return cls._update(frames, path)
+
+    @classmethod
+    def _update(cls, frames, path):
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return cls._build(frames, path)
+        panel = cls(path, mode="r+")
+        frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return cls(path)
+        new_days = np.unique(np.concatenate([_day_index(df["date"]) for df in frames.values()]))
+        extra = np.setdiff1d(new_days, panel.days)
+        # unknown tickers, or dates before the last stored one that are not stored yet, cannot be appended
+        if any(t not in panel._col for t in frames) or len(panel) == 0 or (len(extra) and extra[0] < panel.days[-1]):
+            merged = {t: panel.frame(t) for t in panel.tickers}
+            for t, df in frames.items():
+                old = merged.get(t)
+                merged[t] = df if old is None else pd.concat([old, df]).drop_duplicates("date", keep="last").sort_values("date")
+            panel._arrays.clear()
+            return cls._build(merged, path)
+        n_t = len(panel.tickers)
+        if len(extra):
+            with open(os.path.join(path, "dates.i64"), "ab") as fh:
+                extra.astype(np.int64).tofile(fh)
+            for f in FIELDS:
+                with open(os.path.join(path, f"{f}.bin"), "ab") as fh:
+                    np.full((len(extra), n_t), 0 if f == "volume" else np.nan, dtype=_dtype(f)).tofile(fh)
+        panel = cls(path, mode="r+")
+        for f in FIELDS:
+            arr = panel.field(f)
+            for t, df in frames.items():
+                rows = np.searchsorted(panel.days, _day_index(df["date"]))
+                arr[rows, panel._col[t]] = df[f].to_numpy(dtype=_dtype(f), na_value=0 if f == "volume" else np.nan)
+            arr.flush()
+        return cls(path)
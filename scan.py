@@ -0,0 +1,213 @@
+import os, time, threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from data_feed import DataFeed
+from edgar import EdgarClient, BUY_CODES, SELL_CODES
+from classifier_model import ClassifierModel
+from entity_index import BuzzCounter, default_index
+from news_nlp import analyze_headlines, map_entities_to_ticker
+from scoring import composite_score, signal_level, prob_to_pct
+from universe import universe_tickers
+from instrumentation import timed, timer
+
+# seconds each stage's result is reused across reruns and sessions
+STAGE_TTL = {
+    "insiders": float(os.getenv("SCAN_TTL_INSIDERS", "900") or 900),
+    "news": float(os.getenv("SCAN_TTL_NEWS", "120") or 120),
+    "history": float(os.getenv("SCAN_TTL_HISTORY", "300") or 300),
+    "predict": float(os.getenv("SCAN_TTL_PREDICT", "300") or 300),
+}
+PENDING_STATUSES = ("training", "loading")  # predictions with no model behind them yet
+
+class TTLCache:
+    """Thread-safe key -> value cache with per-entry expiry.
+
+    Concurrent callers asking for the same missing key wait for one computation
+    instead of each running it. Expired entries are dropped on misses, at most
+    every ``purge_interval`` seconds, and per-key locks only live while a
+    computation is running, so keys that stop being asked for do not accumulate.
+    """
+    def __init__(self, clock=time.monotonic, purge_interval=60.0):
+        self.clock = clock
+        self.purge_interval = purge_interval
+        self._data = {}   # key -> (expires_at, value)
+        self._locks = {}  # key -> lock held while computing that key
+        self._lock = threading.Lock()
+        self._next_purge = clock() + purge_interval
+
+    def __len__(self):
+        return len(self._data)
+
+    def purge(self):
+        """Drop every expired entry; returns how many were removed."""
+        with self._lock:
+            return self._purge(self.clock())
+
+    def _purge(self, now):
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at <= now]
+        for k in expired:
+            del self._data[k]
+        self._next_purge = now + self.purge_interval
+        return len(expired)
+
+    def get_or_compute(self, key, ttl, fn):
+        """(value, hit) for ``key``, computing and storing ``fn()`` when missing or expired."""
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > self.clock():
+            return entry[1], True
+        with self._lock:
+            now = self.clock()
+            if now >= self._next_purge:
+                self._purge(now)
+            lock = self._locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] > self.clock():
+                    return entry[1], True
+                value = fn()
+                self._data[key] = (self.clock() + ttl, value)
+                return value, False
+        finally:
+            with self._lock:
+                # waiters still holding this lock find the stored value on their re-check
+                if self._locks.get(key) is lock and not lock.locked():
+                    del self._locks[key]
+
+    def discard(self, key):
+        self._data.pop(key, None)
+
+    def invalidate(self, prefix=None):
+        with self._lock:
+            for k in [k for k in self._data if prefix is None or (isinstance(k, tuple) and k[0] == prefix)]:
+                del self._data[k]
+
+class Services:
+    """Long-lived clients shared by every rerun and session in the process."""
+    def __init__(self, api_keys=None):
+        self.feed = DataFeed(api_keys=api_keys)
+        self.edgar = EdgarClient()
+        self.classifier = ClassifierModel()
+        self.index = default_index()
+        # seeded with the last 72h already in the headline store
+        self.buzz = BuzzCounter()
+        self.buzz.ingest(self.feed.headlines.load(since=pd.Timestamp.utcnow() - pd.Timedelta(hours=72)), self.index)
+        self.cache = TTLCache()
+        # load the scan's models in the background so the first predictions do not wait on disk
+        self.classifier.registry.warm([(s, 3, 0.01) for s in universe_tickers() + [self.classifier.scope]], wait=False)
+        self._portfolio = None
+        self._lock = threading.Lock()
+
+    @property
+    def portfolio(self):
+        with self._lock:
+            if self._portfolio is None:
+                from portfolio_manager import PortfolioManager
+                self._portfolio = PortfolioManager()
+            return self._portfolio
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_services(api_keys=None):
+    """Process-wide Services for a set of API keys, created on first use."""
+    key = tuple(sorted((api_keys or {}).items()))
+    with _services_lock:
+        if key not in _services:
+            _services[key] = Services(api_keys)
+        return _services[key]
+
+class StartEarlyScan:
+    """Runs the Start-Early stages concurrently and combines them into the composite score.
+
+    Insider filings, news (fetch + NLP + buzz) and history -> prediction are independent,
+    so a scan takes as long as the slowest of them. Each stage result is cached for
+    STAGE_TTL seconds in the shared services, so reruns within the TTL do no fetching.
+    """
+    def __init__(self, services, ttl=None, max_workers=3):
+        self.services = services
+        self.ttl = {**STAGE_TTL, **(ttl or {})}
+        self.max_workers = max_workers
+
+    def _cached(self, key, fn):
+        return self.services.cache.get_or_compute(key, self.ttl[key[0]], fn)
+
+    def insiders(self, ticker, cik=None, days=90):
+        def fetch():
+            edgar = self.services.edgar
+            if cik:
+                edgar.crawl_form4(cik)
+                tx = edgar.index.transactions(cik=cik, days=days)
+                open_market = tx[tx["derivative"] == 0]
+                return {"buy": int(open_market["code"].isin(BUY_CODES).sum()), "sell": int(open_market["code"].isin(SELL_CODES).sum()),
+                        "transactions": tx}
+            counts = edgar.insider_scores(ticker, days=days)
+            return {"buy": int(counts.loc[ticker, "buy"]), "sell": int(counts.loc[ticker, "sell"]),
+                    "transactions": edgar.index.transactions(ticker=ticker, days=days)}
+        return self._cached(("insiders", ticker, cik, days), fetch)
+
+    def news(self, analyze=False):
+        """New headlines go into the shared buzz counter; with ``analyze`` also returns NLP and ticker mapping frames."""
+        def fetch():
+            s = self.services
+            s.buzz.ingest(s.feed.fetch_rss_feeds(new_only=True), s.index)
+            if not analyze:
+                return {}
+            nlp = analyze_headlines(s.feed.headlines.load(since=pd.Timestamp.utcnow() - pd.Timedelta(hours=72)))
+            return {"headlines": nlp, "mapping": map_entities_to_ticker(nlp, index=s.index)}
+        return self._cached(("news", analyze), fetch)
+
+    def history(self, ticker, provider="Finnhub", days=365):
+        return self._cached(("history", ticker, provider, days), lambda: self.services.feed.get_historical(ticker, provider=provider, days=days))
+
+    def predict(self, ticker, hist, horizon=3, ret_thresh=0.01):
+        last = str(hist["date"].iloc[-1]) if hist is not None and not hist.empty else None
+        def fetch():
+            return self.services.classifier.predict_from_signals(hist, horizon=horizon, ticker=ticker, ret_thresh=ret_thresh)
+        key = ("predict", ticker, horizon, ret_thresh, last)
+        res, hit = self._cached(key, fetch)
+        if res.get("metrics", {}).get("status") in PENDING_STATUSES:
+            # do not hold the placeholder for the whole TTL; the next scan picks up the background model
+            self.services.cache.discard(key)
+        return res, hit
+
+    def _timed_stage(self, name, fn, timings, errors, cached, default):
+        start = time.perf_counter()
+        try:
+            with timer(f"scan.{name}"):
+                value, hit = fn()
+            cached[name] = hit
+            return value
+        except Exception as e:
+            errors[name] = str(e)
+            return default
+        finally:
+            timings[name] = time.perf_counter() - start
+
+    @timed("scan.start_early")
+    def run(self, ticker, cik=None, provider="Finnhub", days=365, horizon=3, ret_thresh=0.01, analyze_news=False):
+        """Scan one ticker. Returns a dict with the stage outputs, the model's ``prob_pos`` (None while
+        no model is ready), its composite-score component ``pred_pct``, composite ``score``/``signal``,
+        per-stage ``timings`` (seconds), which stages were ``cached`` and any stage ``errors``."""
+        ticker = (ticker or "").strip().upper()
+        timings, errors, cached = {}, {}, {}
+        def history_then_predict():
+            hist = self._timed_stage("history", lambda: self.history(ticker, provider, days), timings, errors, cached, pd.DataFrame())
+            if hist is None or hist.empty:
+                return hist, None
+            return hist, self._timed_stage("predict", lambda: self.predict(ticker, hist, horizon, ret_thresh), timings, errors, cached, None)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            f_ins = ex.submit(self._timed_stage, "insiders", lambda: self.insiders(ticker, cik), timings, errors, cached,
+                              {"buy": 0, "sell": 0, "transactions": pd.DataFrame()})
+            f_news = ex.submit(self._timed_stage, "news", lambda: self.news(analyze_news), timings, errors, cached, {})
+            f_model = ex.submit(history_then_predict) if ticker else None
+            insiders, news = f_ins.result(), f_news.result()
+            hist, prediction = f_model.result() if f_model is not None else (pd.DataFrame(), None)
+        news_buzz = self.services.buzz.buzz(ticker, "72h") if ticker else 0
+        prob = prediction.get("prob_pos") if prediction and prediction.get("metrics", {}).get("status") not in PENDING_STATUSES else None
+        pred_pct = float(prob_to_pct(prob)) if prob is not None else None
+        score = composite_score(insiders["buy"], insiders["sell"], news_buzz, pred_pct)
+        return {"ticker": ticker, "insider_buy": insiders["buy"], "insider_sell": insiders["sell"],
+                "transactions": insiders["transactions"], "news_buzz": news_buzz, "headlines": news.get("headlines"),
+                "mapping": news.get("mapping"), "history": hist, "prediction": prediction, "prob_pos": prob, "pred_pct": pred_pct,
+                "score": score, "signal": signal_level(score), "timings": timings, "cached": cached, "errors": errors}
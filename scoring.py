@@ -0,0 +1,95 @@
+import numpy as np, pandas as pd
+from feature_engine import FEATURES, WINDOW, N_LAGS, default_engine
+from price_panel import PricePanel
+from instrumentation import timed
+
+# weights of the Start-Early composite score, as used by the single-ticker scan in app.py
+COMPOSITE_WEIGHTS = {"insider_buy": 2.0, "insider_sell": -1.0, "news_buzz": 0.2, "model": 0.5}
+MODEL_PCT_CAP = 20.0
+PANEL_LOOKBACK = 4 * WINDOW  # trailing panel rows searched for each ticker's last WINDOW bars
+
+def prob_to_pct(prob_pos):
+    """Map a classifier probability onto the +/-20 %-move scale the composite score expects."""
+    return np.clip((np.asarray(prob_pos, dtype=float) - 0.5) * 2 * MODEL_PCT_CAP, -MODEL_PCT_CAP, MODEL_PCT_CAP)
+
+def composite_score(insider_buy, insider_sell, news_buzz, pred_pct):
+    """Works on scalars or aligned arrays; a missing (NaN/None) model prediction contributes 0."""
+    w = COMPOSITE_WEIGHTS
+    pred = np.nan_to_num(np.asarray(pred_pct if pred_pct is not None else np.nan, dtype=float), nan=0.0)
+    score = (w["insider_buy"] * np.asarray(insider_buy, dtype=float) + w["insider_sell"] * np.asarray(insider_sell, dtype=float)
+             + w["news_buzz"] * np.asarray(news_buzz, dtype=float) + w["model"] * np.clip(pred, -MODEL_PCT_CAP, MODEL_PCT_CAP))
+    return float(score) if np.ndim(score) == 0 else score
+
+def signal_level(score):
+    if score >= 10:
+        return "High"
+    if score >= 2:
+        return "Moderate"
+    return "Low"
+
+def latest_feature_matrix(hists, engine=None):
+    """One feature row per ticker from {ticker: history}, via the incremental feature engine."""
+    engine = engine or default_engine()
+    for t, h in hists.items():
+        if h is not None and not h.empty:
+            engine.sync(t, h)
+    X = engine.latest_frame([t for t, h in hists.items() if h is not None and not h.empty])
+    return X.dropna()
+
+def panel_feature_matrix(panel, tickers=None, lookback=PANEL_LOOKBACK):
+    """latest_feature_matrix for a PricePanel, in one vectorized pass over its trailing rows.
+
+    Each ticker's last WINDOW bars within the last ``lookback`` panel rows (skipping dates
+    it has no bar on) give the same row ``featurize`` ends with; tickers with fewer bars
+    are left out, as ``dropna`` does for short histories.
+    """
+    cols = list(range(len(panel.tickers))) if tickers is None else panel.positions(tickers)
+    if len(panel) < WINDOW or not cols:
+        return pd.DataFrame(columns=FEATURES, dtype=float)
+    close = np.asarray(panel.tail(lookback, "close")[:, cols], dtype=np.float64)
+    volume = np.asarray(panel.tail(lookback, "volume")[:, cols], dtype=np.float64)
+    valid = ~np.isnan(close)
+    # a stable sort on the mask lifts each column's gaps to the top and keeps its bars in date order below
+    order = np.argsort(valid, axis=0, kind="stable")
+    c = np.take_along_axis(close, order, axis=0)[-WINDOW:]
+    v = np.take_along_axis(volume, order, axis=0)[-WINDOW:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X = pd.DataFrame({"ret1": c[-1] / c[-2] - 1.0, **{f"lag{k}": c[-1 - k] for k in range(1, N_LAGS + 1)},
+                          "ma10": c.mean(axis=0), "vol_ma10": v.mean(axis=0)}, index=[panel.tickers[j] for j in cols], columns=FEATURES)
+    return X[valid.sum(axis=0) >= WINDOW]
+
+def _as_series(values, index, col=None):
+    if values is None:
+        return pd.Series(0.0, index=index)
+    if isinstance(values, pd.DataFrame):
+        values = values[col] if col in values.columns else pd.Series(dtype=float)
+    return pd.Series(values, dtype=float).reindex(index).fillna(0.0)
+
+@timed("scoring.score_universe")
+def score_universe(hists, clf, insiders=None, buzz=None, horizon=3, ret_thresh=0.01, top_n=25):
+    """Ranked Start-Early board for a universe.
+
+    hists: {ticker: history frame}, or a PricePanel whose tickers are screened straight from
+    its memory-mapped fields; clf: ClassifierModel whose registry supplies models.
+    insiders: frame indexed by ticker with ``buy``/``sell`` counts; buzz: {ticker: count}.
+    Tickers sharing a model (the universe model, or their own) are scored in one
+    ``predict_proba`` call; tickers with no model get a NaN probability.
+    """
+    X = panel_feature_matrix(hists) if isinstance(hists, PricePanel) else latest_feature_matrix(hists, clf.features)
+    board = pd.DataFrame(index=X.index)
+    board["prob_pos"] = np.nan
+    groups = {}
+    for t in X.index:
+        model, _ = clf.resolve(horizon, ret_thresh, ticker=t)
+        if model is not None:
+            groups.setdefault(id(model), (model, []))[1].append(t)
+    for model, tickers in groups.values():
+        board.loc[tickers, "prob_pos"] = model.predict_proba(X.loc[tickers, FEATURES])[:, 1]
+    board["pred_pct"] = np.where(board["prob_pos"].notna(), prob_to_pct(board["prob_pos"].fillna(0.5)), np.nan)
+    board["insider_buy"] = _as_series(insiders, board.index, "buy")
+    board["insider_sell"] = _as_series(insiders, board.index, "sell")
+    board["news_buzz"] = _as_series(buzz, board.index)
+    board["score"] = composite_score(board["insider_buy"], board["insider_sell"], board["news_buzz"], board["pred_pct"])
+    board["signal"] = [signal_level(s) for s in board["score"]]
+    board = board.sort_values("score", ascending=False).head(top_n)
+    return board.rename_axis("ticker").reset_index()
@@ -0,0 +1,280 @@
+import asyncio, json, threading, time
+import numpy as np, pandas as pd
+# websockets==12.0 (requirements.txt): connect/serve are the legacy implementation there and the
+# new asyncio one from 14.0; only the API common to both is used (async with/for, send, close, sockets)
+import websockets
+
+FINNHUB_WS = "wss://ws.finnhub.io?token={token}"
+INTERVALS = {"1s": 1000, "1m": 60000}
+BAR_FIELDS = ["start", "open", "high", "low", "close", "volume"]
+
+class TickRing:
+    """Fixed-capacity ring of (ts_ms, price, size) held in three numpy arrays."""
+    def __init__(self, capacity=4096):
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.size = np.zeros(capacity, dtype=np.float64)
+        self.capacity = capacity
+        self.count = 0  # total ticks ever appended
+
+    def append(self, ts, price, size):
+        i = self.count % self.capacity
+        self.ts[i] = ts
+        self.price[i] = price
+        self.size[i] = size
+        self.count += 1
+
+    def latest(self):
+        if not self.count:
+            return None
+        i = (self.count - 1) % self.capacity
+        return int(self.ts[i]), float(self.price[i]), float(self.size[i])
+
+    def last(self, n=None):
+        """Most recent ``n`` ticks (all retained if None) as a time-ordered frame."""
+        k = min(self.count, self.capacity, n or self.capacity)
+        idx = (np.arange(self.count - k, self.count)) % self.capacity
+        return pd.DataFrame({"ts": self.ts[idx], "price": self.price[idx], "size": self.size[idx]})
+
+class BarAggregator:
+    """Folds ticks into OHLCV bars of ``interval_ms``; completed bars go into a ring of ``capacity`` rows."""
+    def __init__(self, interval_ms, capacity=1440):
+        self.interval = interval_ms
+        self.bars = np.zeros((capacity, len(BAR_FIELDS)), dtype=np.float64)
+        self.capacity = capacity
+        self.count = 0
+        self.current = None  # [start, open, high, low, close, volume]
+
+    def add(self, ts, price, size):
+        start = ts - ts % self.interval
+        cur = self.current
+        if cur is not None and start == cur[0]:
+            if price > cur[2]:
+                cur[2] = price
+            if price < cur[3]:
+                cur[3] = price
+            cur[4] = price
+            cur[5] += size
+            return
+        if cur is not None and start < cur[0]:
+            return  # late tick for a closed bar
+        if cur is not None:
+            self.bars[self.count % self.capacity] = cur
+            self.count += 1
+        self.current = [start, price, price, price, price, size]
+
+    def frame(self, n=None, include_current=True):
+        k = min(self.count, self.capacity, n or self.capacity)
+        rows = self.bars[(np.arange(self.count - k, self.count)) % self.capacity]
+        if include_current and self.current is not None:
+            rows = np.vstack([rows, self.current])
+        df = pd.DataFrame(rows, columns=BAR_FIELDS)
+        df["start"] = pd.to_datetime(df["start"].astype(np.int64), unit="ms")
+        return df.tail(n) if n else df
+
+def parse_finnhub_message(raw):
+    """Finnhub trade message -> [(symbol, ts_ms, price, size), ...]; other message types yield nothing."""
+    msg = json.loads(raw)
+    if msg.get("type") != "trade":
+        return []
+    return [(d["s"], int(d["t"]), float(d["p"]), float(d.get("v") or 0)) for d in msg.get("data") or []]
+
+class QuoteStream:
+    """Single websocket connection streaming trades for many symbols into in-memory buffers.
+
+    Runs its own asyncio loop on a daemon thread (``start()``), or can be awaited with
+    ``run()`` inside an existing loop. Reconnects with backoff and re-subscribes every
+    symbol. ``latest()`` and ``bars()`` are safe to call from any thread.
+    """
+    def __init__(self, url, symbols=(), capacity=4096, bar_capacity=1440, parse=parse_finnhub_message):
+        self.url = url
+        self.capacity = capacity
+        self.bar_capacity = bar_capacity
+        self.parse = parse
+        self.symbols = set()
+        self.ticks = {}
+        self.aggs = {}
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop = None
+        self._ws = None
+        self._thread = None
+        self.subscribe(symbols)
+
+    @classmethod
+    def finnhub(cls, token, symbols=(), **kwargs):
+        return cls(FINNHUB_WS.format(token=token), symbols, **kwargs)
+
+    def subscribe(self, symbols):
+        new = {s.strip().upper() for s in symbols if s and s.strip()} - self.symbols
+        if not new:
+            return
+        with self._lock:
+            for s in new:
+                self.ticks[s] = TickRing(self.capacity)
+                self.aggs[s] = {name: BarAggregator(ms, self.bar_capacity) for name, ms in INTERVALS.items()}
+            self.symbols |= new
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(new), self._loop)
+
+    async def _send_subscribe(self, symbols):
+        ws = self._ws
+        if ws is None:
+            return
+        for s in sorted(symbols):
+            await ws.send(json.dumps({"type": "subscribe", "symbol": s}))
+
+    def on_message(self, raw):
+        ticks = self.parse(raw)
+        if not ticks:
+            return
+        with self._lock:
+            for sym, ts, price, size in ticks:
+                ring = self.ticks.get(sym)
+                if ring is None:
+                    continue
+                ring.append(ts, price, size)
+                for agg in self.aggs[sym].values():
+                    agg.add(ts, price, size)
+
+    async def run(self, max_backoff=30.0):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self._ws = ws
+                    await self._send_subscribe(self.symbols)
+                    self.connected.set()
+                    backoff = 1.0
+                    async for raw in ws:
+                        self.on_message(raw)
+                        if self._stop.is_set():
+                            break
+            except (OSError, websockets.WebSocketException, asyncio.TimeoutError):
+                pass
+            finally:
+                self._ws = None
+                self.connected.clear()
+            if self._stop.is_set():
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._loop = asyncio.new_event_loop()
+        def runner():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.run())
+        self._thread = threading.Thread(target=runner, name="quote-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def latest(self, symbol, max_age=None):
+        """{"symbol", "c", "t", "v"} for the last trade, or None if there is none (or it is older than max_age seconds)."""
+        ring = self.ticks.get(symbol.strip().upper())
+        if ring is None:
+            return None
+        with self._lock:
+            last = ring.latest()
+        if last is None or (max_age is not None and time.time() * 1000 - last[0] > max_age * 1000):
+            return None
+        return {"symbol": symbol.strip().upper(), "c": last[1], "t": last[0], "v": last[2], "source": "stream"}
+
+    def bars(self, symbol, interval="1m", n=None):
+        aggs = self.aggs.get(symbol.strip().upper())
+        if aggs is None:
+            return pd.DataFrame(columns=BAR_FIELDS)
+        with self._lock:
+            return aggs[interval].frame(n)
+
+    def recent_ticks(self, symbol, n=None):
+        ring = self.ticks.get(symbol.strip().upper())
+        if ring is None:
+            return pd.DataFrame(columns=["ts", "price", "size"])
+        with self._lock:
+            return ring.last(n)
+
+class ReplayServer:
+    """Local stand-in for the Finnhub websocket that replays recorded ticks.
+
+    ``ticks`` is a list of (symbol, ts_ms, price, size). After a client subscribes, the
+    matching ticks are sent as Finnhub trade messages, ``batch`` per message, pausing
+    ``delay`` seconds between messages.
+    """
+    def __init__(self, ticks, host="127.0.0.1", port=0, batch=10, delay=0.0):
+        self.ticks = list(ticks)
+        self.host = host
+        self.port = port
+        self.batch = batch
+        self.delay = delay
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, ws, *args):
+        subscribed = set()
+        async def reader():
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("type") == "subscribe":
+                    subscribed.add(msg.get("symbol"))
+        task = asyncio.ensure_future(reader())
+        try:
+            while not subscribed:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)  # let the client finish subscribing
+            for i in range(0, len(self.ticks), self.batch):
+                data = [{"s": s, "t": t, "p": p, "v": v} for s, t, p, v in self.ticks[i:i + self.batch] if s in subscribed]
+                if data:
+                    await ws.send(json.dumps({"type": "trade", "data": data}))
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+            await ws.send(json.dumps({"type": "ping"}))
+            await task
+        except websockets.WebSocketException:
+            pass
+        finally:
+            task.cancel()
+
+    async def _serve(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        def runner():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._serve())
+            self._loop.run_forever()
+        self._thread = threading.Thread(target=runner, name="replay-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        async def shutdown():
+            self._server.close()
+            await self._server.wait_closed()
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop = None
@@ -1,35 +1,62 @@
 import streamlit as st
-from data_feed import DataFeed
-from edgar import EdgarClient
-from news_nlp import analyze_headlines, map_entities_to_ticker
-from models.classifier_model import ClassifierModel
-from tasks import send_webhook_alert, send_email_alert, send_sms_alert, retrain_and_save_model
+from scan import get_services, StartEarlyScan
+from scoring import score_universe
+from universe import universe_tickers
+from alerts import default_dispatcher
+from instrumentation import snapshot, counters
 import pandas as pd, os
 
 st.set_page_config(page_title="Market Monitor Extended", layout="wide")
 st.title("Market Monitor — Extended (EDGAR, NLP, Classifier, Alerts)")
 
 API_KEYS = {"FINNHUB": os.getenv("FINNHUB_API_KEY",""), "ALPHAV": os.getenv("ALPHAV_API_KEY","")}
-df = DataFeed(api_keys=API_KEYS)
-edgar = EdgarClient()
+# process-wide clients and stage caches, shared by every rerun and session
+services = get_services(API_KEYS)
+df, edgar = services.feed, services.edgar
 
 st.header("Start Early — Advanced")
 company = st.text_input("Company name or ticker (e.g., AAPL or Apple Inc.)")
 cik = st.text_input("CIK (optional)")
 if st.button("Scan Start-Early Signals"):
-    st.info("Fetching EDGAR filings...")
-    forms = edgar.get_form4_by_cik(cik) if cik else edgar.search_company_forms(company)
-    st.dataframe(forms.head(50))
-    st.info("Fetching headlines and analyzing...")
-    news = df.fetch_rss_feeds()
-    nlp = analyze_headlines(news)
-    st.dataframe(nlp.head(50))
-    st.info("Mapping entities to tickers...")
-    mapping = map_entities_to_ticker(nlp, api_client=df)
-    st.dataframe(mapping.head(50))
-    st.info("Running classifier prediction...")
-    primary = mapping['ticker'].iloc[0] if not mapping.empty and mapping['ticker'].notnull().any() else (company.upper() if company else "")
-    hist = df.get_historical(primary, provider="Finnhub", days=365) if primary else pd.DataFrame()
-    clf = ClassifierModel()
-    res = clf.predict_from_signals(hist, forms_df=forms, headlines_df=nlp, horizon=3)
-    st.metric("Start-Early probability", f"{res.get('prob_pos',0):.3f}")
\ No newline at end of file
+    # resolve the typed name/ticker with the same matcher the news mapping uses
+    typed = services.index.scan(company)[0] if company else []
+    primary = typed[0][1] if typed else company.strip().upper()
+    if not primary and not cik:
+        # nothing typed: fall back to the most mentioned ticker in recent news
+        mapping = StartEarlyScan(services).news(analyze=True)[0].get("mapping")
+        primary = mapping["ticker"].value_counts().index[0] if mapping is not None and not mapping.empty else ""
+    st.info("Fetching EDGAR filings, headlines and history concurrently...")
+    res = StartEarlyScan(services).run(primary, cik=cik.strip() or None, days=365, horizon=3, analyze_news=True)
+    for stage, err in res["errors"].items():
+        st.warning(f"{stage} unavailable: {err}")
+    st.dataframe(res["transactions"].head(50))
+    if res["headlines"] is not None:
+        st.dataframe(res["headlines"].head(50))
+        st.dataframe(res["mapping"].head(50))
+    prob = res["prob_pos"]
+    st.metric("Start-Early probability", f"{prob:.3f}" if prob is not None else "N/A (no model yet)")
+    st.metric("Composite score", f"{res['score']:.2f}", res["signal"])
+    st.caption("Stage seconds: " + ", ".join(f"{k} {v:.2f}" + (" (cached)" if res["cached"].get(k) else "") for k, v in res["timings"].items()))
+
+st.header("Early-Opportunity Board")
+board_n = st.slider("Names to show", 5, 50, 20)
+if st.button("Rank Universe"):
+    tickers = universe_tickers()
+    # screened from the memory-mapped panel rather than one DataFrame per ticker
+    panel = df.build_panel(tickers, provider="Finnhub", days=365)
+    insiders = edgar.insider_scores(tickers, days=90, refresh=False)
+    board = score_universe(panel, services.classifier, insiders=insiders, buzz=services.buzz.buzz_many(tickers, "72h"), horizon=3, top_n=board_n)
+    st.dataframe(board)
+    # queued for background delivery (digested, deduped per ticker per day, throttled); ranking never waits on it
+    targets = [(ch, os.getenv(var, "")) for ch, var in (("webhook", "ALERT_WEBHOOK_URL"), ("email", "ALERT_EMAIL"), ("sms", "ALERT_SMS"))]
+    day = pd.Timestamp.utcnow().strftime("%Y-%m-%d")
+    for row in board[board["signal"] == "High"].itertuples():
+        for channel, recipient in targets:
+            if recipient:
+                default_dispatcher().submit(channel, recipient, f"Start-Early High signal: {row.ticker}",
+                                            f"score {row.score:.2f}, prob_pos {row.prob_pos:.3f}", key=f"{row.ticker}:{day}",
+                                            payload={"ticker": row.ticker, "score": float(row.score), "signal": row.signal})
+
+with st.expander("Diagnostics"):
+    st.dataframe(snapshot().round(2))
+    st.json(counters())
@@ -1,4 +1,11 @@
-import requests, os, smtplib, time
+"""Alert helpers and the background model retraining jobs.
+
+    python -m tasks                    # retrain the universe every day at 02:00 (RETRAIN_AT)
+    python -m tasks --once AAPL MSFT   # retrain now and exit
+"""
+import argparse, requests, os, sys, smtplib, time, json, threading
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from email.message import EmailMessage
 
 def send_webhook_alert(url, payload):
@@ -43,14 +50,178 @@ def send_sms_alert(phone, message):
     except Exception as e:
         return {"error":str(e)}
 
-def retrain_and_save_model(example_ticker="AAPL", days=1000):
+HORIZONS = (1, 2, 3, 5, 7)  # model_registry.TRAINED_HORIZONS sizes the model LRU from this
+JOB_LOG = os.getenv("RETRAIN_JOB_LOG", "retrain_jobs.jsonl")
+RETRAIN_AT = os.getenv("RETRAIN_AT", "02:00")
+
+def _retrain_ticker(ticker, horizons, ret_thresh, days, provider, n_jobs, registry_root):
+    """Worker-process job: train every horizon for one ticker from the on-disk history cache."""
+    from data_feed import DataFeed
+    from classifier_model import ClassifierModel
+    from model_registry import ModelRegistry
+    records = []
     try:
-        from data_feed import DataFeed
-        from models.classifier_model import ClassifierModel
-        df = DataFeed()
-        hist = df.get_historical(example_ticker, provider="AlphaVantage", days=days)
-        clf = ClassifierModel()
-        metrics = clf.train(hist, horizon=3, ret_thresh=0.01)
-        return "classifier_model.pkl"
+        hist = DataFeed().get_historical(ticker, provider=provider, days=days)
     except Exception as e:
-        return str(e)
\ No newline at end of file
+        hist, fetch_error = None, str(e)
+    else:
+        fetch_error = None if hist is not None and not hist.empty else "no history"
+    clf = ClassifierModel(registry=ModelRegistry(registry_root))
+    for h in horizons:
+        started = time.time()
+        rec = {"ticker": ticker, "horizon": h, "ret_thresh": ret_thresh, "started_at": started, "n_jobs": n_jobs}
+        if fetch_error:
+            rec.update(status="error", error=fetch_error)
+        else:
+            try:
+                metrics = clf.train(hist, horizon=h, ret_thresh=ret_thresh, scope=ticker, n_jobs=n_jobs)
+                rec.update(status="ok", metrics=metrics, artifact=clf.meta["artifact"], rows=len(hist))
+            except Exception as e:
+                rec.update(status="error", error=str(e))
+        rec["duration_s"] = round(time.time() - started, 3)
+        records.append(rec)
+    return records
+
+def retrain_universe(tickers, horizons=HORIZONS, ret_thresh=0.01, days=1000, provider="AlphaVantage",
+                     max_workers=None, n_jobs=None, log_path=JOB_LOG):
+    """Retrain every (ticker, horizon) across a process pool and publish each model to the registry.
+
+    Histories are fetched once in this process first, so the provider rate limiter is shared
+    and the workers read them back from the OHLCV cache. ``n_jobs`` is the total CPU budget:
+    it is split between the worker processes and each forest's own ``n_jobs``. Each job's
+    record (status, duration, metrics, artifact) is appended to ``log_path`` as JSON lines.
+    """
+    from data_feed import DataFeed
+    from model_registry import default_registry
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    if not tickers:
+        return []
+    started = time.time()
+    hists = DataFeed().get_historical_many(tickers, provider=provider, days=days)
+    ready = [t for t in tickers if hists.get(t) is not None and not hists[t].empty]
+    budget = max(1, n_jobs or os.cpu_count() or 1)
+    workers = max(1, min(max_workers or budget, len(ready) or 1, budget))
+    per_job = max(1, budget // workers)
+    records = [rec for t in tickers if t not in ready for rec in _error_records(t, horizons, ret_thresh, started, per_job, "no history")]
+    _log_records(records, log_path)
+    if not ready:
+        return records
+    root = default_registry().root
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        submitted = time.time()
+        futures = {ex.submit(_retrain_ticker, t, tuple(horizons), ret_thresh, days, provider, per_job, root): t for t in ready}
+        for fut in as_completed(futures):
+            try:
+                batch = fut.result()
+            except Exception as e:
+                batch = _error_records(futures[fut], horizons, ret_thresh, submitted, per_job, str(e))
+            records.extend(batch)
+            _log_records(batch, log_path)
+    return records
+
+def _error_records(ticker, horizons, ret_thresh, started, n_jobs, error):
+    """Failed job records in the same shape as the ones _retrain_ticker returns."""
+    duration = round(time.time() - started, 3)
+    return [{"ticker": ticker, "horizon": h, "ret_thresh": ret_thresh, "started_at": started, "n_jobs": n_jobs,
+             "status": "error", "error": error, "duration_s": duration} for h in horizons]
+
+def _log_records(records, log_path):
+    if not log_path or not records:
+        return
+    with open(log_path, "a") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+
+def load_job_log(log_path=JOB_LOG):
+    import pandas as pd
+    if not os.path.exists(log_path):
+        return pd.DataFrame()
+    return pd.read_json(log_path, lines=True)
+
+class RetrainScheduler:
+    """Background thread that runs ``retrain_universe`` once a day at ``at`` (local HH:MM)."""
+    def __init__(self, tickers, at=RETRAIN_AT, **kwargs):
+        self.tickers = tickers
+        self.at = at
+        self.kwargs = kwargs
+        self.last_run = None
+        self.last_records = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def seconds_until_next(self, now=None):
+        now = datetime.now() if now is None else now
+        hh, mm = (int(x) for x in self.at.split(":"))
+        nxt = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
+        if nxt <= now:
+            nxt += timedelta(days=1)
+        return (nxt - now).total_seconds()
+
+    def run_now(self):
+        self.last_records = retrain_universe(self.tickers, **self.kwargs)
+        self.last_run = time.time()
+        return self.last_records
+
+    def _loop(self):
+        while not self._stop.wait(self.seconds_until_next()):
+            try:
+                self.run_now()
+            except Exception:
+                pass
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="retrain-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+def retrain_and_save_model(example_ticker="AAPL", days=1000):
+    """Retrain the 3-day model for one ticker; returns its job record (status, metrics, artifact or error)."""
+    records = retrain_universe([example_ticker], horizons=(3,), days=days, max_workers=1)
+    return records[0] if records else {"ticker": example_ticker, "status": "error", "error": "empty ticker"}
+
+def _summary(records):
+    ok = sum(r.get("status") == "ok" for r in records)
+    return f"{ok}/{len(records)} models trained" + "".join(
+        f"\n  {r['ticker']} h{r['horizon']}: {r.get('error')}" for r in records if r.get("status") != "ok")
+
+def main(argv=None):
+    from universe import universe_tickers
+    ap = argparse.ArgumentParser(description="Retrain the per-ticker classifiers into the model registry.")
+    ap.add_argument("tickers", nargs="*", help="default: the scan universe (MARKET_UNIVERSE)")
+    ap.add_argument("--once", action="store_true", help="retrain now and exit instead of scheduling daily runs")
+    ap.add_argument("--at", default=RETRAIN_AT, help="local HH:MM of the daily run")
+    ap.add_argument("--horizons", type=int, nargs="+", default=list(HORIZONS))
+    ap.add_argument("--ret-thresh", type=float, default=0.01)
+    ap.add_argument("--days", type=int, default=1000)
+    ap.add_argument("--provider", default="AlphaVantage")
+    ap.add_argument("--max-workers", type=int)
+    ap.add_argument("--n-jobs", type=int, help="total CPU budget (default: all cores)")
+    ap.add_argument("--log", default=JOB_LOG, help="JSON-lines job log")
+    args = ap.parse_args(argv)
+    kwargs = {"horizons": tuple(args.horizons), "ret_thresh": args.ret_thresh, "days": args.days, "provider": args.provider,
+              "max_workers": args.max_workers, "n_jobs": args.n_jobs, "log_path": args.log}
+    tickers = [t.upper() for t in args.tickers] or universe_tickers()
+    if args.once:
+        records = retrain_universe(tickers, **kwargs)
+        print(_summary(records))
+        return 0 if records and all(r.get("status") == "ok" for r in records) else 1
+    scheduler = RetrainScheduler(tickers, at=args.at, **kwargs).start()
+    print(f"Retraining {len(tickers)} tickers daily at {args.at}; next run in {scheduler.seconds_until_next() / 3600:.1f}h (Ctrl-C to stop)")
+    shown = None
+    try:
+        while scheduler._thread.is_alive():
+            scheduler._thread.join(60)
+            if scheduler.last_run != shown:
+                shown = scheduler.last_run
+                print(time.strftime("%Y-%m-%d %H:%M", time.localtime(shown)), _summary(scheduler.last_records), flush=True)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def standin(monkeypatch):
+    """Local provider stand-in (see benchmark.StandIn) for a small synthetic universe, with rate limits lifted."""
+    import data_feed
+    from benchmark import StandIn, synthetic_universe
+    monkeypatch.setattr(data_feed, "RATE_LIMITS", {"finnhub": 1e9, "alphavantage": 1e9})
+    server = StandIn(synthetic_universe(5), days=300).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def feed(standin, tmp_path):
+    """DataFeed pointed at the stand-in, with its cache and headline store under tmp_path."""
+    from data_feed import DataFeed
+    from ohlcv_cache import OHLCVCache
+    from headline_store import HeadlineStore
+    return DataFeed(api_keys={"FINNHUB": "test", "ALPHAV": "test"}, cache=OHLCVCache(str(tmp_path / "ohlcv.db")),
+                    headlines=HeadlineStore(str(tmp_path / "headlines.db")),
+                    base_urls={"finnhub": standin.base + "/finnhub", "alphavantage": standin.base + "/alphav"})
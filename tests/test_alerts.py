@@ -0,0 +1,229 @@
+import email, json, socketserver, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+import pytest
+from alerts import AlertDispatcher, SMTPConnection
+
+def wait_for(cond, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server (smtpd is gone in 3.12): accepts every message and keeps it."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.messages, self.connections = [], 0
+        super().__init__(("127.0.0.1", 0), self.Handler)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(line.encode() + b"\r\n")
+
+        def handle(self):
+            self.server.connections += 1
+            self.reply("220 sink ready")
+            rcpt = []
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                cmd = line.decode().strip().upper()
+                if cmd.startswith(("EHLO", "HELO")):
+                    self.reply("250 sink")
+                elif cmd.startswith("RCPT"):
+                    rcpt.append(line.decode().split(":", 1)[1].strip().strip("<>"))
+                    self.reply("250 ok")
+                elif cmd == "DATA":
+                    self.reply("354 end with .")
+                    data = b""
+                    while not data.endswith(b"\r\n.\r\n"):
+                        chunk = self.rfile.readline()
+                        if not chunk:
+                            return
+                        data += chunk
+                    self.server.messages.append((rcpt, email.message_from_bytes(data[:-5])))
+                    rcpt = []
+                    self.reply("250 queued")
+                elif cmd == "QUIT":
+                    self.reply("221 bye")
+                    return
+                else:  # MAIL, RSET, NOOP
+                    self.reply("250 ok")
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    yield sink
+    sink.shutdown()
+    sink.server_close()
+
+@pytest.fixture
+def http_sink():
+    """Records POSTed bodies per path; ``fail`` answers 500 to that many requests first, ``delay`` slows every reply."""
+    state = {"posts": [], "fail": 0, "delay": 0.0}
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(state["delay"])
+            failing = state["fail"] > 0
+            if failing:
+                state["fail"] -= 1
+            else:
+                state["posts"].append((self.path, self.headers.get("Content-Type", ""), body))
+            self.send_response(500 if failing else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["base"] = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def make():
+    made = []
+    def factory(**kw):
+        kw.setdefault("smtp", SMTPConnection(host="", sender=""))
+        made.append(AlertDispatcher(**kw))
+        return made[-1]
+    yield factory
+    for d in made:
+        d.close(timeout=5)
+
+def webhook_alerts(state, path="/hook"):
+    return [json.loads(b)["alerts"] for p, _, b in state["posts"] if p == path]
+
+def test_digest_format():
+    assert AlertDispatcher.digest([{"subject": "A", "body": "x"}]) == ("A", "x")
+    subject, body = AlertDispatcher.digest([{"subject": s, "body": ""} for s in "ABCD"])
+    assert subject == "4 alerts: A, B, C ..." and body == "- A\n\n- B\n\n- C\n\n- D"
+
+def test_webhook_burst_is_one_digest(make, http_sink):
+    d = make(digest_window=0.3)
+    url = http_sink["base"] + "/hook"
+    for i in range(3):
+        assert d.submit("webhook", url, f"alert {i}", payload={"i": i})
+    assert wait_for(lambda: http_sink["posts"])
+    assert d.flush(5)
+    assert webhook_alerts(http_sink) == [[{"i": 0}, {"i": 1}, {"i": 2}]]
+    assert d.stats["sent"] == 3 and d.stats["messages"] == 1
+
+def test_dedupe_by_key(make, http_sink):
+    d = make(digest_window=0.0, dedupe_ttl=60)
+    url = http_sink["base"] + "/hook"
+    assert d.submit("webhook", url, "AAPL high", key="AAPL:2024-01-02")
+    assert not d.submit("webhook", url, "AAPL high again", key="AAPL:2024-01-02")
+    assert d.submit("webhook", http_sink["base"] + "/other", "AAPL high", key="AAPL:2024-01-02")
+    assert d.flush(5)
+    assert d.stats["deduped"] == 1 and len(http_sink["posts"]) == 2
+
+def test_throttled_alerts_wait_and_coalesce(make, http_sink):
+    d = make(digest_window=0.0, rates={"webhook": 6})  # one token, refilled every 10 s
+    url = http_sink["base"] + "/hook"
+    d.submit("webhook", url, "first")
+    assert wait_for(lambda: len(http_sink["posts"]) == 1)
+    d.submit("webhook", url, "second")
+    d.submit("webhook", url, "third")
+    time.sleep(0.6)
+    assert len(http_sink["posts"]) == 1 and len(d._pending[("webhook", url)][1]) == 2
+    d._bucket("webhook", url).tokens = 1.0  # fast-forward the refill
+    assert d.flush(5)
+    assert [[a["subject"] for a in batch] for batch in webhook_alerts(http_sink)] == [["first"], ["second", "third"]]
+
+def test_submit_never_blocks_on_delivery(make, http_sink):
+    http_sink["delay"] = 0.2
+    d = make(digest_window=0.0, workers=2)
+    start = time.perf_counter()
+    for i in range(10):
+        assert d.submit("webhook", f"{http_sink['base']}/h{i}", f"alert {i}")
+    assert time.perf_counter() - start < 0.1
+    assert d.flush(30) and len(http_sink["posts"]) == 10
+
+def test_failed_delivery_is_retried(make, http_sink):
+    http_sink["fail"] = 2
+    d = make(digest_window=0.0, backoff=0.01, retries=3)
+    d.submit("webhook", http_sink["base"] + "/hook", "eventually")
+    assert d.flush(10)
+    assert d.stats["retried"] == 2 and d.stats["sent"] == 1 and len(http_sink["posts"]) == 1
+
+def test_gives_up_after_retries(make, http_sink):
+    http_sink["fail"] = 10
+    d = make(digest_window=0.0, backoff=0.01, retries=1)
+    d.submit("webhook", http_sink["base"] + "/hook", "never")
+    assert d.flush(10)
+    assert d.stats["failed"] == 1 and "500" in d.errors[-1]["error"]
+
+def test_email_reuses_one_smtp_session(make, smtp_sink):
+    smtp = SMTPConnection(host="127.0.0.1", port=smtp_sink.server_address[1], starttls=False, sender="alerts@example.com")
+    d = make(digest_window=0.0, smtp=smtp, rates={"email": 600})
+    d.submit("email", "a@example.com", "AAPL high", "score 12")
+    d.submit("email", "b@example.com", "MSFT high", "score 11")
+    assert d.flush(10)
+    assert sorted((r[0], m["Subject"]) for r, m in smtp_sink.messages) == [("a@example.com", "AAPL high"), ("b@example.com", "MSFT high")]
+    assert smtp_sink.messages[0][1]["From"] == "alerts@example.com" and smtp_sink.connections == 1
+
+def test_email_digest(make, smtp_sink):
+    smtp = SMTPConnection(host="127.0.0.1", port=smtp_sink.server_address[1], starttls=False, sender="alerts@example.com")
+    d = make(digest_window=0.3, smtp=smtp)
+    for t in ("AAPL", "MSFT"):
+        d.submit("email", "a@example.com", f"{t} high", "details")
+    assert wait_for(lambda: smtp_sink.messages) and d.flush(5)
+    (rcpt, msg), = smtp_sink.messages
+    assert msg["Subject"] == "2 alerts: AAPL high, MSFT high" and "- MSFT high" in msg.get_payload()
+
+def test_email_without_smtp_fails_without_retrying(make):
+    d = make(digest_window=0.0, retries=3, backoff=0.01)
+    d.submit("email", "a@example.com", "x")
+    assert d.flush(5) and d.errors[-1]["error"] == "SMTP not configured"
+    assert d.stats["retried"] == 0 and d.stats["failed"] == 1
+
+def test_unexpected_sender_error_is_a_failed_delivery(make, http_sink, monkeypatch):
+    d = make(digest_window=0.0, workers=1, backoff=0.01, retries=1)
+    deliver, calls = d._deliver, []
+    def broken(channel, recipient, alerts):
+        calls.append(recipient)
+        if recipient.endswith("/bad"):
+            raise KeyError("payload")
+        return deliver(channel, recipient, alerts)
+    monkeypatch.setattr(d, "_deliver", broken)
+    d.submit("webhook", http_sink["base"] + "/bad", "boom")
+    assert d.flush(5) and d._inflight == 0
+    assert d.stats["retried"] == 1 and d.stats["failed"] == 1 and "payload" in d.errors[-1]["error"]
+    # the single worker survived and still delivers
+    d.submit("webhook", http_sink["base"] + "/hook", "fine")
+    assert d.flush(5) and d.stats["sent"] == 1 and len(calls) == 3
+
+def test_dropped_alert_does_not_suppress_repeats(make, http_sink):
+    d = make(digest_window=60, max_pending=1)
+    url = http_sink["base"] + "/hook"
+    assert d.submit("webhook", url, "first")
+    assert not d.submit("webhook", url, "AAPL high", key="AAPL:2024-01-02")
+    assert d.stats["dropped"] == 1
+    assert d.flush(5)
+    assert d.submit("webhook", url, "AAPL high", key="AAPL:2024-01-02")
+    assert d.flush(5) and d.stats["deduped"] == 0
+    assert [a["subject"] for batch in webhook_alerts(http_sink) for a in batch] == ["first", "AAPL high"]
+
+def test_sms_via_twilio_api(make, http_sink, monkeypatch):
+    for k, v in {"TWILIO_SID": "AC1", "TWILIO_TOKEN": "t", "TWILIO_FROM": "+15550000"}.items():
+        monkeypatch.setenv(k, v)
+    d = make(digest_window=0.0, twilio_base_url=http_sink["base"])
+    d.submit("sms", "+15551234", "AAPL high", "score 12")
+    assert d.flush(5)
+    (path, ctype, body), = http_sink["posts"]
+    assert path == "/2010-04-01/Accounts/AC1/Messages.json" and "form-urlencoded" in ctype
+    assert parse_qs(body.decode()) == {"From": ["+15550000"], "To": ["+15551234"], "Body": ["AAPL high: score 12"]}
+
+def test_unknown_channel(make):
+    with pytest.raises(ValueError):
+        make().submit("pigeon", "x", "y")
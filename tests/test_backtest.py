@@ -0,0 +1,71 @@
+import numpy as np, pandas as pd
+import pytest
+from backtest import (Backtester, simulate, summarize, signals_to_positions, sma_positions, strategy_simple_moving_average,
+                      grid_sweep, walk_forward, _sma)
+
+def prices(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0.0003, 0.01, n))
+
+def test_fill_at_next_close_no_same_bar_lookahead():
+    # long decided on bar 1 fills at bar 2's close (200), so the 100 -> 200 jump is not captured
+    equity, strat, held = simulate([100, 100, 200, 200], [0, 1, 1, 1], fee_bps=0.0)
+    np.testing.assert_allclose(equity, [1, 1, 1, 1])
+    np.testing.assert_allclose(held, [0, 0, 0, 1])
+    equity, _, _ = simulate([100, 100, 100, 200], [0, 1, 1, 1], fee_bps=0.0)
+    np.testing.assert_allclose(equity, [1, 1, 1, 2])
+
+def test_fees_are_charged_on_the_fill_bar():
+    _, strat, _ = simulate([100, 100, 100, 100, 100], [1, 0, 0, 0, 0], fee_bps=10.0)
+    np.testing.assert_allclose(strat, [0, -0.001, -0.001, 0, 0])
+
+def test_signals_to_positions():
+    np.testing.assert_array_equal(signals_to_positions([0, 1, 0, 0, -1, 0, 1]), [0, 1, 1, 1, 0, 0, 1])
+    np.testing.assert_array_equal(signals_to_positions([[1, 0], [-1, 0]]), [[1, 1], [0, 0]])
+
+def test_sma_matches_pandas():
+    close = prices(50)
+    np.testing.assert_allclose(_sma(close, 10), pd.Series(close).rolling(10).mean(), equal_nan=True)
+
+def test_simulate_rows_match_single_runs():
+    close = prices(300)
+    pos = sma_positions(close, [(5, 20), (10, 50)])
+    equity, _, _ = simulate(close, pos)
+    for i in range(2):
+        np.testing.assert_allclose(equity[i], simulate(close, pos[i])[0])
+
+def test_grid_sweep_matches_backtester_loop():
+    close = prices(400)
+    df = pd.DataFrame({"date": pd.bdate_range("2022-01-03", periods=len(close)), "close": close, "volume": 1000})
+    grid = grid_sweep(close, [5, 10, 20], [20, 50], fee_bps=2.0, max_workers=1).set_index(["short", "long"])
+    assert list(grid.index) and len(grid) == 5
+    bt = Backtester(initial_capital=1.0, fee_bps=2.0)
+    for (s, l), row in grid.iterrows():
+        summary = bt.run_signals(df, strategy_simple_moving_average, short=s, long=l)["summary"]
+        assert summary["final_capital"] == pytest.approx(row["final_capital"])
+        assert summary["sharpe"] == pytest.approx(row["sharpe"])
+        assert summary["n_trades"] == row["n_trades"]
+
+def test_grid_sweep_parallel_matches_serial(monkeypatch):
+    import backtest
+    monkeypatch.setattr(backtest, "CHUNK", 4)
+    close = prices(300, seed=1)
+    serial = grid_sweep(close, range(2, 12, 2), range(10, 40, 10), max_workers=1)
+    parallel = grid_sweep(close, range(2, 12, 2), range(10, 40, 10), max_workers=2)
+    pd.testing.assert_frame_equal(serial.sort_values(["short", "long"]).reset_index(drop=True),
+                                  parallel.sort_values(["short", "long"]).reset_index(drop=True))
+
+def test_walk_forward_is_out_of_sample():
+    close = prices(700, seed=2)
+    folds, equity = walk_forward(close, [5, 10], [20, 40], train=300, test=100, fee_bps=0.0, max_workers=1)
+    assert list(folds["test_start"]) == [300, 400, 500, 600]
+    assert len(equity) == len(close) - 300
+    # changing prices after a fold's test window cannot change that fold's curve
+    later = close.copy()
+    later[500:] *= np.linspace(1.0, 3.0, 200)
+    f2, e2 = walk_forward(later, [5, 10], [20, 40], train=300, test=100, fee_bps=0.0, max_workers=1)
+    np.testing.assert_allclose(e2[:100], equity[:100])
+
+def test_summarize_drawdown():
+    m = summarize(np.array([1.0, 1.2, 0.9, 1.1]), np.array([0.0, 0.2, -0.25, 0.22]), np.array([0, 1, 1, 1]))
+    assert m["max_drawdown_pct"][0] == pytest.approx(-25.0) and m["n_trades"][0] == 1
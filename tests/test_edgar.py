@@ -0,0 +1,117 @@
+import json, threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pytest
+from edgar import EdgarClient, EdgarIndex, parse_form4
+
+RECENT = (date.today() - timedelta(days=10)).isoformat()
+OLD = (date.today() - timedelta(days=400)).isoformat()
+
+def form4(ticker, cik, txs):
+    rows = "".join(f"""<{kind}><transactionDate><value>{d}</value></transactionDate>
+        <transactionCoding><transactionFormType>4</transactionFormType><transactionCode>{code}</transactionCode></transactionCoding>
+        <transactionAmounts><transactionShares><value>{shares}</value></transactionShares>
+        <transactionPricePerShare><value>{price}</value></transactionPricePerShare>
+        <transactionAcquiredDisposedCode><value>{ad}</value></transactionAcquiredDisposedCode></transactionAmounts>
+        <postTransactionAmounts><sharesOwnedFollowingTransaction><value>5000</value></sharesOwnedFollowingTransaction></postTransactionAmounts>
+        </{kind}>""" for kind, d, code, shares, price, ad in txs)
+    return f"""<?xml version="1.0"?><ownershipDocument><schemaVersion>X0508</schemaVersion><documentType>4</documentType>
+        <issuer><issuerCik>{cik:010d}</issuerCik><issuerName>Apple Inc.</issuerName><issuerTradingSymbol>{ticker.lower()}</issuerTradingSymbol></issuer>
+        <reportingOwner><reportingOwnerId><rptOwnerCik>0001214156</rptOwnerCik><rptOwnerName>Doe Jane</rptOwnerName></reportingOwnerId></reportingOwner>
+        <nonDerivativeTable>{rows}</nonDerivativeTable></ownershipDocument>""".encode()
+
+FILINGS = {
+    "0000320193-24-000001": form4("AAPL", 320193, [("nonDerivativeTransaction", RECENT, "P", "100", "180.5", "A"),
+                                                   ("nonDerivativeTransaction", RECENT, "S", "40", "181", "D")]),
+    "0000320193-24-000002": form4("AAPL", 320193, [("nonDerivativeTransaction", RECENT, "P", "10", "179", "A"),
+                                                   ("derivativeTransaction", RECENT, "M", "500", "", "A"),
+                                                   ("nonDerivativeTransaction", OLD, "S", "999", "150", "D")]),
+}
+TICKERS = {"0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+           "1": {"cik_str": 1418121, "ticker": "APLE", "title": "Apple Hospitality REIT, Inc."},
+           "2": {"cik_str": 6951, "ticker": "AMAT", "title": "Applied Materials Inc"},
+           "3": {"cik_str": 1018724, "ticker": "AMZN", "title": "Amazon Com Inc"}}
+
+@pytest.fixture
+def sec():
+    """Local stand-in for the SEC endpoints the client uses, counting requests per path."""
+    hits = []
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        def do_GET(self):
+            u = urlparse(self.path)
+            hits.append(u.path)
+            status, body = route(u.path, parse_qs(u.query))
+            body = body if isinstance(body, bytes) else body.encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    base = f"http://127.0.0.1:{server.server_port}"
+    def route(path, q):
+        if path == "/files/company_tickers.json":
+            return 200, json.dumps(TICKERS)
+        if path == "/cgi-bin/browse-edgar":
+            if q["CIK"][0] != "320193":
+                return 200, "<?xml version='1.0'?><feed xmlns='http://www.w3.org/2005/Atom'><title>empty</title></feed>"
+            entries = "".join(f"<entry><title>4 - Apple Inc.</title><link href='{base}/Archives/edgar/data/320193/{a.replace('-', '')}/{a}-index.htm'/>"
+                              f"<id>urn:tag:sec.gov,2008:accession-number={a}</id><updated>{RECENT}T00:00:00-05:00</updated></entry>" for a in FILINGS)
+            return 200, f"<?xml version='1.0'?><feed xmlns='http://www.w3.org/2005/Atom'><title>Apple</title>{entries}</feed>"
+        parts = path.split("/")
+        if path.startswith("/Archives/edgar/data/320193/"):
+            acc = next(a for a in FILINGS if a.replace("-", "") == parts[5])
+            if parts[-1] == "index.json":
+                return 200, json.dumps({"directory": {"item": [{"name": "FilingSummary.xml"}, {"name": "wf-form4.xml"}]}})
+            if parts[-1] == "wf-form4.xml":
+                return 200, FILINGS[acc]
+        return 404, ""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield base, hits
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(sec, tmp_path):
+    return EdgarClient(db_path=str(tmp_path / "edgar.db"), base_url=sec[0])
+
+def test_parse_form4():
+    issuer, rows = parse_form4(FILINGS["0000320193-24-000002"])
+    assert issuer == {"cik": 320193, "name": "Apple Inc.", "ticker": "AAPL"}
+    assert [(r["code"], r["shares"], r["acq_disp"], r["derivative"]) for r in rows] == [("P", 10.0, "A", 0), ("M", 500.0, "A", 1), ("S", 999.0, "D", 0)]
+    assert rows[1]["price"] is None and rows[0]["insider"] == "Doe Jane" and rows[0]["insider_cik"] == 1214156
+
+def test_resolve_cik(client, sec):
+    assert client.resolve_cik("") is None and client.resolve_cik("   ") is None and client.resolve_cik(None) is None
+    assert sec[1] == []  # blank input never downloads company_tickers.json
+    assert client.resolve_cik("0000320193") == 320193
+    assert client.resolve_cik("apple") == 320193
+    assert client.resolve_cik("Apple Hosp") == 1418121
+    assert client.resolve_cik("Zebra Widgets") is None
+    assert client.resolve_cik("amat") == 6951 and client.resolve_cik("Appli") == 6951
+    assert sec[1].count("/files/company_tickers.json") == 1
+
+def test_lookup_ranks_whole_word_and_shorter_names(tmp_path):
+    index = EdgarIndex(str(tmp_path / "edgar.db"))
+    index.upsert_companies([(v["cik_str"], v["ticker"], v["title"]) for v in TICKERS.values()])
+    assert [r["ticker"] for r in index.lookup("apple")] == ["AAPL", "APLE"]
+    assert [r["ticker"] for r in index.lookup("app")] == ["AAPL", "AMAT", "APLE"]
+    assert [r["ticker"] for r in index.lookup("amzn")] == ["AMZN"]
+
+def test_crawl_form4_is_incremental(client, sec):
+    assert client.crawl_form4(320193) == 2
+    tx = client.index.transactions(cik=320193)
+    assert len(tx) == 5 and set(tx["ticker"]) == {"AAPL"}
+    assert client.crawl_form4(320193) == 0  # within max_age: no request at all
+    n = len(sec[1])
+    assert client.crawl_form4(320193, max_age=0) == 0
+    assert sec[1][n:] == ["/cgi-bin/browse-edgar"]  # known accessions are not fetched again
+
+def test_insider_scores(client):
+    scores = client.insider_scores(["AAPL", "AMZN"], days=90)
+    assert scores.loc["AAPL", "buy"] == 2 and scores.loc["AAPL", "sell"] == 1
+    assert scores.loc["AAPL", "net_shares"] == pytest.approx(100 - 40 + 10)
+    assert scores.loc["AMZN"].tolist() == [0, 0, 0]
+    assert len(client.search_company_forms("Apple")) == 5
@@ -0,0 +1,72 @@
+import threading
+import pandas as pd
+import pytest
+from entity_index import TickerIndex, BuzzCounter, ALL
+from universe import UNIVERSE
+
+@pytest.fixture(scope="module")
+def index():
+    return TickerIndex.from_universe()
+
+def tickers(index, text):
+    return sorted({t for _, t in index.scan(text)[0]})
+
+def test_names_aliases_and_symbols(index):
+    assert tickers(index, "Google unveils new AI chip") == ["GOOGL"]
+    assert tickers(index, "Facebook parent Meta beats; Alphabet slips") == ["GOOGL", "META"]
+    assert tickers(index, "JPMorgan and Goldman lead bank rally") == ["GS", "JPM"]
+    assert tickers(index, "apple shares rise as $TSLA and NVDA fall") == ["AAPL", "NVDA", "TSLA"]
+    # single-letter symbols only with a $ prefix; symbols are case-sensitive
+    assert tickers(index, "A V-shaped recovery") == [] and tickers(index, "$V rallies") == ["V"]
+    assert tickers(index, "msft") == []
+
+def test_every_universe_ticker_is_matched_by_name(index):
+    for t, name in UNIVERSE.items():
+        assert t in tickers(index, f"Shares of {name} moved"), name
+
+def test_keyword_hits(index):
+    assert index.scan("Chipmaker announces buyback and AI expansion")[1] == 4
+    assert index.scan("") == ([], 0)
+
+class Clock:
+    def __init__(self, t):
+        self.t = t
+    def __call__(self):
+        return self.t
+
+def frame(rows, now):
+    return pd.DataFrame([{"guid": g, "title": text, "published": pd.Timestamp(now - age, unit="s", tz="UTC")} for g, text, age in rows])
+
+def test_buzz_windows_expire(index):
+    clock = Clock(1_000_000.0)
+    buzz = BuzzCounter(clock=clock)
+    buzz.ingest(frame([("a", "Apple earnings surge", 600), ("b", "Apple hiring", 7200), ("c", "Apple news", 100_000)], clock.t), index)
+    assert buzz.buzz("AAPL", "1h") == 3 and buzz.buzz("AAPL", "24h") == 5 and buzz.buzz("AAPL", "72h") == 6
+    assert buzz.buzz(ALL, "72h") == 3
+    clock.t += 86400
+    assert buzz.buzz("AAPL", "1h") == 0 and buzz.buzz("AAPL", "24h") == 0 and buzz.buzz("AAPL", "72h") == 6
+
+def test_ingest_dedupes_and_skips_old(index):
+    clock = Clock(1_000_000.0)
+    buzz = BuzzCounter(clock=clock)
+    df = frame([("a", "Tesla launch", 10), ("old", "Tesla launch", 400_000)], clock.t)
+    assert buzz.ingest(df, index) == 1
+    assert buzz.ingest(df, index) == 0
+    assert buzz.buzz("TSLA") == 2 and buzz.buzz_many(["TSLA", "AAPL"]) == {"TSLA": 2, "AAPL": 0}
+
+def test_concurrent_ingest_counts_each_headline_once(index):
+    buzz = BuzzCounter()
+    now = pd.Timestamp.utcnow().timestamp()
+    df = frame([(f"g{i}", "Nvidia chip demand", 60) for i in range(200)], now)
+    start = threading.Barrier(8)
+    counts = []
+    def worker():
+        start.wait()
+        counts.append(buzz.ingest(df, index))
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(counts) == 200
+    assert buzz.buzz("NVDA") == 200 * 2 and buzz.buzz(ALL) == 200
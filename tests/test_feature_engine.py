@@ -0,0 +1,117 @@
+import numpy as np, pandas as pd
+import pytest
+from feature_engine import FeatureEngine, FEATURES, latest_features, RESYNC_EVERY
+from classifier_model import ClassifierModel
+from model_registry import ModelRegistry
+
+def hist(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, n))
+    return pd.DataFrame({"date": pd.bdate_range("2023-01-02", periods=n), "open": close, "high": close, "low": close,
+                         "close": close, "volume": rng.integers(1000, 5000, n)})
+
+@pytest.fixture
+def batch(tmp_path):
+    model = ClassifierModel(features=FeatureEngine(), registry=ModelRegistry(str(tmp_path / "registry")))
+    return lambda df: model.featurize(df)[1].iloc[-1]
+
+def assert_row(row, expected):
+    np.testing.assert_allclose([row[f] for f in FEATURES], expected[FEATURES].to_numpy(dtype=float), rtol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize("n", [1, 3, 6, 10, 40])
+def test_incremental_matches_batch(batch, n):
+    df = hist(n)
+    engine = FeatureEngine()
+    for d, c, v in zip(df["date"], df["close"], df["volume"]):
+        row = engine.update("AAA", d, c, v)
+    assert_row(row, batch(df))
+    assert_row(latest_features(df), batch(df))
+
+def test_sync_feeds_only_new_bars(batch):
+    df = hist(60)
+    engine = FeatureEngine()
+    engine.sync("AAA", df.iloc[:30])
+    for end in (31, 45, 60):
+        assert_row(engine.sync("AAA", df.iloc[:end]), batch(df.iloc[:end]))
+
+def test_revised_last_bar_is_rescored(batch):
+    longer = hist(31)
+    df = longer.iloc[:30]
+    engine = FeatureEngine()
+    engine.sync("AAA", df)
+    revised = df.copy()
+    revised.loc[len(df) - 1, "close"] *= 1.10
+    revised.loc[len(df) - 1, "volume"] += 500
+    expected = batch(revised)
+    row = engine.sync("AAA", revised)
+    assert_row(row, expected)
+    assert row["ret1"] == pytest.approx(expected["ret1"])
+    assert row["ret1"] != pytest.approx(batch(df)["ret1"])
+    # update() on the same date revises too, and the next bar builds on the revised values
+    assert_row(engine.update("AAA", df["date"].iloc[-1], df["close"].iloc[-1], df["volume"].iloc[-1]), batch(df))
+    assert_row(engine.update("AAA", longer["date"].iloc[-1], longer["close"].iloc[-1], longer["volume"].iloc[-1]), batch(longer))
+
+def test_older_bars_are_ignored():
+    df = hist(20)
+    engine = FeatureEngine()
+    row = engine.sync("AAA", df)
+    assert engine.update("AAA", df["date"].iloc[5], 1.0, 1) is row
+
+def test_running_sums_resync(batch):
+    df = hist(RESYNC_EVERY + 15, seed=3)
+    engine = FeatureEngine()
+    for d, c, v in zip(df["date"], df["close"], df["volume"]):
+        engine.update("AAA", d, c, v)
+    assert_row(engine.latest("AAA"), batch(df))
+
+def test_latest_frame_and_reset():
+    engine = FeatureEngine()
+    engine.sync("AAA", hist(15, seed=1))
+    engine.sync("BBB", hist(15, seed=2))
+    frame = engine.latest_frame()
+    assert list(frame.columns) == FEATURES and set(frame.index) == {"AAA", "BBB"}
+    engine.reset("AAA")
+    assert engine.latest("AAA") is None and list(engine.latest_frame().index) == ["BBB"]
+
+def test_concurrent_syncs_of_one_ticker(batch):
+    import sys, threading
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # interleave the threads as finely as possible
+    df = hist(300, seed=4)
+    engine = FeatureEngine()
+    engine.sync("AAA", df.iloc[:20])
+    def worker(offset):
+        for end in range(21 + offset, len(df) + 1, 4):
+            engine.sync("AAA", df.iloc[:end])
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    st = engine._states["AAA"]
+    # the first sync keeps only the last WINDOW bars; nothing was pushed twice or reset since
+    assert st.n == len(df) - 10 and st.last_date == df["date"].iloc[-1]
+    assert st.close_sum == pytest.approx(df["close"].tail(10).sum())
+    assert_row(engine.latest("AAA"), batch(df))
+
+def test_disagreeing_history_resets_state(batch):
+    df = hist(40)
+    engine = FeatureEngine()
+    engine.sync("AAA", df)
+    # another provider's series for the same dates
+    other = hist(40, seed=9)
+    assert_row(engine.sync("AAA", other), batch(other))
+    # a restated bar inside the window
+    restated = other.copy()
+    restated.loc[35, "close"] *= 1.05
+    assert_row(engine.sync("AAA", restated), batch(restated))
+    # a missing bar: same closes, different dates
+    gapped = restated.drop(index=37).reset_index(drop=True)
+    assert_row(engine.sync("AAA", gapped), batch(gapped))
+    # a shorter slice of the same series still matches and does not reset
+    n = engine._states["AAA"].n
+    engine.sync("AAA", gapped.tail(3))
+    assert engine._states["AAA"].n == n
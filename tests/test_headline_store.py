@@ -0,0 +1,86 @@
+import threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+import pytest
+from benchmark import rss_xml
+from headline_store import HeadlineStore
+
+def ago(days):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - days * 86400))
+
+def row(guid, days, **kw):
+    return dict({"guid": guid, "source": "Test", "title": f"Headline {guid}", "link": f"https://example.com/{guid}", "published": ago(days)}, **kw)
+
+def test_add_dedupes_by_guid_and_link(tmp_path):
+    store = HeadlineStore(str(tmp_path / "h.db"))
+    assert list(store.add([row("a", 1), row("b", 2)])["guid"]) == ["a", "b"]
+    assert store.add([row("a", 1), row("c", 1, link="https://example.com/b")]).empty
+    assert list(store.load()["guid"]) == ["a", "b"]
+
+def test_retention_is_by_published_date(tmp_path):
+    store = HeadlineStore(str(tmp_path / "h.db"), retention_days=7)
+    store.add([row("fresh", 1), row("stale", 10), row("undated", 0, published=None)])
+    assert set(store.load()["guid"]) == {"fresh", "undated"}
+    # the feed still lists the old item on the next poll: it must not come back as new
+    assert list(store.add([row("fresh", 1), row("stale", 10), row("new", 0)])["guid"]) == ["new"]
+
+def test_load_since_and_limit(tmp_path):
+    store = HeadlineStore(str(tmp_path / "h.db"))
+    store.add([row("a", 1), row("b", 2), row("c", 4)])
+    assert list(store.load(since=pd.Timestamp.utcnow() - pd.Timedelta(days=3))["guid"]) == ["a", "b"]
+    assert list(store.load(limit=1)["guid"]) == ["a"]
+
+def test_feed_state_round_trip(tmp_path):
+    store = HeadlineStore(str(tmp_path / "h.db"))
+    assert store.feed_state("http://x/rss") == {}
+    store.save_feed_state("http://x/rss", etag='"v1"', modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert store.feed_state("http://x/rss") == {"etag": '"v1"', "modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+def test_fetch_rss_feeds_new_only(feed, standin):
+    feeds = {f"feed{i}": f"{standin.base}/rss/{i}.xml" for i in range(len(standin.feeds))}
+    first = feed.fetch_rss_feeds(feeds, new_only=True)
+    assert len(first) > 0 and first["guid"].is_unique
+    assert feed.fetch_rss_feeds(feeds, new_only=True).empty
+
+@pytest.fixture
+def etag_feed():
+    """One RSS feed that answers 304 to a matching If-None-Match."""
+    items = [{"guid": f"g{i}", "title": f"Headline {i}", "link": f"https://example.com/{i}", "published": pd.Timestamp.utcnow()} for i in range(3)]
+    body, state = rss_xml(items).encode(), {"full": 0, "not_modified": 0}
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                state["not_modified"] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            state["full"] += 1
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}/rss.xml"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+def test_feed_state_saved_only_after_entries_are_stored(feed, etag_feed, monkeypatch):
+    feeds = {"etag": etag_feed["url"]}
+    add = feed.headlines.add
+    def failing_add(rows):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(feed.headlines, "add", failing_add)
+    with pytest.raises(RuntimeError):
+        feed.fetch_rss_feeds(feeds, new_only=True)
+    assert feed.headlines.feed_state(etag_feed["url"]) == {}
+    monkeypatch.setattr(feed.headlines, "add", add)
+    # the failed poll did not advance the ETag, so the entries are fetched again rather than lost to a 304
+    assert sorted(feed.fetch_rss_feeds(feeds, new_only=True)["guid"]) == ["g0", "g1", "g2"]
+    assert feed.headlines.feed_state(etag_feed["url"])["etag"] == '"v1"'
+    assert feed.fetch_rss_feeds(feeds, new_only=True).empty
+    assert (etag_feed["full"], etag_feed["not_modified"]) == (2, 1)
@@ -0,0 +1,109 @@
+import threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import http_pool
+from http_pool import TokenBucket, RateLimited, request, get_bucket
+
+@pytest.fixture
+def flaky():
+    """Server answering 503 to the first ``fail`` requests of each path, then 200."""
+    state = {"fail": 2, "hits": {}}
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        def do_GET(self):
+            n = state["hits"][self.path] = state["hits"].get(self.path, 0) + 1
+            status = 503 if n <= state["fail"] else 200
+            body = b'{"ok": true}'
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["base"] = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+def test_bucket_bursts_then_refills():
+    b = TokenBucket(rate=50, capacity=3)
+    assert [b.try_acquire() for _ in range(4)] == [True, True, True, False]
+    time.sleep(0.05)
+    assert b.try_acquire()
+
+def test_bucket_acquire_waits_for_rate():
+    b = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        b.acquire()
+    assert time.monotonic() - start >= 0.04
+
+def test_get_bucket_is_shared_per_name():
+    assert get_bucket("test:shared", 60) is get_bucket("test:shared", 60)
+    assert get_bucket("test:shared", 60) is not get_bucket("test:other", 60)
+
+def test_request_retries_5xx(flaky):
+    r = request("GET", flaky["base"] + "/a", retries=3, backoff=0.0)
+    assert r.status_code == 200 and flaky["hits"]["/a"] == 3
+
+def test_request_raises_when_retries_exhausted(flaky):
+    with pytest.raises(RateLimited):
+        request("GET", flaky["base"] + "/b", retries=1, backoff=0.0)
+    assert flaky["hits"]["/b"] == 2
+
+def test_request_check_can_signal_throttling(flaky):
+    flaky["fail"] = 0
+    calls = []
+    def check(r):
+        calls.append(r)
+        if len(calls) == 1:
+            raise RateLimited("quota")
+    assert request("GET", flaky["base"] + "/c", retries=2, backoff=0.0, check=check).json() == {"ok": True}
+    assert len(calls) == 2
+
+def test_session_is_process_wide():
+    assert http_pool.get_session() is http_pool.get_session()
+
+@pytest.fixture
+def traffic(standin, monkeypatch):
+    """Counts stand-in requests per path and tracks how many were in flight at once; ``delay`` slows each one."""
+    state = {"hits": {}, "active": 0, "peak": 0, "delay": 0.0}
+    lock, route = threading.Lock(), standin.route
+    def counted(path, q):
+        with lock:
+            state["hits"][path] = state["hits"].get(path, 0) + 1
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        try:
+            time.sleep(state["delay"])
+            return route(path, q)
+        finally:
+            with lock:
+                state["active"] -= 1
+    monkeypatch.setattr(standin, "route", counted)
+    return state
+
+def test_quotes_many_dedupes_and_runs_concurrently(feed, standin, traffic):
+    tickers = list(standin.names)
+    traffic["delay"] = 0.2
+    start = time.monotonic()
+    quotes = feed.get_quotes_many(tickers + [t.lower() for t in tickers] + ["", None], max_workers=4)
+    elapsed = time.monotonic() - start
+    assert list(quotes) == tickers
+    for t, q in quotes.items():
+        assert q["symbol"] == t and q["c"] == pytest.approx(standin.bars(t)["close"].iloc[-1])
+    # one request per distinct symbol, up to four at a time
+    assert traffic["hits"] == {"/finnhub/quote": len(tickers)}
+    assert traffic["peak"] >= 2 and elapsed < len(tickers) * traffic["delay"]
+
+def test_historical_many_uses_cache(feed, standin, traffic):
+    tickers = list(standin.names)[:3]
+    first = feed.get_historical_many(tickers, provider="Finnhub", days=120)
+    assert all(not df.empty for df in first.values())
+    fetched = dict(traffic["hits"])
+    assert fetched.get("/finnhub/stock/candle", 0) >= len(tickers)
+    again = feed.get_historical_many(tickers, provider="Finnhub", days=120)
+    assert traffic["hits"] == fetched
+    for t in tickers:
+        assert again[t]["close"].tolist() == first[t]["close"].tolist()
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+import instrumentation
+from instrumentation import Metrics, timer, timed, METRICS, SNAPSHOT_COLUMNS
+
+def test_percentiles_over_ring_of_samples():
+    m = Metrics(samples=100)
+    for ms in range(1, 201):
+        m.observe("op", ms / 1000.0)
+    row = m.snapshot().set_index("name").loc["op"]
+    assert row["calls"] == 200 and row["total_s"] == pytest.approx(sum(range(1, 201)) / 1000.0)
+    # only the last 100 durations (101..200 ms) are kept for percentiles
+    assert row["p50_ms"] == pytest.approx(150.5) and row["max_ms"] == pytest.approx(200.0)
+    assert row["mean_ms"] == pytest.approx(100.5)
+
+def test_timer_counts_errors_and_reraises():
+    m = Metrics()
+    with timer("ok", metrics=m):
+        pass
+    with pytest.raises(KeyError):
+        with timer("bad", metrics=m):
+            raise KeyError("x")
+    snap = m.snapshot().set_index("name")
+    assert list(m.snapshot().columns) == SNAPSHOT_COLUMNS
+    assert snap.loc["ok", "errors"] == 0 and snap.loc["bad", "errors"] == 1 and snap.loc["bad", "calls"] == 1
+
+def test_timed_decorator_and_counters():
+    METRICS.reset()
+    @timed("test.fn")
+    def fn(x):
+        if x < 0:
+            raise ValueError
+        return x * 2
+    assert fn(2) == 4 and fn.__name__ == "fn"
+    with pytest.raises(ValueError):
+        fn(-1)
+    instrumentation.incr("test.hits")
+    instrumentation.incr("test.hits", 2)
+    snap = instrumentation.snapshot().set_index("name")
+    assert snap.loc["test.fn", "calls"] == 2 and snap.loc["test.fn", "errors"] == 1
+    assert instrumentation.counters() == {"test.hits": 3}
+    instrumentation.reset()
+    assert instrumentation.snapshot().empty and instrumentation.counters() == {}
+
+def test_disabled_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+    METRICS.reset()
+    def fn():
+        return 1
+    assert timed("test.off")(fn) is fn
+    with timer("test.off"):
+        pass
+    instrumentation.incr("test.off")
+    assert METRICS.snapshot().empty and METRICS.counters() == {}
+
+def test_benchmark_run_small(tmp_path):
+    import benchmark, data_feed, edgar
+    limits, sec_rate = dict(data_feed.RATE_LIMITS), edgar.SEC_RATE_PER_MIN
+    results = benchmark.run(sizes=(3,), days=200, train_tickers=1, scan_tickers=2, workdir=str(tmp_path))
+    assert list(results.columns) == benchmark.RESULT_COLUMNS
+    by = results.set_index("stage")
+    assert {"get_historical (cold)", "get_historical (cached)", "fetch_rss_feeds (304)", "edgar crawl + parse", "train",
+            "score_universe", "score_universe (panel)", "start_early_scan"} <= set(by.index)
+    assert (results["wall_s"] > 0).all() and by.loc["get_historical (cached)", "calls"] == 3
+    assert by.loc["start_early_scan", "calls"] == 2
+    # the stand-in's unlimited quotas do not leak out of the run
+    assert data_feed.RATE_LIMITS == limits and edgar.SEC_RATE_PER_MIN == sec_rate
+
+def test_standin_feeds_answer_304(feed, standin):
+    import http_pool
+    url = f"{standin.base}/rss/0.xml"
+    first = http_pool.request("GET", url)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert http_pool.request("GET", url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert http_pool.request("GET", url, headers={"If-None-Match": '"stale"'}).status_code == 200
+    feeds = {f"feed{i}": f"{standin.base}/rss/{i}.xml" for i in range(len(standin.feeds))}
+    assert len(feed.fetch_rss_feeds(feeds, new_only=True)) > 0
+    assert feed.fetch_rss_feeds(feeds, new_only=True).empty
+    assert standin.not_modified == 1 + len(feeds)
+
+def test_benchmark_regressions():
+    import benchmark
+    base = pd.DataFrame({"stage": ["a", "b"], "universe": [10, 10], "p95_ms": [10.0, 10.0]})
+    now = pd.DataFrame({"stage": ["a", "b"], "universe": [10, 10], "p95_ms": [12.0, 13.0]})
+    worse = benchmark.regressions(now, base, tolerance=0.25)
+    assert list(worse["stage"]) == ["b"] and worse["p95_change"].iloc[0] == pytest.approx(0.3)
@@ -0,0 +1,77 @@
+import numpy as np, pandas as pd
+import pytest
+import model_compare
+from benchmark import synthetic_ohlcv
+from classifier_model import ClassifierModel
+from model_compare import compare_models, best_per_horizon, feature_matrix, LEADERBOARD_COLUMNS
+from model_registry import ModelRegistry
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+@pytest.fixture
+def splits(monkeypatch):
+    folds = []
+    class Recording(model_compare.TimeSeriesSplit):
+        def split(self, X, y=None, groups=None):
+            for train, test in super().split(X, y, groups):
+                folds.append((self.gap, train, test))
+                yield train, test
+    monkeypatch.setattr(model_compare, "TimeSeriesSplit", Recording)
+    return folds
+
+def test_forward_returns_per_horizon():
+    hist = synthetic_ohlcv("AAA", days=120)
+    X, R, dates = feature_matrix(hist, horizons=(1, 5))
+    close = hist["close"].to_numpy()
+    assert X.shape[0] == R.shape[0] == len(dates) == len(hist)
+    assert R[0, 1] == pytest.approx(close[5] / close[0] - 1)
+    assert np.isnan(R[-5:, 1]).all() and not np.isnan(R[:-5, 1]).any() and np.isnan(R[-1, 0])
+
+def test_leaderboard_covers_every_family_and_horizon(splits):
+    board = compare_models(synthetic_ohlcv("AAA", days=260), horizons=(1, 5), families=["logistic", "random_forest"],
+                           n_splits=3, max_workers=1)
+    assert list(board.columns) == LEADERBOARD_COLUMNS
+    assert sorted(zip(board["family"], board["horizon"])) == [("logistic", 1), ("logistic", 5), ("random_forest", 1), ("random_forest", 5)]
+    assert (board["folds"] == 3).all() and board["prob_last"].between(0, 1).all()
+    auc = board["roc_auc"].dropna().to_numpy()
+    assert (np.diff(auc) <= 0).all()
+    best = best_per_horizon(board)
+    assert list(best.index) == [1, 5]
+
+def test_folds_leave_a_horizon_gap(splits):
+    compare_models(synthetic_ohlcv("AAA", days=200), horizons=(1, 7), families=["logistic"], n_splits=3, max_workers=1)
+    assert {gap for gap, _, _ in splits} == {1, 7}
+    for gap, train, test in splits:
+        # the last training label looks `gap` bars ahead, which must stop short of the test window
+        assert test.min() - train.max() - 1 == gap
+
+def test_short_history_is_rejected():
+    with pytest.raises(ValueError, match="Not enough history"):
+        compare_models(synthetic_ohlcv("AAA", days=40), max_workers=1)
+
+def test_classifier_trains_on_all_cores_unless_given_a_budget(tmp_path):
+    # interactive and background training use every core; pool workers pass their share
+    clf = ClassifierModel(registry=ModelRegistry(str(tmp_path / "registry")))
+    hist = synthetic_ohlcv("AAA", days=200)
+    clf.train(hist)
+    assert clf.model.n_jobs == -1
+    clf.train(hist, n_jobs=1)
+    assert clf.model.n_jobs == 1
+
+def test_tasks_cap_native_threads(monkeypatch):
+    from threadpoolctl import threadpool_info
+    seen = []
+    monkeypatch.setattr(model_compare, "_score_family", lambda *a: seen.append({p["internal_api"]: p["num_threads"] for p in threadpool_info()}))
+    model_compare._evaluate("x", "r", "hist_gradient_boosting", 0, 1, 0.01, 3, threads=1)
+    # HistGradientBoosting runs on scikit-learn's OpenMP pool
+    assert seen[0].get("openmp") == 1 and set(seen[0].values()) == {1}
+
+def test_pooled_comparison_matches_in_process(splits):
+    hist = synthetic_ohlcv("AAA", days=200)
+    kw = dict(horizons=(1, 3), families=["logistic", "hist_gradient_boosting"], n_splits=3)
+    pooled = compare_models(hist, max_workers=2, **kw).sort_values(["family", "horizon"]).reset_index(drop=True)
+    local = compare_models(hist, max_workers=1, **kw).sort_values(["family", "horizon"]).reset_index(drop=True)
+    cols = ["family", "horizon", "folds", "accuracy", "roc_auc", "brier", "prob_last", "n_rows"]
+    pd.testing.assert_frame_equal(pooled[cols], local[cols])
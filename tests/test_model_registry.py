@@ -0,0 +1,141 @@
+import os, threading, time
+import numpy as np, pandas as pd
+import model_registry
+from model_registry import ModelRegistry, data_fingerprint
+from universe import universe_tickers
+
+class Stub:
+    def __init__(self, value):
+        self.value = value
+
+class Const:
+    def predict_proba(self, X):
+        return np.array([[0.3, 0.7]] * len(X))
+
+def bars(n, start=100.0):
+    return pd.DataFrame({"date": pd.bdate_range("2024-01-01", periods=n), "close": start + np.arange(n, dtype=float), "volume": 1000})
+
+def test_default_capacity_covers_universe():
+    # every ticker plus the universe scope, at every horizon the nightly retrain publishes
+    assert model_registry.CAPACITY >= (len(universe_tickers()) + 1) * len(model_registry.TRAINED_HORIZONS)
+
+def test_fingerprint_tracks_content():
+    assert data_fingerprint(bars(10)) == data_fingerprint(bars(10).iloc[::-1])
+    assert data_fingerprint(bars(10)) != data_fingerprint(bars(10, start=101.0))
+    assert data_fingerprint(pd.DataFrame()) == "empty"
+
+def test_publish_and_get(tmp_path):
+    reg = ModelRegistry(str(tmp_path))
+    assert reg.get("AAPL", 3, 0.01) == (None, None)
+    meta = reg.publish("AAPL", 3, 0.01, Stub(1), "fp1", {"accuracy": 0.6})
+    model, got = reg.get("AAPL", 3, 0.01)
+    assert model.value == 1 and got["artifact"] == meta["artifact"] and got["metrics"] == {"accuracy": 0.6}
+    assert os.path.exists(os.path.join(str(tmp_path), meta["artifact"]))
+
+def test_hot_swap_across_instances(tmp_path):
+    writer = ModelRegistry(str(tmp_path))
+    reader = ModelRegistry(str(tmp_path), poll_interval=0.0)
+    writer.publish("AAPL", 3, 0.01, Stub(1), "fp1")
+    assert reader.get("AAPL", 3, 0.01)[0].value == 1
+    writer.publish("AAPL", 3, 0.01, Stub(2), "fp2")
+    model, meta = reader.get("AAPL", 3, 0.01)
+    assert model.value == 2 and meta["fingerprint"] == "fp2"
+
+def test_pointer_is_polled_not_reread(tmp_path):
+    writer = ModelRegistry(str(tmp_path))
+    reader = ModelRegistry(str(tmp_path), poll_interval=3600)
+    writer.publish("AAPL", 3, 0.01, Stub(1), "fp1")
+    assert reader.get("AAPL", 3, 0.01)[0].value == 1
+    writer.publish("AAPL", 3, 0.01, Stub(2), "fp2")
+    assert reader.get("AAPL", 3, 0.01)[0].value == 1
+
+def test_lru_capacity(tmp_path):
+    reg = ModelRegistry(str(tmp_path), capacity=2)
+    for i, t in enumerate(["A", "B", "C"]):
+        reg.publish(t, 3, 0.01, Stub(i), f"fp{i}")
+    assert len(reg._lru) == 2 and all(not k.startswith("A/") for k in reg._lru)
+    # an evicted model is reloaded from disk
+    assert reg.get("A", 3, 0.01)[0].value == 0
+
+def test_missing_artifact(tmp_path):
+    reg = ModelRegistry(str(tmp_path), capacity=1, poll_interval=0.0)
+    meta = reg.publish("A", 3, 0.01, Stub(0), "fp0")
+    reg.publish("B", 3, 0.01, Stub(1), "fp1")
+    os.remove(os.path.join(str(tmp_path), meta["artifact"]))
+    assert reg.get("A", 3, 0.01) == (None, None)
+
+def artifacts(root, scope):
+    return sorted(os.listdir(os.path.join(root, scope)))
+
+def test_publish_prunes_superseded_artifacts(tmp_path):
+    root = str(tmp_path)
+    reg = ModelRegistry(root)
+    for i in range(5):
+        meta = reg.publish("AAPL", 3, 0.01, Stub(i), f"fp{i}")
+        time.sleep(0.01)
+    reg.publish("AAPL", 5, 0.01, Stub(9), "other")
+    names = artifacts(root, "AAPL")
+    assert [n for n in names if n.startswith("h3_") and n.endswith(".joblib")] == ["h3_t0.0100_v1_fp3.joblib", "h3_t0.0100_v1_fp4.joblib"]
+    assert "h5_t0.0100_v1_other.joblib" in names
+    assert reg.get("AAPL", 3, 0.01)[0].value == 4 and meta["artifact"].endswith("fp4.joblib")
+    assert not any("fp0" in k for k in reg._lru)
+
+def gated(reg, monkeypatch):
+    """Make reg's artifact loads wait until the returned event is set."""
+    gate, load = threading.Event(), reg.load
+    def slow(artifact):
+        gate.wait(5)
+        return load(artifact)
+    monkeypatch.setattr(reg, "load", slow)
+    return gate
+
+def wait_for(cond, timeout=5):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.01)
+    return cond()
+
+def test_current_never_loads_on_the_caller(tmp_path, monkeypatch):
+    writer = ModelRegistry(str(tmp_path))
+    reader = ModelRegistry(str(tmp_path), poll_interval=0.0)
+    assert reader.current("AAPL", 3, 0.01) == (None, None)
+    writer.publish("AAPL", 3, 0.01, Stub(1), "fp1")
+    gate = gated(reader, monkeypatch)
+    model, meta = reader.current("AAPL", 3, 0.01)
+    assert model is None and meta["fingerprint"] == "fp1"
+    gate.set()
+    assert wait_for(lambda: reader.current("AAPL", 3, 0.01)[0] is not None)
+    # a new pointer keeps serving the previous estimator until the new one is in memory
+    writer.publish("AAPL", 3, 0.01, Stub(2), "fp2")
+    gate.clear()
+    model, meta = reader.current("AAPL", 3, 0.01)
+    assert model.value == 1 and meta["fingerprint"] == "fp1"
+    gate.set()
+    assert wait_for(lambda: reader.current("AAPL", 3, 0.01)[0].value == 2)
+    assert reader.current("AAPL", 3, 0.01)[1]["fingerprint"] == "fp2"
+
+def test_warm_in_background(tmp_path):
+    ModelRegistry(str(tmp_path)).publish("AAPL", 3, 0.01, Stub(1), "fp1")
+    reader = ModelRegistry(str(tmp_path))
+    reader.warm([("AAPL", 3, 0.01), ("MSFT", 3, 0.01)], wait=False)
+    assert wait_for(lambda: len(reader._lru) == 1)
+    assert reader.current("AAPL", 3, 0.01)[0].value == 1
+
+def test_classifier_resolve_is_stateless_and_reports_loading(tmp_path, monkeypatch):
+    from classifier_model import ClassifierModel
+    from feature_engine import FeatureEngine
+    ModelRegistry(str(tmp_path)).publish("universe", 3, 0.01, Const(), "fp")
+    reg = ModelRegistry(str(tmp_path))
+    clf = ClassifierModel(features=FeatureEngine(), registry=reg)
+    queued = []
+    monkeypatch.setattr(clf, "train_async", lambda *a, **kw: queued.append(a))
+    gate = gated(reg, monkeypatch)
+    hist = bars(30)
+    assert clf.predict_from_signals(hist, ticker="AAPL")["metrics"] == {"status": "loading"}
+    assert queued == []
+    gate.set()
+    assert wait_for(lambda: clf.resolve(3, 0.01, ticker="AAPL")[0] is not None)
+    model, meta = clf.resolve(3, 0.01, ticker="AAPL")
+    assert meta["fingerprint"] == "fp" and clf.model is None and clf.meta is None
+    assert clf.predict_from_signals(hist, ticker="AAPL")["prob_pos"] == 0.7
+    assert clf.resolve(3, 0.01)[1] == meta and clf.resolve(5, 0.01) == (None, None)
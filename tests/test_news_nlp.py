@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+import news_nlp
+from news_nlp import NLPCache, analyze_texts, analyze_headlines, map_entities_to_ticker
+from entity_index import TickerIndex
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace the analyzers with a deterministic one that records every batch it is given."""
+    seen = []
+    def fake(texts):
+        seen.append(list(texts))
+        return [len(t) / 100.0 for t in texts], [[w for w in t.split() if w.istitle()] for t in texts]
+    monkeypatch.setattr(news_nlp, "_analyze", fake)
+    return seen
+
+def test_each_distinct_text_is_analyzed_once(tmp_path, calls):
+    cache = NLPCache(str(tmp_path / "nlp.db"))
+    texts = ["Apple beats estimates", "Nvidia slides", "Apple beats estimates", None, float("nan")]
+    sentiments, entities = analyze_texts(texts, cache)
+    assert calls == [["Apple beats estimates", "Nvidia slides", ""]]
+    assert sentiments[0] == sentiments[2] == pytest.approx(0.21) and sentiments[3] == sentiments[4] == 0.0
+    assert entities[1] == ["Nvidia"]
+    analyze_texts(texts + ["Tesla recalls"], cache)
+    assert calls[1:] == [["Tesla recalls"]]
+
+def test_cache_persists_across_instances(tmp_path, calls):
+    analyze_texts(["Microsoft rallies"], NLPCache(str(tmp_path / "nlp.db")))
+    assert analyze_texts(["Microsoft rallies"], NLPCache(str(tmp_path / "nlp.db")))[1] == [["Microsoft"]]
+    assert len(calls) == 1
+
+def test_analyzer_version_keys_the_cache(tmp_path, calls, monkeypatch):
+    cache = NLPCache(str(tmp_path / "nlp.db"))
+    analyze_texts(["Amazon expands"], cache)
+    monkeypatch.setattr(news_nlp, "analyzer_version", lambda: "v1|vader=True|spacy=test")
+    analyze_texts(["Amazon expands"], cache)
+    assert len(calls) == 2
+
+def test_get_many_chunks(tmp_path):
+    cache = NLPCache(str(tmp_path / "nlp.db"))
+    cache.put_many([(f"h{i}", i / 1000, [f"E{i}"]) for i in range(1200)])
+    got = cache.get_many([f"h{i}" for i in range(0, 1200, 3)] + ["missing"])
+    assert len(got) == 400 and got["h999"] == (0.999, ["E999"])
+
+def test_old_entries_are_pruned(tmp_path, monkeypatch, calls):
+    cache = NLPCache(str(tmp_path / "nlp.db"), retention_days=1)
+    now = [1_000_000.0]
+    monkeypatch.setattr(news_nlp.time, "time", lambda: now[0])
+    analyze_texts(["Intel cuts jobs"], cache)
+    now[0] += 0.5 * 86400
+    cache.put_many([("recent", 0.1, [])])
+    assert len(cache.get_many(["recent"])) == 1 and len(calls) == 1
+    now[0] += 0.75 * 86400
+    cache.put_many([("newest", 0.2, [])])
+    # the first entry is now older than a day; the next write pruned it, so it is analyzed again
+    assert set(cache.get_many(["recent", "newest"])) == {"recent", "newest"}
+    analyze_texts(["Intel cuts jobs"], cache)
+    assert len(calls) == 2
+
+def test_cache_without_created_at_is_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "nlp.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE nlp (hash TEXT PRIMARY KEY, sentiment REAL, entities TEXT)")
+    conn.execute("INSERT INTO nlp VALUES ('old', 0.5, '[]')")
+    conn.commit()
+    conn.close()
+    cache = NLPCache(path)
+    cache.put_many([("new", 0.1, ["X"])])
+    assert cache.get_many(["old", "new"]) == {"old": (0.5, []), "new": (0.1, ["X"])}
+
+def test_fallback_without_libraries(tmp_path, monkeypatch):
+    monkeypatch.setitem(news_nlp._models, "vader", None)
+    monkeypatch.setitem(news_nlp._models, "spacy", None)
+    assert analyze_texts(["Boeing delays deliveries"], NLPCache(str(tmp_path / "nlp.db"))) == ([0.0], [[]])
+
+def test_analyze_and_map_headlines(tmp_path, calls):
+    df = pd.DataFrame({"title": ["Apple and Microsoft lead gains", "Rates hold steady"], "source": "Test"})
+    nlp = analyze_headlines(df, NLPCache(str(tmp_path / "nlp.db")))
+    assert list(nlp.columns) == ["text", "source", "sentiment", "entities"]
+    mapping = map_entities_to_ticker(nlp, index=TickerIndex({"AAPL": "Apple", "MSFT": "Microsoft"}))
+    assert sorted(mapping["ticker"]) == ["AAPL", "MSFT"] and (mapping["title"] == df["title"][0]).all()
+    assert analyze_headlines(pd.DataFrame()).empty and map_entities_to_ticker(pd.DataFrame()).empty
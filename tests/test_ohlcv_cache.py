@@ -0,0 +1,66 @@
+import sqlite3
+import pandas as pd
+import ohlcv_cache
+from ohlcv_cache import OHLCVCache
+
+def bars(start, n, close=100.0):
+    dates = pd.bdate_range(start, periods=n)
+    return pd.DataFrame({"date": dates, "open": close, "high": close + 1, "low": close - 1, "close": close + pd.Series(range(n), dtype=float), "volume": 1000})
+
+def accessed_at(path, ticker):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT accessed_at FROM series WHERE ticker=?", (ticker,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_store_and_load_round_trip(tmp_path):
+    cache = OHLCVCache(str(tmp_path / "c.db"))
+    cache.store("Finnhub", "AAPL", bars("2024-01-01", 10), "2024-01-01")
+    df = cache.load("Finnhub", "AAPL")
+    assert len(df) == 10 and df["close"].iloc[-1] == 109.0
+    assert len(cache.load("Finnhub", "AAPL", start="2024-01-10")) == 3
+    info = cache.info("Finnhub", "AAPL")
+    assert info["covered_from"] == "2024-01-01" and cache.is_fresh(info)
+
+def test_store_extends_tail_and_keeps_covered_from(tmp_path):
+    cache = OHLCVCache(str(tmp_path / "c.db"))
+    cache.store("Finnhub", "AAPL", bars("2024-01-01", 5), "2024-01-01")
+    cache.store("Finnhub", "AAPL", bars("2024-01-08", 5), "2024-01-08")
+    info = cache.info("Finnhub", "AAPL")
+    assert info["covered_from"] == "2024-01-01" and info["last_date"] == "2024-01-12"
+    assert len(cache.load("Finnhub", "AAPL")) == 10
+
+def test_cache_hit_does_not_write(tmp_path):
+    path = str(tmp_path / "c.db")
+    cache = OHLCVCache(path)
+    cache.store("Finnhub", "AAPL", bars("2024-01-01", 5), "2024-01-01")
+    before = accessed_at(path, "AAPL")
+    for _ in range(20):
+        cache.load("Finnhub", "AAPL")
+    assert accessed_at(path, "AAPL") == before
+    assert ("Finnhub", "AAPL") in cache._touched
+
+def test_touches_flush_after_interval(tmp_path, monkeypatch):
+    path = str(tmp_path / "c.db")
+    cache = OHLCVCache(path)
+    cache.store("Finnhub", "AAPL", bars("2024-01-01", 5), "2024-01-01")
+    before = accessed_at(path, "AAPL")
+    monkeypatch.setattr(ohlcv_cache, "TOUCH_INTERVAL", 0.0)
+    cache.load("Finnhub", "AAPL")
+    assert accessed_at(path, "AAPL") > before and not cache._touched
+
+def test_eviction_uses_buffered_reads(tmp_path):
+    cache = OHLCVCache(str(tmp_path / "c.db"), max_series=2)
+    cache.store("Finnhub", "AAA", bars("2024-01-01", 3), "2024-01-01")
+    cache.store("Finnhub", "BBB", bars("2024-01-01", 3), "2024-01-01")
+    cache.load("Finnhub", "AAA")  # AAA is now the most recently read, only in memory
+    cache.store("Finnhub", "CCC", bars("2024-01-01", 3), "2024-01-01")
+    assert cache.info("Finnhub", "BBB") is None
+    assert cache.info("Finnhub", "AAA") is not None and cache.info("Finnhub", "CCC") is not None
+
+def test_clear(tmp_path):
+    cache = OHLCVCache(str(tmp_path / "c.db"))
+    cache.store("Finnhub", "AAPL", bars("2024-01-01", 3), "2024-01-01")
+    cache.clear("Finnhub", "AAPL")
+    assert cache.info("Finnhub", "AAPL") is None and cache.load("Finnhub", "AAPL").empty
@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from portfolio_manager import PortfolioManager
+
+def buy_until_broke(path, attempts):
+    pm = PortfolioManager(path)
+    ok = 0
+    for _ in range(attempts):
+        try:
+            ok += pm.place_order("AAA", "BUY", 1, 10.0)
+        except ValueError:
+            pass
+    pm.close()
+    return ok
+
+def test_orders_update_cash_positions_and_history(tmp_path):
+    pm = PortfolioManager(str(tmp_path / "p.db"), initial_cash=1000)
+    assert pm.place_orders([("aaa", "buy", 10, 20.0), {"symbol": "BBB", "side": "BUY", "qty": 5, "price": 10.0}, ("AAA", "BUY", 10, 30.0)]) == 3
+    assert pm.get_balance() == pytest.approx(1000 - 200 - 50 - 300)
+    pos = pm.list_positions().set_index("symbol")
+    assert pos.loc["AAA", "qty"] == 20 and pos.loc["AAA", "avg_price"] == pytest.approx(25.0)
+    pm.place_order("AAA", "SELL", 20, 40.0)
+    assert list(pm.list_positions()["symbol"]) == ["BBB"] and pm.get_balance() == pytest.approx(450 + 800)
+    assert len(pm.list_trades()) == 4 and list(pm.list_trades(symbol="aaa")["side"]) == ["SELL", "BUY", "BUY"]
+
+def test_rejected_batch_writes_nothing(tmp_path):
+    pm = PortfolioManager(str(tmp_path / "p.db"), initial_cash=100)
+    with pytest.raises(ValueError, match="insufficient cash"):
+        pm.place_orders([("AAA", "BUY", 5, 10.0), ("BBB", "BUY", 10, 10.0)])
+    with pytest.raises(ValueError, match="cannot sell"):
+        pm.place_order("AAA", "SELL", 1, 10.0)
+    with pytest.raises(ValueError):
+        pm.place_order("AAA", "HOLD", 1, 10.0)
+    assert pm.get_balance() == 100 and pm.list_positions().empty and pm.list_trades().empty
+    # the connection is usable after a rollback
+    assert pm.place_order("AAA", "BUY", 1, 10.0) == 1
+
+def test_mark_to_market_and_equity(tmp_path):
+    pm = PortfolioManager(str(tmp_path / "p.db"), initial_cash=1000)
+    pm.place_orders([("AAA", "BUY", 10, 20.0), ("BBB", "BUY", 4, 50.0)])
+    mtm = pm.mark_to_market({"AAA": 25.0}).set_index("symbol")
+    assert mtm.loc["AAA", "unrealized_pnl"] == pytest.approx(50.0) and mtm.loc["AAA", "unrealized_pct"] == pytest.approx(25.0)
+    assert mtm.loc["BBB", "price"] == 50.0
+    assert pm.equity({"AAA": 25.0}) == pytest.approx(600 + 250 + 200)
+
+def test_other_connection_writes_are_seen(tmp_path):
+    path = str(tmp_path / "p.db")
+    a, b = PortfolioManager(path, initial_cash=1000), PortfolioManager(path)
+    a.place_order("AAA", "BUY", 10, 10.0)
+    assert b.get_balance() == 900 and b.list_positions()["qty"].tolist() == [10]
+    b.place_order("AAA", "SELL", 10, 12.0)
+    assert a.get_balance() == 1020 and a.list_positions().empty
+
+def test_managers_in_threads_never_overspend(tmp_path):
+    path = str(tmp_path / "p.db")
+    PortfolioManager(path, initial_cash=500).close()
+    managers = [PortfolioManager(path) for _ in range(4)]
+    results = []
+    def run(pm):
+        ok = 0
+        for _ in range(30):
+            try:
+                ok += pm.place_order("AAA", "BUY", 1, 10.0)
+            except ValueError:
+                pass
+        results.append(ok)
+    threads = [threading.Thread(target=run, args=(pm,)) for pm in managers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    check = PortfolioManager(path)
+    assert sum(results) == 50 and check.get_balance() == pytest.approx(0.0)
+    assert check.list_positions()["qty"].tolist() == [50] and len(check.list_trades(limit=1000)) == 50
+
+def test_managers_in_processes_never_overspend(tmp_path):
+    path = str(tmp_path / "p.db")
+    PortfolioManager(path, initial_cash=1000).close()
+    with ProcessPoolExecutor(max_workers=4) as ex:
+        filled = sum(ex.map(buy_until_broke, [path] * 4, [60] * 4))
+    check = PortfolioManager(path)
+    assert filled == 100
+    assert check.get_balance() == pytest.approx(0.0)
+    assert check.list_positions()["qty"].tolist() == [100] and len(check.list_trades(limit=1000)) == 100
@@ -0,0 +1,57 @@
+import numpy as np, pandas as pd
+import pytest
+from price_panel import PricePanel
+
+def hist(start, n, base=100.0):
+    dates = pd.bdate_range(start, periods=n)
+    close = base + np.arange(n, dtype=float)
+    return pd.DataFrame({"date": dates, "open": close - 0.5, "high": close + 1, "low": close - 1, "close": close, "volume": np.arange(n) + 1000})
+
+def test_build_aligns_tickers_on_union_of_dates(tmp_path):
+    path = str(tmp_path / "panel")
+    panel = PricePanel.build({"AAA": hist("2024-01-01", 5), "BBB": hist("2024-01-03", 5, 50.0), "EMPTY": pd.DataFrame()}, path)
+    assert panel.tickers == ["AAA", "BBB"] and len(panel) == 7
+    close = panel.field("close")
+    assert close.shape == (7, 2)
+    assert np.isnan(close[:2, 1]).all() and np.isnan(close[-2:, 0]).all()
+    assert panel.field("volume")[0, 1] == 0
+    pd.testing.assert_frame_equal(panel.frame("BBB"), hist("2024-01-03", 5, 50.0), check_dtype=False)
+
+def test_update_appends_new_dates_in_place(tmp_path):
+    path = str(tmp_path / "panel")
+    PricePanel.build({"AAA": hist("2024-01-01", 5), "BBB": hist("2024-01-01", 5, 50.0)}, path)
+    panel = PricePanel.update({"AAA": hist("2024-01-01", 7)}, path)
+    assert len(panel) == 7 and panel.tickers == ["AAA", "BBB"]
+    assert panel.column("AAA")[-1] == pytest.approx(106.0)
+    assert np.isnan(panel.column("BBB")[-2:]).all()
+    assert (np.diff(panel.days) > 0).all()
+
+def test_update_overwrites_revised_bar(tmp_path):
+    path = str(tmp_path / "panel")
+    PricePanel.build({"AAA": hist("2024-01-01", 5)}, path)
+    revised = hist("2024-01-01", 5)
+    revised.loc[4, "close"] = 110.0
+    panel = PricePanel.update({"AAA": revised.tail(1)}, path)
+    assert len(panel) == 5 and panel.column("AAA")[-1] == pytest.approx(110.0)
+
+def test_update_rebuilds_for_new_ticker_or_earlier_dates(tmp_path):
+    path = str(tmp_path / "panel")
+    PricePanel.build({"AAA": hist("2024-01-08", 5)}, path)
+    panel = PricePanel.update({"CCC": hist("2024-01-08", 3, 10.0)}, path)
+    assert panel.tickers == ["AAA", "CCC"] and len(panel) == 5
+    panel = PricePanel.update({"AAA": hist("2024-01-01", 5)}, path)
+    assert len(panel) == 10 and (np.diff(panel.days) > 0).all()
+    assert panel.frame("AAA")["close"].tolist()[:2] == [100.0, 101.0]
+    assert len(panel.frame("CCC")) == 3
+
+def test_update_creates_missing_panel(tmp_path):
+    path = str(tmp_path / "panel")
+    panel = PricePanel.update({"AAA": hist("2024-01-01", 3)}, path)
+    assert panel.tickers == ["AAA"] and panel.tail(2).shape == (2, 1)
+
+def test_build_panel_from_feed(feed, standin, tmp_path):
+    tickers = list(standin.names)[:3]
+    panel = feed.build_panel(tickers, provider="Finnhub", days=60, path=str(tmp_path / "panel"))
+    assert panel.tickers == sorted(tickers)
+    for t in tickers:
+        assert panel.frame(t)["close"].iloc[-1] == pytest.approx(standin.bars(t)["close"].iloc[-1], rel=1e-6)
@@ -0,0 +1,125 @@
+import threading, time
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from scan import TTLCache, StartEarlyScan
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_hit_until_expiry_then_recompute():
+    clock = Clock()
+    cache = TTLCache(clock=clock)
+    calls = []
+    fn = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_compute("k", 10, fn) == (1, False)
+    clock.now = 9.9
+    assert cache.get_or_compute("k", 10, fn) == (1, True)
+    clock.now = 10.0
+    assert cache.get_or_compute("k", 10, fn) == (2, False)
+
+def test_expired_entries_are_purged_on_misses():
+    clock = Clock()
+    cache = TTLCache(clock=clock, purge_interval=5)
+    for i in range(100):
+        cache.get_or_compute(("news", i), 1, lambda: i)
+    assert len(cache) == 100
+    clock.now = 2.0   # all expired, but the purge interval has not passed
+    cache.get_or_compute("fresh", 100, lambda: 0)
+    assert len(cache) == 101
+    clock.now = 6.0
+    cache.get_or_compute("other", 100, lambda: 0)
+    assert set(cache._data) == {"fresh", "other"}
+    clock.now = 200.0
+    assert cache.purge() == 2 and len(cache) == 0
+
+def test_per_key_locks_do_not_outlive_computation():
+    cache = TTLCache()
+    for i in range(50):
+        cache.get_or_compute(i, 60, lambda: i)
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("bad", 60, lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert cache._locks == {}
+    assert "bad" not in cache._data
+
+def test_concurrent_misses_compute_once():
+    cache = TTLCache()
+    calls, start = [], threading.Barrier(8)
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "v"
+    results = []
+    def worker():
+        start.wait()
+        results.append(cache.get_or_compute("k", 60, slow))
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(results) == [("v", False)] + [("v", True)] * 7
+    assert cache._locks == {}
+
+def test_invalidate_by_stage_prefix():
+    cache = TTLCache()
+    cache.get_or_compute(("news", False), 60, lambda: 1)
+    cache.get_or_compute(("history", "AAPL"), 60, lambda: 2)
+    cache.invalidate("news")
+    assert list(cache._data) == [("history", "AAPL")]
+    cache.invalidate()
+    assert len(cache) == 0
+
+def _services(hist):
+    calls = {"history": 0, "predict": 0, "rss": 0}
+    def get_historical(ticker, provider, days):
+        calls["history"] += 1
+        return hist
+    def predict_from_signals(h, horizon, ticker, ret_thresh):
+        calls["predict"] += 1
+        return {"prob_pos": 0.8, "metrics": {"status": "ok"}}
+    def fetch_rss_feeds(new_only):
+        calls["rss"] += 1
+        return pd.DataFrame()
+    edgar = SimpleNamespace(insider_scores=lambda t, days: pd.DataFrame({"buy": [3], "sell": [1]}, index=[t]),
+                            index=SimpleNamespace(transactions=lambda **kw: pd.DataFrame()))
+    services = SimpleNamespace(
+        cache=TTLCache(), edgar=edgar, index=None,
+        feed=SimpleNamespace(get_historical=get_historical, fetch_rss_feeds=fetch_rss_feeds),
+        classifier=SimpleNamespace(predict_from_signals=predict_from_signals),
+        buzz=SimpleNamespace(ingest=lambda df, index: 0, buzz=lambda t, window: 2))
+    return services, calls
+
+def test_start_early_scan_caches_stages_across_runs():
+    hist = pd.DataFrame({"date": pd.bdate_range("2024-01-01", periods=5), "close": [1.0, 2, 3, 4, 5]})
+    services, calls = _services(hist)
+    scan = StartEarlyScan(services)
+    first = scan.run("aapl")
+    assert first["ticker"] == "AAPL" and first["errors"] == {}
+    assert (first["insider_buy"], first["insider_sell"], first["news_buzz"]) == (3, 1, 2)
+    assert first["prob_pos"] == 0.8 and first["pred_pct"] == pytest.approx((0.8 - 0.5) * 40) and first["signal"]
+    assert not any(first["cached"].values())
+    second = scan.run("AAPL")
+    assert all(second["cached"].values()) and second["score"] == first["score"]
+    assert calls == {"history": 1, "predict": 1, "rss": 1}
+
+def test_start_early_scan_reports_stage_errors():
+    services, _ = _services(pd.DataFrame())
+    services.edgar.insider_scores = lambda t, days: (_ for _ in ()).throw(IOError("sec down"))
+    res = StartEarlyScan(services).run("MSFT")
+    assert res["errors"] == {"insiders": "sec down"}
+    assert res["insider_buy"] == 0 and res["prediction"] is None and res["prob_pos"] is None and res["pred_pct"] is None
+
+def test_pending_model_has_no_probability():
+    hist = pd.DataFrame({"date": pd.bdate_range("2024-01-01", periods=5), "close": [1.0, 2, 3, 4, 5]})
+    services, calls = _services(hist)
+    services.classifier.predict_from_signals = lambda h, horizon, ticker, ret_thresh: {"prob_pos": 0.0, "metrics": {"status": "loading"}}
+    scan = StartEarlyScan(services)
+    res = scan.run("AAPL")
+    assert res["prob_pos"] is None and res["pred_pct"] is None and res["prediction"]["metrics"]["status"] == "loading"
+    # the placeholder is not cached, so the next scan asks again
+    assert not scan.run("AAPL")["cached"]["predict"]
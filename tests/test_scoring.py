@@ -0,0 +1,83 @@
+import numpy as np, pandas as pd
+import pytest
+from classifier_model import ClassifierModel
+from feature_engine import FeatureEngine, FEATURES
+from model_registry import ModelRegistry
+from scoring import composite_score, prob_to_pct, signal_level, score_universe, latest_feature_matrix, MODEL_PCT_CAP
+
+class ConstModel:
+    """predict_proba stand-in returning a fixed probability and counting batched calls."""
+    def __init__(self, p):
+        self.p, self.calls = p, []
+    def predict_proba(self, X):
+        assert list(X.columns) == FEATURES
+        self.calls.append(len(X))
+        return np.column_stack([np.full(len(X), 1 - self.p), np.full(len(X), self.p)])
+
+def hist(n=30, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.01, n))
+    return pd.DataFrame({"date": pd.bdate_range("2024-01-01", periods=n), "close": close, "volume": rng.integers(1000, 2000, n)})
+
+def test_prob_to_pct_scale():
+    np.testing.assert_allclose(prob_to_pct([0.0, 0.5, 0.75, 1.0]), [-MODEL_PCT_CAP, 0.0, MODEL_PCT_CAP / 2, MODEL_PCT_CAP])
+
+def test_composite_score_scalar_and_vector():
+    assert composite_score(2, 1, 10, 4.0) == pytest.approx(2 * 2 - 1 + 0.2 * 10 + 0.5 * 4)
+    assert composite_score(1, 0, 0, None) == composite_score(1, 0, 0, np.nan) == 2.0
+    np.testing.assert_allclose(composite_score(np.array([1, 0]), np.array([0, 1]), np.array([0, 5]), np.array([np.nan, 100.0])),
+                               [2.0, -1 + 1 + 0.5 * MODEL_PCT_CAP])
+
+def test_signal_levels():
+    assert [signal_level(s) for s in (12, 10, 5, 2, 1.9, -3)] == ["High", "High", "Moderate", "Moderate", "Low", "Low"]
+
+def test_latest_feature_matrix_skips_empty_and_short():
+    X = latest_feature_matrix({"AAA": hist(), "BBB": pd.DataFrame(), "CCC": hist(5)}, FeatureEngine())
+    assert list(X.index) == ["AAA"] and list(X.columns) == FEATURES
+
+def test_score_universe_batches_per_model(tmp_path):
+    reg = ModelRegistry(str(tmp_path))
+    universe, own = ConstModel(0.75), ConstModel(0.25)
+    reg.publish("universe", 3, 0.01, universe, "u")
+    reg.publish("CCC", 3, 0.01, own, "c")
+    clf = ClassifierModel(features=FeatureEngine(), registry=reg)
+    hists = {t: hist(seed=i) for i, t in enumerate(["AAA", "BBB", "CCC"])}
+    board = score_universe(hists, clf, insiders=pd.DataFrame({"buy": [3], "sell": [0]}, index=["BBB"]), buzz={"AAA": 10}, top_n=10)
+    assert universe.calls == [2] and own.calls == [1]
+    by = board.set_index("ticker")
+    assert by.loc["AAA", "prob_pos"] == pytest.approx(0.75) and by.loc["CCC", "prob_pos"] == pytest.approx(0.25)
+    assert by.loc["BBB", "score"] == pytest.approx(2 * 3 + 0.5 * MODEL_PCT_CAP / 2)
+    assert by.loc["AAA", "score"] == pytest.approx(0.2 * 10 + 0.5 * MODEL_PCT_CAP / 2)
+    assert list(board["ticker"]) == ["BBB", "AAA", "CCC"] and list(board["signal"]) == ["High", "Moderate", "Low"]
+
+def test_score_universe_without_models(tmp_path):
+    clf = ClassifierModel(features=FeatureEngine(), registry=ModelRegistry(str(tmp_path)))
+    board = score_universe({"AAA": hist(), "BBB": hist(seed=1)}, clf, top_n=1)
+    assert len(board) == 1 and board["prob_pos"].isna().all() and (board["score"] == 0).all()
+
+def test_panel_feature_matrix_matches_per_ticker_features(tmp_path):
+    from price_panel import PricePanel
+    from scoring import panel_feature_matrix
+    hists = {"AAA": hist(40), "BBB": hist(40, seed=1).drop(index=[36, 38]), "CCC": hist(8, seed=2), "DDD": hist(25, seed=3)}
+    for h in hists.values():
+        h["volume"] = h["volume"].astype(float)
+    panel = PricePanel.build({t: h.assign(open=h["close"], high=h["close"], low=h["close"]) for t, h in hists.items()}, str(tmp_path / "panel"))
+    X = panel_feature_matrix(panel)
+    expected = latest_feature_matrix({t: h.reset_index(drop=True) for t, h in hists.items()}, FeatureEngine())
+    # DDD stopped trading 15 bars before the panel ends but still has WINDOW bars in the lookback; CCC is too short
+    assert list(X.index) == ["AAA", "BBB", "DDD"] and list(X.columns) == FEATURES
+    # the panel stores float32 prices
+    np.testing.assert_allclose(X.loc[expected.index].to_numpy(), expected.to_numpy(), rtol=1e-6, atol=1e-5)
+    assert list(panel_feature_matrix(panel, ["BBB", "ZZZ"]).index) == ["BBB"]
+
+def test_score_universe_from_panel(tmp_path):
+    from price_panel import PricePanel
+    reg = ModelRegistry(str(tmp_path / "registry"))
+    model = ConstModel(0.75)
+    reg.publish("universe", 3, 0.01, model, "u")
+    clf = ClassifierModel(features=FeatureEngine(), registry=reg)
+    hists = {t: hist(seed=i) for i, t in enumerate(["AAA", "BBB"])}
+    panel = PricePanel.build({t: h.assign(open=h["close"], high=h["close"], low=h["close"]) for t, h in hists.items()}, str(tmp_path / "panel"))
+    board = score_universe(panel, clf, buzz={"BBB": 10}, top_n=5)
+    assert model.calls == [2] and list(board["ticker"]) == ["BBB", "AAA"]
+    assert board["prob_pos"].tolist() == pytest.approx([0.75, 0.75])
@@ -0,0 +1,93 @@
+import json, time
+import pytest
+from streaming import TickRing, BarAggregator, QuoteStream, ReplayServer, parse_finnhub_message
+
+def wait_for(cond, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+def ticks(symbols, n, t0=1_700_000_000_000, step=1000):
+    return [(s, t0 + i * step, 100.0 + i, 1.0) for i in range(n) for s in symbols]
+
+def test_tick_ring_overwrites_oldest():
+    ring = TickRing(capacity=4)
+    assert ring.latest() is None and ring.last().empty
+    for i in range(6):
+        ring.append(i, 10.0 + i, 1.0)
+    assert ring.count == 6 and ring.latest() == (5, 15.0, 1.0)
+    assert ring.last()["ts"].tolist() == [2, 3, 4, 5]
+    assert ring.last(2)["price"].tolist() == [14.0, 15.0]
+
+def test_bar_aggregator_rolls_over_and_drops_late_ticks():
+    agg = BarAggregator(1000, capacity=2)
+    for ts, p, v in [(0, 10, 1), (500, 12, 2), (900, 9, 1), (1000, 11, 5), (700, 50, 1), (2500, 13, 1), (3100, 14, 1)]:
+        agg.add(ts, p, v)
+    assert agg.count == 3
+    df = agg.frame()
+    # the ring keeps the last 2 completed bars plus the open one
+    assert df["open"].tolist() == [11, 13, 14] and df["volume"].tolist() == [5, 1, 1]
+    assert agg.frame(include_current=False)["start"].astype("int64").tolist() == [1_000_000_000, 2_000_000_000]
+    agg2 = BarAggregator(1000)
+    for ts, p, v in [(0, 10, 1), (500, 12, 2), (900, 9, 1), (1000, 11, 5)]:
+        agg2.add(ts, p, v)
+    first = agg2.frame(include_current=False).iloc[0]
+    assert [first["open"], first["high"], first["low"], first["close"], first["volume"]] == [10, 12, 9, 9, 4]
+
+def test_parse_finnhub_message():
+    raw = json.dumps({"type": "trade", "data": [{"s": "AAA", "t": 1, "p": 2.5, "v": 3}, {"s": "BBB", "t": 2, "p": 1}]})
+    assert parse_finnhub_message(raw) == [("AAA", 1, 2.5, 3.0), ("BBB", 2, 1.0, 0.0)]
+    assert parse_finnhub_message(json.dumps({"type": "ping"})) == []
+
+@pytest.fixture
+def replay():
+    servers = []
+    def start(ticks, port=0):
+        servers.append(ReplayServer(ticks, port=port, batch=7).start())
+        return servers[-1]
+    yield start
+    for s in servers:
+        s.stop()
+
+def test_stream_receives_replayed_ticks(replay):
+    server = replay(ticks(["AAA", "BBB", "CCC"], 100))
+    stream = QuoteStream(server.url, ["aaa", "BBB"], capacity=64).start()
+    try:
+        assert wait_for(lambda: stream.ticks["AAA"].count == 100 and stream.ticks["BBB"].count == 100)
+        assert "CCC" not in stream.ticks
+        assert stream.latest("AAA")["c"] == 199.0 and stream.latest("AAA", max_age=60) is None
+        assert len(stream.recent_ticks("BBB")) == 64
+        bars = stream.bars("AAA", "1m")
+        assert bars["volume"].sum() == 100 and len(bars) == 2
+    finally:
+        stream.stop()
+
+def test_stream_reconnects_and_resubscribes(replay):
+    server = replay(ticks(["AAA"], 5))
+    port = server.port
+    stream = QuoteStream(server.url, ["AAA"]).start()
+    try:
+        assert wait_for(lambda: stream.ticks["AAA"].count == 5)
+        server.stop()
+        assert wait_for(lambda: not stream.connected.is_set())
+        replay(ticks(["AAA"], 3, t0=1_700_000_100_000), port=port)
+        assert wait_for(lambda: stream.ticks["AAA"].count == 8)
+        assert stream.connected.is_set() and stream.latest("AAA")["t"] == 1_700_000_102_000
+    finally:
+        stream.stop()
+
+def test_subscribe_while_connected(replay):
+    server = replay(ticks(["AAA", "BBB"], 20))
+    server.delay = 0.05
+    stream = QuoteStream(server.url, ["AAA"]).start()
+    try:
+        assert wait_for(lambda: stream.ticks["AAA"].count > 0)
+        stream.subscribe(["bbb"])
+        assert wait_for(lambda: stream.ticks["AAA"].count == 20)
+        # only the ticks replayed after the late subscribe reach BBB
+        assert 0 < stream.ticks["BBB"].count < 20
+    finally:
+        stream.stop()
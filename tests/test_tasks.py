@@ -0,0 +1,74 @@
+from datetime import datetime
+import pytest
+import data_feed, tasks
+from tasks import RetrainScheduler, retrain_universe, load_job_log
+
+@pytest.fixture
+def offline(standin, tmp_path, monkeypatch):
+    """Default-constructed DataFeed/registry (as in the worker processes) pointed at the stand-in, with files under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FINNHUB_API_KEY", "test")
+    monkeypatch.setenv("ALPHAV_API_KEY", "test")
+    monkeypatch.setitem(data_feed.BASE_URLS, "finnhub", standin.base + "/finnhub")
+    monkeypatch.setitem(data_feed.BASE_URLS, "alphavantage", standin.base + "/alphav")
+    return standin
+
+def test_seconds_until_next():
+    s = RetrainScheduler(["AAPL"], at="02:00")
+    assert s.seconds_until_next(datetime(2024, 1, 1, 1, 0)) == 3600
+    assert s.seconds_until_next(datetime(2024, 1, 1, 2, 0)) == 24 * 3600
+    assert s.seconds_until_next(datetime(2024, 1, 1, 23, 30)) == 2.5 * 3600
+
+def test_retrain_universe_publishes_and_logs(offline, tmp_path):
+    from model_registry import ModelRegistry
+    tickers = list(offline.names)[:2]
+    log = str(tmp_path / "jobs.jsonl")
+    records = retrain_universe(tickers, horizons=(1, 3), provider="Finnhub", days=300, max_workers=2, n_jobs=2, log_path=log)
+    assert all(r["status"] == "ok" for r in records)
+    assert sorted((r["ticker"], r["horizon"]) for r in records) == sorted((t, h) for t in tickers for h in (1, 3))
+    # the CPU budget is split between the workers: one core per forest here
+    assert all(r["n_jobs"] == 1 for r in records)
+    reg = ModelRegistry("model_registry")
+    assert all(reg.get(t, 3, 0.01)[0] is not None for t in tickers)
+    assert len(load_job_log(log)) == len(records)
+
+def test_retrain_and_save_model_returns_record(offline):
+    rec = tasks.retrain_and_save_model("AAPL", days=300)
+    assert rec["status"] == "ok" and rec["horizon"] == 3 and rec["artifact"].startswith("AAPL/")
+
+@pytest.mark.parametrize("ticker", ["", "   ", None])
+def test_retrain_and_save_model_without_ticker(offline, tmp_path, ticker):
+    assert tasks.retrain_and_save_model(ticker) == {"ticker": ticker, "status": "error", "error": "empty ticker"}
+    # nothing was fetched, trained or logged
+    assert not (tmp_path / tasks.JOB_LOG).exists() and not (tmp_path / "model_registry").exists()
+
+def _crash(*args):
+    raise RuntimeError("worker died")
+
+def test_failed_jobs_have_the_same_record_shape(offline, tmp_path, monkeypatch):
+    log = str(tmp_path / "jobs.jsonl")
+    good = retrain_universe(["AAPL"], horizons=(3,), provider="Finnhub", days=300, max_workers=1, log_path=log)
+    # the pool is forked, so the worker runs the patched job
+    monkeypatch.setattr(tasks, "_retrain_ticker", _crash)
+    bad = retrain_universe(["MSFT"], horizons=(1, 3), provider="Finnhub", days=300, max_workers=1, log_path=log)
+    assert [r["status"] for r in bad] == ["error", "error"] and bad[0]["error"] == "worker died"
+    common = {"ticker", "horizon", "ret_thresh", "started_at", "n_jobs", "status", "duration_s"}
+    assert common <= set(good[0]) and all(common <= set(r) for r in bad)
+    assert all(r["ret_thresh"] == 0.01 and r["duration_s"] >= 0 for r in bad)
+    logged = load_job_log(log)
+    assert len(logged) == 3 and logged[["ret_thresh", "duration_s", "n_jobs"]].notna().all().all()
+
+def test_main_once(monkeypatch, capsys):
+    calls = []
+    def fake(tickers, **kw):
+        calls.append((tickers, kw))
+        return [{"ticker": t, "horizon": h, "status": "ok"} for t in tickers for h in kw["horizons"]]
+    monkeypatch.setattr(tasks, "retrain_universe", fake)
+    assert tasks.main(["--once", "aapl", "msft", "--horizons", "3", "--n-jobs", "2", "--log", ""]) == 0
+    assert calls[0][0] == ["AAPL", "MSFT"] and calls[0][1]["horizons"] == (3,) and calls[0][1]["n_jobs"] == 2
+    assert "2/2 models trained" in capsys.readouterr().out
+
+def test_main_once_reports_failures(monkeypatch, capsys):
+    monkeypatch.setattr(tasks, "retrain_universe", lambda tickers, **kw: [{"ticker": "AAPL", "horizon": 3, "status": "error", "error": "no history"}])
+    assert tasks.main(["--once", "AAPL"]) == 1
+    assert "AAPL h3: no history" in capsys.readouterr().out
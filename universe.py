@@ -0,0 +1,31 @@
+import os
+
+# ticker -> company name; also the alias source for headline -> ticker matching
+UNIVERSE = {
+    "AAPL": "Apple", "MSFT": "Microsoft", "NVDA": "Nvidia", "AMZN": "Amazon", "GOOGL": "Alphabet",
+    "META": "Meta Platforms", "TSLA": "Tesla", "AMD": "Advanced Micro Devices", "INTC": "Intel", "AVGO": "Broadcom",
+    "ORCL": "Oracle", "CRM": "Salesforce", "ADBE": "Adobe", "NFLX": "Netflix", "QCOM": "Qualcomm",
+    "IBM": "IBM", "CSCO": "Cisco", "JPM": "JPMorgan Chase", "BAC": "Bank of America", "GS": "Goldman Sachs",
+    "V": "Visa", "MA": "Mastercard", "PYPL": "PayPal", "COIN": "Coinbase", "XOM": "Exxon Mobil",
+    "CVX": "Chevron", "PFE": "Pfizer", "MRNA": "Moderna", "LLY": "Eli Lilly", "JNJ": "Johnson & Johnson",
+    "WMT": "Walmart", "COST": "Costco", "DIS": "Disney", "BA": "Boeing", "PLTR": "Palantir",
+    "SHOP": "Shopify", "RY": "Royal Bank of Canada", "TD": "Toronto-Dominion Bank", "ENB": "Enbridge", "CNQ": "Canadian Natural Resources",
+}
+
+# other names headlines use for the same companies (matched like the names above)
+ALIASES = {
+    "GOOGL": ["Google", "YouTube"], "META": ["Meta", "Facebook", "Instagram"], "AMZN": ["AWS"], "NVDA": ["Nvidia Corp"],
+    "JPM": ["JPMorgan", "JP Morgan"], "BAC": ["BofA"], "GS": ["Goldman"], "XOM": ["Exxon", "ExxonMobil"], "LLY": ["Lilly"],
+    "JNJ": ["J&J"], "DIS": ["Walt Disney"], "TD": ["TD Bank"], "RY": ["RBC"], "CNQ": ["CNRL"], "MA": ["MasterCard Inc"],
+}
+
+def universe_names(universe=None):
+    """ticker -> [company name, aliases...] for headline matching."""
+    return {t: [name] + ALIASES.get(t, []) for t, name in (universe or UNIVERSE).items()}
+
+def universe_tickers():
+    """Tickers to scan: MARKET_UNIVERSE (comma separated) if set, else the built-in list."""
+    env = os.getenv("MARKET_UNIVERSE", "")
+    if env.strip():
+        return [t.strip().upper() for t in env.split(",") if t.strip()]
+    return list(UNIVERSE)